@@ -1,42 +1,30 @@
-import csv
+import os
+import sys
 import matplotlib.pyplot as plt
-from datetime import datetime
 import random
 
+# The shared loader lives in repo_mining/touch_store.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'repo_mining'))
+from touch_store import load_touches
+
 # Start Reading in Data
 def readIn(path):
-    with open(path, 'r') as csvfile:
-        # Use DictReader for better readability
-        reader = csv.DictReader(csvfile)
-        # Build the data list using a list comprehension
-        data = [
-            [row['filename'], row['author'], datetime.strptime(row['date'], '%Y-%m-%dT%H:%M:%SZ')]
-            for row in reader
-        ]
-    return data
+    # File/author ids and every date converted in one NumPy call instead of strptime per row
+    return load_touches(path)
 
 def createPlot(data):
-    # Gives Each File a Number to Reduce Plot Clutter
-    totalUniqueFile = list(set([item[0] for item in data]))
-    fileNumbering = {file: i + 1 for i, file in enumerate(totalUniqueFile)}
+    fileIds, authorIds, _ = data.columns()
 
     # Find all Authors without Duplicates
-    authors = list(set([item[1] for item in data]))
+    authors = data.authors
 
     # Give Unique Authors graph Coloring, Random on RGB Values
     author_colors = {author: (random.random(), random.random(), random.random()) for author in authors}
 
-    # Prepare data for plotting
-    x = []; y= []; colors = []
-    startDate = min([entry[2] for entry in data])
-
-    for filename, author, date in data:
-        currFileNumber = fileNumbering[filename]
-        x.append(currFileNumber)
-        currWeekNumber = ((date-startDate).days // 7)
-        y.append(currWeekNumber)
-        currAuthor = author_colors[author]
-        colors.append(currAuthor)
+    # Prepare data for plotting, each file gets a number (from 1) to reduce plot clutter
+    x = fileIds + 1
+    y = data.weeks()
+    colors = [author_colors[authors[i]] for i in authorIds]
 
     # Setting Plot Parameters
     fig, ax = plt.subplots()
@@ -1,35 +1,31 @@
-import csv
+import os
+import sys
 import numpy as np
-from datetime import datetime
 import matplotlib.pyplot as plt
-from collections import OrderedDict
+
+# The shared loader lives in repo_mining/touch_store.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'repo_mining'))
+from touch_store import load_touches
 
 
 def draw_scatterplot(file_path):
     np.random.seed(843)
 
-    # Read data and extract information from CSV
-    with open(file_path, mode='r') as datafile:
-        data_csv = csv.reader(datafile)
-        next(data_csv)  # Skip header
-
-        data = [(line[0], line[1], datetime.strptime(line[2], "%Y-%m-%dT%H:%M:%SZ")) for line in data_csv]
-
-    # Extract unique authors and files
-    filenames = list(OrderedDict.fromkeys([line[0] for line in data]))
-    authors = list(OrderedDict.fromkeys([line[1] for line in data]))
+    # Read data, files and authors are numbered in the order they first appear
+    touches = load_touches(file_path)
+    filenames = touches.files
+    authors = touches.authors
+    file_ids, author_ids, _ = touches.columns()
 
     # Create color map for authors
     author_colors = {author: np.random.rand(3,) for author in authors}
 
-    # Determine the date of the first commit
-    first_commit_date = min(line[2] for line in data)
+    # Weeks since the first commit, for all rows at once
+    weeks = touches.weeks()
 
-    # Create scatter plot
-    for filename, author, commit_date in data:
-        weeks_since_origin = (commit_date - first_commit_date).days // 7
-        file_index = filenames.index(filename)
-        plt.scatter(file_index, weeks_since_origin, c=[author_colors[author]])
+    # Create scatter plot, one collection for all points in file order
+    colors = np.array([author_colors[author] for author in authors]).reshape(-1, 3)[author_ids]
+    plt.scatter(file_ids, weeks, c=colors)
 
     # Customize plot
     plt.xlim([0, len(filenames)])
@@ -1,63 +1,43 @@
-import json
-import requests
-import csv
 import os
-from Brandon_CollectFiles import countfiles, github_auth
+from github_api import get_client
+from mining_pipeline import clone_repo, mine_repo
 
 if not os.path.exists("Brandon_data"):
     os.makedirs("Brandon_data")
 
-def collect_authors_dates(dictfiles, lsttokens, repo):
-    ipage = 1
-    ct = 0
-    authors_dates = {}
-
-    try:
-        while True:
-            spage = str(ipage)
-            commitsUrl = 'https://api.github.com/repos/' + repo + '/commits?page=' + spage + '&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
-
-            if len(jsonCommits) == 0:
-                break
-
-            for shaObject in jsonCommits:
-                sha = shaObject['sha']
-                shaUrl = 'https://api.github.com/repos/' + repo + '/commits/' + sha
-                shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                if shaDetails is None:
-                    print(f"Error retrieving details for commit {sha}")
-                    continue
-                author = shaDetails['commit']['author']['name']
-                date = shaDetails['commit']['author']['date']
-                filesjson = shaDetails['files']
-                for filenameObj in filesjson:
-                    filename = filenameObj['filename']
-                    if filename in dictfiles:
-                        if filename not in authors_dates:
-                            authors_dates[filename] = []
-                        authors_dates[filename].append((author, date))
-            ipage += 1
-    except Exception as e:
-        print(f"Error receiving data: {e}")
-        exit(0)
-    return authors_dates
-
 repo = 'scottyab/rootbeer'
 lstTokens = [""]
 
-dictfiles = dict()
-countfiles(dictfiles, lstTokens, repo)
-authors_dates = collect_authors_dates(dictfiles, lstTokens, repo)
-
-fileOutput = 'Brandon_data/authors_dates_' + repo.split('/')[1] + '.csv'
-rows = ["Filename", "Author", "Date"]
-fileCSV = open(fileOutput, 'w')
-writer = csv.writer(fileCSV)
-writer.writerow(rows)
-
-for filename, touches in authors_dates.items():
-    for author, date in touches:
-        rows = [filename, author, date]
-        writer.writerow(rows)
-fileCSV.close()
\ No newline at end of file
+# Relevant source file extensions, same list countfiles uses in Brandon_CollectFiles.py
+source_files = ['.java', '.kt', '.cpp', '.c', '.cmake']
+
+# Set to True to only fetch the commits made since the last run and merge them into the CSVs
+incremental = False
+
+# Set to True to read the history from a local bare clone with git log instead of the API
+use_clone = False
+
+# Set to True to fetch the history in batches through the GraphQL API instead of one request per commit
+use_graphql = False
+# Set to True to walk the REST history with the asyncio engine, GITHUB_WORKERS requests in flight
+use_async = False
+
+# One walk over the history writes both the touch counts and the author/date touches
+file = repo.split('/')[1]
+try:
+    clone = None
+    if use_clone:
+        clone = 'Brandon_data/' + file + '.git'
+        clone_repo(repo, clone)
+    mine_repo(repo, lstTokens, source_files,
+              'Brandon_data/file_' + file + '.csv',
+              'Brandon_data/authors_dates_' + file + '.csv',
+              'Brandon_data/checkpoint_' + file + '.json',
+              incremental, clone=clone, graphql=use_graphql, asynchronous=use_async)
+except Exception as e:
+    print(f"Error receiving data: {e}")
+    exit(0)
+
+if get_client().cache:
+    cache = get_client().cache.stats()
+    print('Commit cache: ' + str(cache['hits']) + ' hits, ' + str(cache['misses']) + ' misses')
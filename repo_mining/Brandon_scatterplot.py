@@ -1,82 +1,75 @@
-import matplotlib.pyplot as plt
-import csv
-from datetime import datetime
-import os
-import matplotlib.colors as mcolors
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from touch_store import DENSITY_POINTS, load_touches
 
-def read_authors_dates(file):
-    authors_dates = {}
-    with open(file, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader)  # Skip header
-        for row in reader:
-            # Skip empty rows
-            if not row or all(cell == '' for cell in row):
-                continue
-            
-            # Skip rows that don't have the required number of columns
-            if len(row) != 3:
-                continue
-            
-            filename, author, date = row
-            date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')
-            if filename not in authors_dates:
-                authors_dates[filename] = []
-            authors_dates[filename].append((author, date))
-    return authors_dates
-
-def plot_scatter(authors_dates, output_path, legend_path):
-    plt.figure(figsize=(12, 8))
+def plot_scatter(touches, output_path, legend_path, density_above=DENSITY_POINTS, new_figure=Figure):
+    # Above density_above touches, draws a file x week grid colored by each cell's top author.
+    # Returns the plot and filename legend figures, plain Figures unless new_figure is plt.figure
+    fig = new_figure(figsize=(12, 8))
+    ax = fig.subplots()
     
     # Use a colormap with a distinct set of colors (20)
-    colormap = plt.get_cmap('tab20')
+    colormap = colormaps['tab20']
 
     num_colors = len(colormap.colors)
-    authors_colors = {}
-    color_idx = 0
-    
-    # Create a mapping of filenames to numbers
-    filenames = list(authors_dates.keys())
-    filename_to_num = {filename: i+1 for i, filename in enumerate(filenames)}
     
-    for filename, touches in authors_dates.items():
-        weeks = [(date - min(date for _, date in touches)).days // 7 for _, date in touches]
-        authors = [author for author, _ in touches]
-        
-        for author in set(authors):
-            if author not in authors_colors:
-                authors_colors[author] = colormap(color_idx % num_colors)
-                color_idx += 1
-        
-        colors = [authors_colors[author] for author in authors]
-        plt.scatter([filename_to_num[filename]] * len(weeks), weeks, c=colors, label=[author]*len(weeks), alpha=1, edgecolors='w', linewidth=0.5)
+    # Files are numbered from 1 in the order they first appear
+    filenames = touches.files
+
+    # Weeks since each file's first touch for every row at once (the first touches are found
+    # in one pass), rows ordered file by file
+    file_ids, author_ids, _ = touches.columns()
+    all_weeks = touches.weeks(per_file=True)
+    order = np.argsort(file_ids, kind='stable')
+
+    # Authors get colors in the order they first show up going through the files
+    seen, first_row = np.unique(author_ids[order], return_index=True)
+    authors_colors = {touches.authors[author]: colormap(color_idx % num_colors)
+                      for color_idx, author in enumerate(seen[np.argsort(first_row)])}
 
-    plt.xlabel('Files')
-    plt.ylabel('Weeks')
-    plt.title('File Touches Over Time by Authors')
-    plt.xticks(ticks=range(1, len(filenames) + 1), labels=range(1, len(filenames) + 1), rotation=0)  # Start X-axis at 1
+    color_of = np.array([authors_colors[author] for author in touches.authors]).reshape(-1, 4)
+
+    binned = len(touches) > density_above
+    if binned:
+        image, extent = touches.density(color_of, per_file=True)
+        ax.imshow(image, origin='lower', extent=extent, aspect='auto', interpolation='nearest', rasterized=True)
+    else:
+        # One collection for every touch, drawn file by file
+        ax.scatter(file_ids[order] + 1, all_weeks[order], c=color_of[author_ids[order]], alpha=1, edgecolors='w', linewidth=0.5)
+
+    ax.set_xlabel('Files')
+    ax.set_ylabel('Weeks')
+    ax.set_title('File Touches Over Time by Authors')
+    if not binned:
+        ax.set_xticks(ticks=range(1, len(filenames) + 1), labels=range(1, len(filenames) + 1), rotation=0)  # Start X-axis at 1
     
     # Create a custom legend for authors
-    author_handles = [plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=authors_colors[author], markersize=10) for author in authors_colors]
+    author_handles = [Line2D([0], [0], marker='o', color='w', markerfacecolor=authors_colors[author], markersize=10) for author in authors_colors]
     author_labels = list(authors_colors.keys())
-    plt.legend(author_handles, author_labels, loc='upper right', bbox_to_anchor=(1.15, 1))
+    ax.legend(author_handles, author_labels, loc='upper right', bbox_to_anchor=(1.15, 1))
     
     # Save the plot as a PNG file
-    plt.savefig(output_path)
-    #plt.show()
+    fig.savefig(output_path)
     
-    # Create a legend for filenames
-    filename_legend = plt.figure(figsize=(12, 8))
-    filename_legend.legend([plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='k', markersize=10) for _ in filenames],
-                           [f"{i+1}: {filename}" for i, filename in enumerate(filenames)],
-                           loc='center')
+    # Create a legend for filenames, one text block in a legend style frame instead of a legend
+    # entry (and Line2D) per file
+    filename_legend = new_figure(figsize=(12, 8))
+    filename_legend.text(0.5, 0.5, "\n".join(f"\u25cf  {i+1}: {filename}" for i, filename in enumerate(filenames)),
+                         ha='center', va='center', multialignment='left', linespacing=1.6,
+                         bbox=dict(boxstyle='round', facecolor='white', edgecolor='0.8', pad=0.6))
     filename_legend.savefig(legend_path)
-    plt.show()
+    return fig, filename_legend
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-file = 'Brandon_data/authors_dates_rootbeer.csv'
-authors_dates = read_authors_dates(file)
+    file = 'Brandon_data/authors_dates_rootbeer.csv'
+    touches = load_touches(file)
 
-# Define the output paths for the PNG files
-output_path = 'Brandon_data/scatterplot.png'
-legend_path = 'Brandon_data/filename_legend.png'
-plot_scatter(authors_dates, output_path, legend_path)
\ No newline at end of file
+    # Define the output paths for the PNG files
+    output_path = 'Brandon_data/scatterplot.png'
+    legend_path = 'Brandon_data/filename_legend.png'
+    plot_scatter(touches, output_path, legend_path, new_figure=plt.figure)
+    plt.show()
\ No newline at end of file
@@ -1,69 +1,48 @@
-import requests
-import json
-import csv
 import os
-from Eric_CollectFiles import countfiles, github_auth  
+from github_api import get_client
+from mining_pipeline import clone_repo, mine_repo
 
 if not os.path.exists("Eric_data"):
     os.makedirs("Eric_data")
 
-def collect_authors_dates(dictfiles, lsttokens, repo):
-    ipage = 1
-    ct = 0
-    authors_dates = {}
-
-    try:
-        while True:
-            spage = str(ipage)
-            commitsUrl = f'https://api.github.com/repos/{repo}/commits?page={spage}&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
-
-            if len(jsonCommits) == 0:
-                break  # No more commits
-
-            for shaObject in jsonCommits:
-                sha = shaObject['sha']
-                shaUrl = f'https://api.github.com/repos/{repo}/commits/{sha}'
-                shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                if shaDetails is None:
-                    print(f"Error retrieving details for commit {sha}")
-                    continue
-
-                author = shaDetails['commit']['author']['name']
-                date = shaDetails['commit']['author']['date']
-                filesjson = shaDetails['files']
-                for filenameObj in filesjson:
-                    filename = filenameObj['filename']
-                    if filename in dictfiles:
-                        if filename not in authors_dates:
-                            authors_dates[filename] = []
-                        authors_dates[filename].append((author, date))
-            ipage += 1
-    except Exception as e:
-        print(f"Error receiving data: {e}")
-        exit(0)
-    return authors_dates
-
 # Define your GitHub repository and tokens
 repo = 'scottyab/rootbeer'
 lstTokens = [""] 
 
-# Collect files from the repository using countfiles function
-dictfiles = dict()
-countfiles(dictfiles, lstTokens, repo)
+# Source file extensions, same list countfiles uses in Eric_CollectFiles.py
+v_extensions = ['.java', '.kt', '.cpp', '.c', '.cmake']
 
-# Collect authors and dates for each file
-authors_dates = collect_authors_dates(dictfiles, lstTokens, repo)
+# Only fetch commits newer than the last run (Eric_data/checkpoint_<repo>.json) and merge them in
+incremental = False
 
-# Output the collected data to a CSV file
-fileOutput = f'Eric_data/authors_dates_{repo.split("/")[1]}.csv'
-rows = ["Filename", "Author", "Date"]
-with open(fileOutput, 'w', newline='') as fileCSV:
-    writer = csv.writer(fileCSV)
-    writer.writerow(rows)
+# Read the history from a local bare clone (Eric_data/<repo>.git) with git log, no API calls
+use_clone = False
+
+# Fetch the history with batched GraphQL queries, a request per 10 commits instead of per commit
+use_graphql = False
 
-    for filename, touches in authors_dates.items():
-        for author, date in touches:
-            writer.writerow([filename, author, date])
+# Walk the REST history with the asyncio engine (async_mining.py), GITHUB_WORKERS requests in flight
+use_async = False
+
+# Walk the history once, counting touches and collecting authors and dates for each file,
+# then output both to CSV files
+fileOutput = f'Eric_data/authors_dates_{repo.split("/")[1]}.csv'
+try:
+    clone = None
+    if use_clone:
+        clone = f'Eric_data/{repo.split("/")[1]}.git'
+        clone_repo(repo, clone)
+    mine_repo(repo, lstTokens, v_extensions,
+              f'Eric_data/file_{repo.split("/")[1]}.csv',
+              fileOutput,
+              f'Eric_data/checkpoint_{repo.split("/")[1]}.json',
+              incremental, clone=clone, graphql=use_graphql, asynchronous=use_async)
+except Exception as e:
+    print(f"Error receiving data: {e}")
+    exit(0)
 
 print(f"The data has now been saved to {fileOutput}")
+
+# Commit details reused from the on-disk cache instead of downloaded again
+if get_client().cache:
+    print(f"Commit cache: {get_client().cache.stats()}")
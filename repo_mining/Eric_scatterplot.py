@@ -1,29 +1,16 @@
-import matplotlib.pyplot as plt
-import csv
-from datetime import datetime
 import os
 import random
+import matplotlib.colors as mcolors
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from touch_store import DENSITY_POINTS, load_touches
 
-# Function to read authors and dates from a CSV file
-def read_authors_dates(file):
-    authors_dates = {}
-    with open(file, 'r') as csvfile:
-        reader = csv.reader(csvfile)
-        next(reader) 
-        for row in reader:
-            filename, author, date = row
-            date = datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')
-            if filename not in authors_dates:
-                authors_dates[filename] = []
-            authors_dates[filename].append((author, date))
-    return authors_dates
-
-# Function to create a scatter plot
-def create_plot(data, output_file):
-    unique_files = list(set([item[0] for item in data]))
-    file_numbering = {file: i + 1 for i, file in enumerate(unique_files)}
-
-    unique_authors = list(set([item[1] for item in data]))
+# Function to create a scatter plot from the touches of load_touches,
+# above density_above touches the plot shows a file x week grid colored by each cell's top author.
+# Draws on a new_figure() Figure, a plain Figure by default so nothing goes through pyplot
+# (headless, safe in worker processes), pass plt.figure to show it afterwards
+def create_plot(touches, output_file, density_above=DENSITY_POINTS, new_figure=Figure):
+    file_ids, author_ids, _ = touches.columns()
 
     author_colors = {}
     color_palette = ['red', 'blue', 'green', 'purple', 'black', 'orange', 'brown', 'pink', 'gray', 'yellow']
@@ -37,46 +24,43 @@ def create_plot(data, output_file):
                 author_colors[author] = (random.random(), random.random(), random.random())
         return author_colors[author]
 
-    x = []
-    y = []
-    colors = []
-    start_date = min([entry[2] for entry in data])
-
-    for filename, author, date in data:
-        file_num = file_numbering[filename]
-        x.append(file_num)
-        week_number = (date - start_date).days // 7
-        y.append(week_number)
-        colors.append(assign_color(author))
+    color_of = [assign_color(author) for author in touches.authors]
 
-    fig, ax = plt.subplots()
-    scatter = ax.scatter(x, y, c=colors, marker='o', edgecolors='w', linewidth=0.5)
+    fig = new_figure()
+    ax = fig.subplots()
+    if len(touches) > density_above:
+        image, extent = touches.density(mcolors.to_rgba_array(color_of))
+        ax.imshow(image, origin='lower', extent=extent, aspect='auto', interpolation='nearest', rasterized=True)
+    else:
+        # Files are numbered from 1 in the order they first appear, weeks count from the first touch
+        x = file_ids + 1
+        y = touches.weeks()
+        colors = mcolors.to_rgba_array(color_of)[author_ids]
+        scatter = ax.scatter(x, y, c=colors, marker='o', edgecolors='w', linewidth=0.5)
 
     # Add legend for authors
-    handles = [plt.Line2D([0], [0], marker='o', color='w', markerfacecolor=author_colors[author], markersize=8, label=author) for author in author_colors]
+    handles = [Line2D([0], [0], marker='o', color='w', markerfacecolor=author_colors[author], markersize=8, label=author) for author in author_colors]
     ax.legend(handles=handles, title="Authors", bbox_to_anchor=(1, 1.1), loc='upper left')
 
     ax.set_xlabel('Files')
     ax.set_ylabel('Weeks')
     ax.set_title('Files touched by Authors')
-    plt.tight_layout()
+    fig.tight_layout()
 
-    plt.savefig(output_file)
-    plt.show()
+    fig.savefig(output_file)
+    return fig
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     csv_file = 'Eric_data/authors_dates_rootbeer.csv'
-    data = []
-    with open(csv_file, 'r') as file:
-        reader = csv.reader(file)
-        next(reader)  
-        for row in reader:
-            filename, author, date = row
-            data.append([filename, author, datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')])
+    # Shared loader: ids for files and authors, all dates converted at once
+    touches = load_touches(csv_file)
 
     output_dir = 'Eric_data'
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
 
     output_file = os.path.join(output_dir, 'Eric_authorTouchesPlot.png')
-    create_plot(data, output_file)
+    create_plot(touches, output_file, new_figure=plt.figure)
+    plt.show()
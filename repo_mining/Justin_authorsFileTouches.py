@@ -1,40 +1,14 @@
-import json
-import csv
 import os
-from urllib.request import Request, urlopen
-from urllib.error import HTTPError, URLError
+from github_api import API_URL, commit_files, commit_pages, github_auth
+from languages import LOCAL_LANGUAGES, get_resolver
+from mining_pipeline import CrawlJournal, FileMatcher, TouchSpool
+from touch_store import PARQUET, TouchStore, parquet_path
 
 # Ensure data directory exists
 DATA_DIR = "Justin_data"
 if not os.path.exists(DATA_DIR):
     os.makedirs(DATA_DIR)
 
-# GitHub Authentication function
-def github_auth(url, tokens, token_index):
-    """
-    Authenticates and retrieves data from a GitHub API request.
-    
-    Parameters:
-    - url (str): GitHub API URL.
-    - tokens (list): List of GitHub API tokens.
-    - token_index (int): Current index for token rotation.
-    
-    Returns:
-    - jsonData (dict): Parsed JSON response.
-    - token_index (int): Updated token index.
-    """
-    jsonData = None
-    try:
-        token_index = token_index % len(tokens)
-        headers = {'Authorization': f'Bearer {tokens[token_index]}'}
-        request = Request(url, headers=headers)
-        with urlopen(request) as response:
-            jsonData = json.load(response)
-        token_index += 1
-    except (HTTPError, URLError) as e:
-        print(f"Error during GitHub request: {e}")
-    return jsonData, token_index
-
 # Mapping of Language to File Extensions
 LANGUAGE_MAPPING = {
     'Java': ['.java'],
@@ -44,20 +18,22 @@ LANGUAGE_MAPPING = {
     'CMake': ['.cmake', 'CMakeLists.txt']
 }
 
-def get_repo_languages(repo, tokens):
+def get_repo_languages(repo, tokens, files=None):
     """
     Retrieves the programming languages used in the repository.
+
+    The answer is cached for GITHUB_LANGUAGES_TTL seconds (see languages.py), so
+    a rerun does not wait on the request again.
     
     Parameters:
     - repo (str): GitHub repository in the format 'owner/repo'.
     - tokens (list): GitHub API tokens.
+    - files (list): Paths to classify with the built-in language table instead of asking the API.
     
     Returns:
     - languages (list): List of languages used in the repo.
     """
-    url = f'https://api.github.com/repos/{repo}/languages'
-    languages, _ = github_auth(url, tokens, 0)
-    return list(languages.keys())
+    return get_resolver().languages(repo, tokens, files)
 
 def get_file_extensions(languages):
     """
@@ -69,85 +45,82 @@ def get_file_extensions(languages):
     Returns:
     - extensions (list): List of file extensions to look for.
     """
-    extensions = []
-    for lang in languages:
-        if lang in LANGUAGE_MAPPING:
-            extensions += LANGUAGE_MAPPING[lang]
-    return extensions
+    return get_resolver().patterns(languages, LANGUAGE_MAPPING)
 
-def collect_commit_data(files_dict, tokens, repo, valid_extensions):
+def collect_commit_data(touches, tokens, repo, valid_extensions, journal=None):
     """
     Collects commit data and tracks which authors touched which files.
     
     Parameters:
-    - files_dict (dict): Dictionary to store file authorship data.
+    - touches (TouchSpool): Spool the (file, author, date) touches are written to as they are found.
     - tokens (list): GitHub API tokens.
     - repo (str): GitHub repository in the format 'owner/repo'.
-    - valid_extensions (list): List of valid file extensions to check.
+    - valid_extensions (list): List of valid file extensions (and exact file names) to check.
+    - journal (CrawlJournal): Optional progress journal to resume from and write to.
     
     Returns:
-    None. (Modifies the files_dict in place).
+    None. (Appends to touches).
     """
     page = 1
     token_index = 0
+    # Compiled once, exact names such as CMakeLists.txt are matched against the basename
+    is_valid = FileMatcher(valid_extensions)
 
-    try:
-        while True:
-            # Build URL for commit data retrieval
-            commit_url = f'https://api.github.com/repos/{repo}/commits?page={page}&per_page=100'
-            commits, token_index = github_auth(commit_url, tokens, token_index)
-
-            # Exit if no more commits
-            if not commits:
-                break
+    if journal and journal.resumed:
+        # Continue from the page saved by the interrupted run, the spool was opened at its offset
+        page = journal.page
 
+    try:
+        # Commit pages up to the last one in the Link header, the next ones requested ahead
+        for page, commits in commit_pages(repo, tokens, start=page):
             # Process each commit
             for commit in commits:
                 sha = commit['sha']
+                if journal and sha in journal.shas:
+                    continue
                 author = commit['commit']['author']['name']
                 date = commit['commit']['author']['date']
 
                 # Get detailed commit data (files modified in that commit)
-                sha_url = f'https://api.github.com/repos/{repo}/commits/{sha}'
+                sha_url = f'{API_URL}/repos/{repo}/commits/{sha}'
                 commit_details, token_index = github_auth(sha_url, tokens, token_index)
 
                 if not commit_details or 'files' not in commit_details:
                     continue
                 
-                files_changed = commit_details['files']
+                # commits with more than 300 files list the rest on further pages
+                files_changed = commit_files(repo, commit_details, tokens)
                 
                 # Track authorship for each valid file
                 for file in files_changed:
                     filename = file['filename']
-                    if any(filename.endswith(ext) for ext in valid_extensions):
-                        if filename not in files_dict:
-                            files_dict[filename] = []
-                        files_dict[filename].append((author, date))
+                    if is_valid(filename):
+                        touches.write(filename, author, date)
                         print(f"File: {filename}, Author: {author}, Date: {date}")
+
+                if journal:
+                    journal.done(sha, touches.tell)
             
-            page += 1
+            if journal:
+                journal.next_page(page + 1, touches.tell)
     except Exception as e:
         print(f"Error during commit data collection: {e}")
         exit(1)
+    if journal:
+        journal.finish()
 
 def save_file_touches_to_csv(file_data, output_file):
     """
-    Saves file touches (authors and dates) to a CSV file.
+    Saves file touches (authors and dates) to a CSV file, grouped by file.
     
     Parameters:
-    - file_data (dict): Dictionary of file names and their authorship data.
+    - file_data (TouchSpool): Spool filled by collect_commit_data.
     - output_file (str): Path to the CSV output file.
     
     Returns:
     None.
     """
-    with open(output_file, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["Filename", "Author", "Date"])
-        
-        for filename, touches in file_data.items():
-            for author, date in touches:
-                writer.writerow([filename, author, date])
+    file_data.write_csv(output_file)
 
     print(f"Data saved to {output_file}")
 
@@ -157,19 +130,33 @@ if __name__ == "__main__":
     repo = 'scottyab/rootbeer'
     tokens = [""]  # Add your tokens here
 
-    # Get languages and file extensions used in the repository
-    repo_languages = get_repo_languages(repo, tokens)
-    file_extensions = get_file_extensions(repo_languages)
+    # Get languages and file extensions used in the repository. With GITHUB_LANGUAGES=local
+    # nothing is asked before mining, the files of every mapped language are kept
+    if LOCAL_LANGUAGES:
+        file_extensions = get_file_extensions(LANGUAGE_MAPPING)
+    else:
+        repo_languages = get_repo_languages(repo, tokens)
+        file_extensions = get_file_extensions(repo_languages)
 
-    # Dictionary to store file authorship data
-    file_data = {}
+    # Collect commit data for files with valid extensions, journaling progress so an
+    # interrupted run picks up where it stopped
+    journal = CrawlJournal(os.path.join(DATA_DIR, 'journal_' + repo.split('/')[1] + '.json'))
 
-    # Collect commit data for files with valid extensions
-    collect_commit_data(file_data, tokens, repo, file_extensions)
+    # Touches go to a spool file on disk as they are found instead of a dictionary in memory
+    file_data = TouchSpool(os.path.join(DATA_DIR, 'touches_' + repo.split('/')[1] + '.spool'),
+                           journal.data if journal.resumed else 0)
+    collect_commit_data(file_data, tokens, repo, file_extensions, journal)
 
     # Define output file path
     output_csv = os.path.join(DATA_DIR, 'Justin_authorsTouches.csv')
 
     # Save the collected file authorship data to CSV
     save_file_touches_to_csv(file_data, output_csv)
+    if LOCAL_LANGUAGES:
+        # the languages told from the mined paths, cached like an API answer
+        print(f"Languages: {get_repo_languages(repo, tokens, TouchStore.read_csv(output_csv).files)}")
+    if PARQUET:
+        # columnar copy for Justin_scatterplot.py, loads without parsing the dates
+        TouchStore.read_csv(output_csv).write_parquet(parquet_path(output_csv))
+    file_data.close()
 
@@ -1,34 +1,42 @@
 import matplotlib.pyplot as plt
-import pandas as pd
-import os
-from matplotlib.colors import to_rgba
+import numpy as np
+from matplotlib import colormaps
 from matplotlib.lines import Line2D
 from matplotlib.ticker import MaxNLocator
+from touch_store import load_touches
 
-# Define the path to the CSV file
+# Define the path to the CSV file, the .touches / Parquet copy next to it is used when current
 CSV_FILE = 'Justin_data/Justin_authorsTouches.csv'
 
-# Load data from CSV
-data = pd.read_csv(CSV_FILE)
+# Load data without pandas, files and authors are numbered in the order they first appear
+touches = load_touches(CSV_FILE)
+file_ids, author_ids, seconds = touches.columns()
 
-# Ensure the 'Date' column is in datetime format
-data['Date'] = pd.to_datetime(data['Date'])
-
-# Extract the week number from the date
-data['Week'] = data['Date'].dt.to_period('W').apply(lambda r: r.start_time)
-data['Week'] = (data['Week'] - data['Week'].min()).dt.days // 7  # Convert to weeks since the start
+# Week of each date, weeks start on Monday (1970-01-01 was a Thursday, so day + 3 counts from a Monday)
+week = (seconds // 86400 + 3) // 7
+week = week - week.min()  # Convert to weeks since the start
 
 # Map authors to colors
-authors = data['Author'].unique()
-colors = plt.cm.get_cmap('tab20', len(authors))  # Use a colormap with distinct colors
+authors = touches.authors
+colors = colormaps['tab20'].resampled(len(authors))  # Use a colormap with distinct colors
 color_map = {author: colors(i) for i, author in enumerate(authors)}
 
+# Rows of each author, grouped once instead of masking the data per author
+order = np.argsort(author_ids, kind='stable')
+rows_of_author = np.split(order, np.cumsum(np.bincount(author_ids, minlength=len(authors)))[:-1])
+
+# Filenames go on the y axis in the order the authors' points reach them
+seen, first_row = np.unique(file_ids[order], return_index=True)
+files_in_order = seen[np.argsort(first_row)]
+position = np.empty(len(touches.files), dtype=np.int64)
+position[files_in_order] = np.arange(len(files_in_order))
+
 # Create a scatter plot
 plt.figure(figsize=(12, 8))
 
-for author, color in color_map.items():
-    author_data = data[data['Author'] == author]
-    plt.scatter(author_data['Week'], author_data['Filename'], color=color, label=author, alpha=0.6)
+for (author, color), rows in zip(color_map.items(), rows_of_author):
+    plt.scatter(week[rows], position[file_ids[rows]], color=color, label=author, alpha=0.6)
+plt.yticks(range(len(files_in_order)), [touches.files[i] for i in files_in_order])
 
 # Set x-axis limits and ticks
 plt.xlim(0, 250)
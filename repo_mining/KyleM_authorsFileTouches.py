@@ -1,50 +1,30 @@
-import json
-import requests
 import csv
 
 import os
+from github_api import API_URL, commit_files, commit_pages, get_client, github_auth
+from mining_pipeline import FileMatcher
 
 if not os.path.exists("KyleM_data"):
  os.makedirs("KyleM_data")
 
-# GitHub Authentication function
-def github_auth(url, lsttoken, ct):
-    jsonData = None
-    try:
-        ct = ct % len(lstTokens)
-        headers = {'Authorization': 'Bearer {}'.format(lsttoken[ct])}
-        request = requests.get(url, headers=headers)
-        jsonData = json.loads(request.content)
-        ct += 1
-    except Exception as e:
-        pass
-        print(e)
-    return jsonData, ct
-
 # @dictFiles, empty dictionary of files
 # @lstTokens, GitHub authentication tokens
 # @repo, GitHub repo
 def countfiles(lsttokens, repo):
-    ipage = 1  # url page counter
     ct = 0  # token counter
+    source_ext = FileMatcher(['.java','.kt','.cpp','.h'])  # compiled once, not per file
 
     try:
-        # loop though all the commit pages until the last returned empty page
-        while True:
-            spage = str(ipage)
-            commitsUrl = 'https://api.github.com/repos/' + repo + '/commits?page=' + spage + '&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
-
-            # break out of the while loop if there are no more commits in the pages
-            if len(jsonCommits) == 0:
-                break
-            # iterate through the list of commits in  spage
+        # loop though the commit pages up to the last one named by the Link header,
+        # the pages after the current one are requested ahead
+        for ipage, jsonCommits in commit_pages(repo, lsttokens):
+            # iterate through the list of commits in  ipage
             for shaObject in jsonCommits:
                 sha = shaObject['sha']
                 # For each commit, use the GitHub commit API to extract the files touched by the commit
-                shaUrl = 'https://api.github.com/repos/' + repo + '/commits/' + sha
+                shaUrl = API_URL + '/repos/' + repo + '/commits/' + sha
                 shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                filesjson = shaDetails['files']
+                filesjson = commit_files(repo, shaDetails, lsttokens)  # all pages of big commits
                 
                 for filenameObj in filesjson:
                     filename = filenameObj['filename']
@@ -53,15 +33,11 @@ def countfiles(lsttokens, repo):
                     date = shaDetails['commit']['author']['date']
                     
                     
-                    source_ext = ['.java','.kt','.cpp','.h']
+                    if source_ext(filename):
+                        writer.writerow([filename, author, date])
+                        print(filename + " : " + author + " : " + date)
                     
-                    for ext in source_ext:
-                    	if filename.endswith(ext):
-                    		writer.writerow([filename, author, date])
-                    		print(filename + " : " + author + " : " + date)
                     
-                    
-            ipage += 1
     except:
         print("Error receiving data")
         exit(0)
@@ -93,3 +69,7 @@ writer.writerow(rows)
 countfiles(lstTokens, repo)
 
 fileCSV.close()
+
+# how much each token was used and how much of its rate limit is left
+for token, usage in get_client().scheduler.stats().items():
+    print(token + ': ' + str(usage))
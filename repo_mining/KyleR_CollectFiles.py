@@ -1,60 +1,54 @@
 # I did not use this directly in my authorsFileTouches
 
-import json
-import requests
 import csv
 
 import os
+from github_api import WORKERS, commit_files, commit_pages, fetch_commit_details, github_auth
+from mining_pipeline import CrawlJournal
 
 if not os.path.exists("data"):
  os.makedirs("data")
 
-# GitHub Authentication function
-def github_auth(url, lsttoken, ct):
-    jsonData = None
-    try:
-        ct = ct % len(lstTokens)
-        headers = {'Authorization': 'Bearer {}'.format(lsttoken[ct])}
-        request = requests.get(url, headers=headers)
-        jsonData = json.loads(request.content)
-        ct += 1
-    except Exception as e:
-        pass
-        print(e)
-    return jsonData, ct
-
 # @dictFiles, empty dictionary of files
 # @lstTokens, GitHub authentication tokens
 # @repo, GitHub repo
-def countfiles(dictfiles, lsttokens, repo):
+# @workers, number of commit details fetched concurrently
+# @journal, CrawlJournal to resume from and record progress in
+def countfiles(dictfiles, lsttokens, repo, workers=WORKERS, journal=None):
     ipage = 1  # url page counter
     ct = 0  # token counter
+    if journal and journal.resumed:
+        # pick up the page and counts of the run that stopped
+        ipage = journal.page
+        dictfiles.update(journal.data)
 
     try:
-        # loop though all the commit pages until the last returned empty page
-        while True:
-            spage = str(ipage)
-            commitsUrl = 'https://api.github.com/repos/' + repo + '/commits?page=' + spage + '&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
-
-            # break out of the while loop if there are no more commits in the pages
-            if len(jsonCommits) == 0:
-                break
-            # iterate through the list of commits in  spage
-            for shaObject in jsonCommits:
-                sha = shaObject['sha']
-                # For each commit, use the GitHub commit API to extract the files touched by the commit
-                shaUrl = 'https://api.github.com/repos/' + repo + '/commits/' + sha
-                shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                filesjson = shaDetails['files']
+        # loop though the commit pages up to the last one named by the Link header,
+        # the pages after the current one are requested ahead
+        for ipage, jsonCommits in commit_pages(repo, lsttokens, workers, start=ipage):
+            # For each commit, use the GitHub commit API to extract the files touched by the commit
+            # (up to `workers` detail requests are in flight at once, results keep the page order)
+            shas = [shaObject['sha'] for shaObject in jsonCommits]
+            if journal:
+                # commits a previous run already counted are not fetched again
+                shas = [sha for sha in shas if sha not in journal.shas]
+            lstDetails, ct = fetch_commit_details(github_auth, repo, shas, lsttokens, ct, workers)
+            # iterate through the list of commits in  ipage
+            for shaDetails in lstDetails:
+                filesjson = commit_files(repo, shaDetails, lsttokens, workers)  # all pages of big commits
                 for filenameObj in filesjson:
                     filename = filenameObj['filename']
                     dictfiles[filename] = dictfiles.get(filename, 0) + 1
                     print(filename)
-            ipage += 1
+                if journal:
+                    journal.done(shaDetails['sha'], dictfiles)
+            if journal:
+                journal.next_page(ipage + 1, dictfiles)
     except:
         print("Error receiving data")
         exit(0)
+    if journal:
+        journal.finish()
 # GitHub repo
 repo = 'scottyab/rootbeer'
 # repo = 'Skyscanner/backpack' # This repo is commit heavy. It takes long to finish executing
@@ -69,7 +63,9 @@ repo = 'scottyab/rootbeer'
 lstTokens = [""]
 
 dictfiles = dict()
-countfiles(dictfiles, lstTokens, repo)
+# progress is journaled so a crashed or rate limited run resumes where it stopped
+journal = CrawlJournal('KyleR_data/journal_' + repo.split('/')[1] + '.json')
+countfiles(dictfiles, lstTokens, repo, journal=journal)
 print('Total number of files: ' + str(len(dictfiles)))
 
 file = repo.split('/')[1]
@@ -1,64 +1,59 @@
-import json
-import requests
 import csv
 
 import os
+from github_api import API_URL, commit_files, commit_pages, github_auth
+from mining_pipeline import CrawlJournal, FileMatcher
 
 # if not os.path.exists("data"):
 #  os.makedirs("data")
 
-extensions = ['.java', '.kt', '.cpp', '.c', '.h', '.cmake']
-
-# GitHub Authentication function
-def github_auth(url, lsttoken, ct):
-    jsonData = None
-    try:
-        ct = ct % len(lstTokens)
-        headers = {'Authorization': 'Bearer {}'.format(lsttoken[ct])}
-        request = requests.get(url, headers=headers)
-        jsonData = json.loads(request.content)
-        ct += 1
-    except Exception as e:
-        pass
-        print(e)
-    return jsonData, ct
+extensions = FileMatcher(['.java', '.kt', '.cpp', '.c', '.h', '.cmake'])
 
 # writes authors, dates, commits to a csv file (writer)
 # mostly taken from countfiles
-def writeAuthorsFiles(writer, lsttokens, repo):
+# with a journal (and the fileCSV behind writer) progress is saved as the page, the
+# processed shas and how many bytes of the csv belong to them
+def writeAuthorsFiles(writer, lsttokens, repo, journal=None, fileCSV=None):
     ipage = 1  # url page counter
     ct = 0  # token counter
+    if journal and journal.resumed:
+        ipage = journal.page
 
-    try:
-        # loop though all the commit pages until the last returned empty page
-        while True:
-            spage = str(ipage)
-            commitsUrl = 'https://api.github.com/repos/' + repo + '/commits?page=' + spage + '&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
+    def written():
+        fileCSV.flush()
+        return fileCSV.tell()
 
-            # break out of the while loop if there are no more commits in the pages
-            if len(jsonCommits) == 0:
-                break
-            # iterate through the list of commits in  spage
+    try:
+        # loop though the commit pages up to the last one named by the Link header,
+        # the pages after the current one are requested ahead
+        for ipage, jsonCommits in commit_pages(repo, lsttokens, start=ipage):
+            # iterate through the list of commits in  ipage
             for shaObject in jsonCommits:
                 sha = shaObject['sha']
+                if journal and sha in journal.shas:
+                    continue
                 # For each commit, use the GitHub commit API to extract the files touched by the commit
-                shaUrl = 'https://api.github.com/repos/' + repo + '/commits/' + sha
+                shaUrl = API_URL + '/repos/' + repo + '/commits/' + sha
                 shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                filesjson = shaDetails['files']
+                filesjson = commit_files(repo, shaDetails, lsttokens)  # all pages of big commits
 
                 author = shaObject['commit']['author']['name']
                 date = shaObject['commit']['author']['date']
 
                 for filenameObj in filesjson:
                     filename = filenameObj['filename']
-                    if any(filename.endswith(ext) for ext in extensions):
+                    if extensions(filename):
                         writer.writerow([author, filename, date])
                         print(filename, author, date)
-            ipage += 1
+                if journal:
+                    journal.done(sha, written)
+            if journal:
+                journal.next_page(ipage + 1, written)
     except:
         print("Error receiving data")
         exit(0)
+    if journal:
+        journal.finish()
 
 
 
@@ -86,6 +81,13 @@ file = repo.split('/')[1]
 # change this to the path of your file
 fileOutput = 'KyleR_data/authorsFiles_' + file + '.csv'
 rows = ["Filename", "Author", "Date"]
-fileCSV = open(fileOutput, 'w')
+journal = CrawlJournal('KyleR_data/journal_' + file + '.json')
+if journal.resumed:
+    # keep the rows of the commits the journal knows about, drop anything written after that
+    fileCSV = open(fileOutput, 'r+')
+    fileCSV.truncate(journal.data)
+    fileCSV.seek(journal.data)
+else:
+    fileCSV = open(fileOutput, 'w')
 writer = csv.writer(fileCSV)
-writeAuthorsFiles(writer, lstTokens, repo)
+writeAuthorsFiles(writer, lstTokens, repo, journal, fileCSV)
@@ -1,99 +1,52 @@
-import json
-import requests
-import csv
 
 import os
+from github_api import API_URL, commit_files, commit_pages, github_auth
+from languages import LOCAL_LANGUAGES, get_resolver
+from mining_pipeline import FileMatcher, TouchSpool
+from touch_store import TouchStore
 
 if not os.path.exists("data"):
  os.makedirs("data")
 
-# GitHub Authentication function
-def github_auth(url, token_list, current_token_index):
-
-   # Function to authenticate with GitHub API using a list of tokens.
-    
-   # Args:
-   #     url (str): The GitHub API URL to make the request to.
-   #    token_list (list): A list of authentication tokens.
-   #     current_token_index (int): The current index of the token being used.
-        
-   # Returns:
-   #     tuple: Contains the JSON response data (if available) and the updated token index.
-
-    json_data = None  # Initialize the response data
-    try:
-        # Cycle through the list of tokens using modulus to avoid index out of range
-        current_token_index = current_token_index % len(token_list)
-        
-        # Set up the authorization header using the current token
-        headers = {'Authorization': f'Bearer {token_list[current_token_index]}'}
-        
-        # Make the request to the GitHub API
-        response = requests.get(url, headers=headers)
-        
-        # Parse the response content as JSON
-        json_data = response.json()
-        
-        # Increment the token index for the next call
-        current_token_index += 1
-    except Exception as e:
-        # Handle any exceptions, e.g., network errors
-        print(f"An error occurred: {e}")
-    
-    # Return the response data and the updated token index
-    return json_data, current_token_index
-
 # Mapping of Language to Extension Type
 mapping = {'Java': ['.java'],'Kotlin': ['.kt'],'C++': ['.cpp', '.h'],'C': ['.c', '.h'],'CMake': ['.cmake', 'CMakeLists.txt']}
 
-# Getting Languages Used in Repo
-def get_languages(repo, lsttokens):
-    url = 'https://api.github.com/repos/' + repo + '/languages'
-    languages, _ = github_auth(url,lsttokens,0)
-    return languages.keys()
+# Getting Languages Used in Repo (cached for GITHUB_LANGUAGES_TTL seconds, see languages.py),
+# told from the paths in files with the built-in language table instead when they are given
+def get_languages(repo, lsttokens, files=None):
+    return get_resolver().languages(repo, lsttokens, files)
 
 # Checking extension Type and Seeing if it Matches Language Mapping
 def check_extension(language):
-    extension = []
-    for x in language:
-        if x in mapping:
-            extension += mapping[x]
-    return extension
+    return get_resolver().patterns(language, mapping)
 
-# @dictFiles, empty dictionary of files
+# @touches, TouchSpool the (file, author, date) rows are streamed to
 # @lstTokens, GitHub authentication tokens
 # @repo, GitHub repo
-def countfiles(dictfiles, lsttokens, repo, get_extension):
-    ipage = 1  # url page counter
+def countfiles(touches, lsttokens, repo, get_extension):
     ct = 0  # token counter
+    is_source = FileMatcher(get_extension)  # CMakeLists.txt is matched by exact file name
 
     try:
-        # loop though all the commit pages until the last returned empty page
-        while True:
-            spage = str(ipage)
-            commitsUrl = 'https://api.github.com/repos/' + repo + '/commits?page=' + spage + '&per_page=100'
-            jsonCommits, ct = github_auth(commitsUrl, lsttokens, ct)
-
-            # break out of the while loop if there are no more commits in the pages
-            if len(jsonCommits) == 0:
-                break
-            # iterate through the list of commits in  spage
+        # loop though the commit pages up to the last one named by the Link header,
+        # the pages after the current one are requested ahead
+        for ipage, jsonCommits in commit_pages(repo, lsttokens):
+            # iterate through the list of commits in  ipage
             for commit in jsonCommits:
                 sha = commit['sha']
                 author = commit['commit']['author']['name']
                 date = commit['commit']['author']['date']
                 # For each commit, use the GitHub commit API to extract the files touched by the commit
-                shaUrl = 'https://api.github.com/repos/' + repo + '/commits/' + sha
+                shaUrl = API_URL + '/repos/' + repo + '/commits/' + sha
                 shaDetails, ct = github_auth(shaUrl, lsttokens, ct)
-                filesjson = shaDetails['files']
+                filesjson = commit_files(repo, shaDetails, lsttokens)  # all pages of big commits
                 for filenameObj in filesjson:
                     filename = filenameObj['filename']
                     # If A Source File from Listed Mapping add to Dictionary
-                    if any(filename.endswith(ext) for ext in get_extension):
-                        dictfiles[filename] = dictfiles.get(filename, []) + [(author,date)]
+                    if is_source(filename):
+                        touches.write(filename, author, date)
                         # Print Matching Iterations
                         print(f"File: {filename}, Author: {author}, Date {date}")
-            ipage += 1
     except:
         print("Error receiving data")
         exit(0)
@@ -110,23 +63,22 @@ repo = 'scottyab/rootbeer'
 lstTokens = [""]
 
 # Calling Functions and Saving Results
-get_languages = get_languages(repo,lstTokens)
-get_extensions = check_extension(get_languages)
-
-dictfiles = {}
-countfiles(dictfiles, lstTokens, repo, get_extensions)
-
+# GITHUB_LANGUAGES=local skips the languages request, every mapped language is kept
+if LOCAL_LANGUAGES:
+    get_extensions = check_extension(mapping)
+else:
+    get_extensions = check_extension(get_languages(repo,lstTokens))
 
 file = repo.split('/')[1]
+touches = TouchSpool('data/Peyton_touches_' + file + '.spool')
+countfiles(touches, lstTokens, repo, get_extensions)
+
 # change this to the path of your file
 fileOutput = 'data/Peyton_authorsTouches.csv'
-rows = ["Filename", "Author", "Date"]
-
-# Saving to CSV selected Extension Types
-with open(fileOutput, 'w') as fileCSV:
-    writer = csv.writer(fileCSV)
-    writer.writerow(rows)
 
-    for filename, touches in dictfiles.items():
-        for author, date in touches:
-            writer.writerow([filename, author, date])
\ No newline at end of file
+# Saving to CSV selected Extension Types, grouped by file in the order they were first seen
+touches.write_csv(fileOutput)
+touches.close()
+if LOCAL_LANGUAGES:
+    # Languages of the mined files, cached like the API answer
+    print("Languages:", get_languages(repo, lstTokens, TouchStore.read_csv(fileOutput).files))
\ No newline at end of file
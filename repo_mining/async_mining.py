@@ -0,0 +1,434 @@
+import asyncio
+import gzip
+import ssl
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from github_api import API_URL, COMMIT_URL, FILES_PER_PAGE, WORKERS, cached_response, get_client, last_page
+from mining_pipeline import commit_record, mine
+
+try:
+    import aiohttp
+except ImportError:  # optional, the asyncio streams client below does the same job
+    aiohttp = None
+
+# asyncio version of walk_commits + mine, picked with mine_repo(..., asynchronous=True).
+#
+# The requests go out on non-blocking connections, through aiohttp when it is
+# installed and otherwise through the small HTTP/1.1 client on asyncio streams
+# below (keep-alive, gzip, Content-Length and chunked bodies). The shared
+# GitHubClient still hands out the tokens (TokenScheduler) and answers from its
+# CommitCache / ETagStore, so sync and async runs share the rate limit budget and
+# the caches. On top of that:
+#   - every request takes a slot of one semaphore, at most `concurrency` in flight,
+#   - the commit list pages after the first are requested up to `concurrency`
+#     pages ahead, and the commit details up to 2 * `concurrency` commits ahead of
+#     the one being mined, across page boundaries,
+#   - the file pages of big commits are streamed page by page like commit_files,
+#   - commit records go through a bounded queue to the aggregators (the sink),
+#     which run on a thread of their own, so the walk runs ahead of slow CSV/spool
+#     writes by at most queue_size records and then waits for them.
+# Records come out in the same order as walk_commits, so the outputs are the same.
+
+QUEUE_SIZE = 1000
+USER_AGENT = 'repo-mining-asyncio'
+
+
+def as_response(url, status, headers, content):
+    # a requests.Response around a finished answer, so last_page(), .links, .json(),
+    # raise_for_status() and the TokenScheduler / ETagStore work on it unchanged
+    response = requests.Response()
+    response.status_code = status
+    response.url = url
+    response.headers = headers
+    response._content = content
+    return response
+
+
+async def read_response(reader, method):
+    """
+    Reads one HTTP/1.1 response from a stream.
+
+    Returns:
+    - status (int), headers (CaseInsensitiveDict), content (bytes, decoded if gzip/deflate),
+      keep_alive (bool): whether the connection can take the next request.
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed before the response')
+    version, status = status_line.split(None, 2)[:2]
+    status = int(status)
+    headers = CaseInsensitiveDict()
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip(), value.strip()
+        headers[name] = headers[name] + ', ' + value if name in headers else value
+    connection = headers.get('Connection', '').lower()
+    keep_alive = connection != 'close' if version == b'HTTP/1.1' else connection == 'keep-alive'
+
+    if method == 'HEAD' or status in (204, 304):
+        content = b''
+    elif 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                while await reader.readline() not in (b'\r\n', b'\n', b''):
+                    pass  # trailers
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        content = b''.join(chunks)
+    elif 'Content-Length' in headers:
+        content = await reader.readexactly(int(headers['Content-Length']))
+    else:
+        content = await reader.read()  # the body ends with the connection
+        keep_alive = False
+
+    encoding = headers.get('Content-Encoding', '').lower()
+    if encoding == 'gzip':
+        content = gzip.decompress(content)
+    elif encoding == 'deflate':
+        content = zlib.decompress(content)
+    return status, headers, content, keep_alive
+
+
+class StreamTransport:
+    """
+    Minimal HTTP/1.1 client on asyncio streams.
+
+    Idle keep-alive connections are kept per (scheme, host, port) and reused, a new
+    one is opened when none is idle, so there are never more connections than
+    requests in flight. A request on a reused connection the server has closed in
+    the meantime is sent again on a new one.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.idle = {}
+        self.ssl = None
+
+    async def connect(self, scheme, host, port):
+        if scheme == 'https' and self.ssl is None:
+            self.ssl = ssl.create_default_context()
+        return await asyncio.open_connection(host, port, ssl=self.ssl if scheme == 'https' else None)
+
+    async def request(self, method, url, headers, body=None):
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        lines = [method + ' ' + (parts.path or '/') + ('?' + parts.query if parts.query else '') + ' HTTP/1.1',
+                 'Host: ' + parts.netloc]
+        lines += [name + ': ' + value for name, value in headers.items()]
+        if body is not None:
+            lines.append('Content-Length: ' + str(len(body)))
+        data = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b'')
+
+        while True:
+            idle = self.idle.get(key)
+            reused = bool(idle)
+            reader, writer = idle.pop() if reused else await self.connect(*key)
+            try:
+                writer.write(data)
+                await writer.drain()
+                status, response_headers, content, keep_alive = await read_response(reader, method)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+            except BaseException:
+                writer.close()  # half read, or cancelled: the connection cannot be reused
+                raise
+        if keep_alive and len(self.idle.setdefault(key, [])) < self.limit:
+            self.idle[key].append((reader, writer))
+        else:
+            writer.close()
+        return as_response(url, status, response_headers, content)
+
+    async def close(self):
+        for connections in self.idle.values():
+            for _, writer in connections:
+                writer.close()
+        self.idle = {}
+
+
+class AiohttpTransport:
+    # the same request() on an aiohttp session, used when aiohttp is installed
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.session = None
+
+    async def request(self, method, url, headers, body=None):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit))
+        async with self.session.request(method, url, headers=headers, data=body) as answer:
+            content = await answer.read()  # gzip is decoded by aiohttp
+            return as_response(url, answer.status, CaseInsensitiveDict(answer.headers), content)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncClient:
+    """
+    Async counterpart of GitHubClient with a bound on the requests in flight.
+
+    Parameters:
+    - lsttokens (list): GitHub API tokens.
+    - concurrency (int): Requests in flight at once.
+    - transport: Object with async request(method, url, headers, body) and close(),
+      defaults to AiohttpTransport when aiohttp is installed, else StreamTransport.
+    """
+
+    def __init__(self, lsttokens, concurrency=WORKERS, transport=None):
+        self.lsttokens = lsttokens
+        self.concurrency = max(concurrency, 1)
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.shared = get_client()
+        if transport is None:
+            transport = (AiohttpTransport if aiohttp is not None else StreamTransport)(self.concurrency)
+        self.transport = transport
+
+    async def send(self, method, url, headers=None, body=None):
+        # like GitHubClient.send: the token with the most rate limit left, again with the next one when refused
+        scheduler = self.shared.scheduler
+        async with self.semaphore:
+            while True:
+                token, wait = scheduler.try_pick(self.lsttokens)
+                if token is None:
+                    print('All tokens are rate limited, sleeping ' + str(int(wait) + 1) + ' seconds')
+                    await asyncio.sleep(max(wait, 0) + 1)
+                    continue
+                request_headers = {'Authorization': 'Bearer ' + token, 'Accept': 'application/vnd.github+json',
+                                   'Accept-Encoding': 'gzip', 'User-Agent': USER_AGENT}
+                request_headers.update(headers or {})
+                response = await self.transport.request(method, url, request_headers, body)
+                if not scheduler.update(token, response):
+                    return response
+
+    async def get(self, url):
+        """
+        Sends a GET request, answered from the shared client's caches like GitHubClient.get_with_tokens.
+
+        Returns:
+        - response (requests.Response): The response, or a cached commit detail / 304'd body.
+        """
+        cache, etags = self.shared.cache, self.shared.etags
+        match = COMMIT_URL.search(url) if cache else None
+        if match:
+            body = cache.get(match.group(1))
+            if body is not None:
+                return cached_response(url, body)
+            response = await self.send('GET', url)
+            if response.status_code == 200:
+                cache.put(match.group(1), response.content)
+            return response
+        entry = etags.get(url) if etags is not None else None
+        response = await self.send('GET', url, entry['conditions'] if entry else None)
+        if entry is not None and response.status_code == 304:
+            etags.hit(url)
+            return cached_response(url, entry['body'], entry['headers'])
+        if etags is not None and response.status_code == 200:
+            etags.put(url, response, changed=entry is not None)
+        return response
+
+    async def github_auth(self, url):
+        # async github_auth: the parsed JSON, or None (and the error printed) when the request fails
+        try:
+            response = await self.get(url)
+            return response.json()
+        except Exception as e:
+            print(e)
+            return None
+
+    async def close(self):
+        await self.transport.close()
+
+
+async def ahead_of(items, count, make):
+    # make(item) for every item of an async iterable, results in order, up to `count` of them running ahead
+    pending = deque()
+    try:
+        async for item in items:
+            pending.append(asyncio.ensure_future(make(item)))
+            if len(pending) >= count:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+        await items.aclose()
+
+
+async def numbers(first, last):
+    for number in range(first, last + 1):
+        yield number
+
+
+async def commit_pages_async(repo, client, start=1):
+    """
+    Yields the commit list pages of a repo in page order, like github_api.commit_pages.
+
+    The first page names the last one in its Link header, the pages after it are
+    then requested up to client.concurrency pages ahead of the one being yielded.
+    """
+    async def fetch(page):
+        response = await client.get(API_URL + '/repos/' + repo + '/commits?page=' + str(page) + '&per_page=100')
+        response.raise_for_status()
+        return response
+
+    response = await fetch(start)
+    commits = response.json()
+    last = last_page(response)
+    if commits:
+        yield commits
+    if last is None:
+        return
+    async for response in ahead_of(numbers(start + 1, last), client.concurrency, fetch):
+        commits = response.json()
+        if not commits:
+            return
+        yield commits
+
+
+async def commit_file_pages(repo, shaDetails, client):
+    """
+    Yields the file lists of a commit page by page, like github_api.commit_files.
+
+    Page 2 gives the last page in its Link header, pages 3..last are requested up to
+    client.concurrency pages ahead, so a big commit is never held in memory at once.
+    """
+    yield shaDetails['files']
+    if len(shaDetails['files']) < FILES_PER_PAGE:
+        return
+    url = API_URL + '/repos/' + repo + '/commits/' + shaDetails['sha'] + '?page='
+
+    async def fetch(page):
+        response = await client.get(url + str(page))
+        response.raise_for_status()
+        return response
+
+    response = await fetch(2)
+    yield response.json()['files']
+    last = last_page(response)
+    if last is None:
+        return
+    async for response in ahead_of(numbers(3, last), client.concurrency, fetch):
+        yield response.json()['files']
+
+
+async def walk_commits_async(repo, client, shas=None):
+    """
+    Yields one record per commit of the repo, newest first, like mining_pipeline.walk_commits.
+
+    The commit details are requested up to 2 * client.concurrency commits ahead of the
+    one being yielded, the next list pages while the current one is still being mined.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - client (AsyncClient): Client the requests go through.
+    - shas (list): Only these commits, in this order (e.g. from github_api.compare_commits),
+      instead of every commit of the commit list.
+    """
+    async def every_sha():
+        if shas is not None:
+            for sha in shas:
+                yield sha
+            return
+        async for commits in commit_pages_async(repo, client):
+            for shaObject in commits:
+                yield shaObject['sha']
+
+    async def detail(sha):
+        shaDetails = await client.github_auth(API_URL + '/repos/' + repo + '/commits/' + sha)
+        if not shaDetails or 'files' not in shaDetails:
+            raise RuntimeError('could not fetch commit ' + sha + ' of ' + repo)
+        return shaDetails
+
+    async for shaDetails in ahead_of(every_sha(), 2 * client.concurrency, detail):
+        # one record per page of files, numbered on from the records of the pages before
+        part = 0
+        async for files in commit_file_pages(repo, shaDetails, client):
+            for record in commit_record(shaDetails, files, part):
+                yield record
+            part += 1
+
+
+async def mine_async(commits, aggregators, queue_size=QUEUE_SIZE):
+    """
+    Feeds every commit record to every aggregator, like mining_pipeline.mine.
+
+    The records are put in a queue of queue_size by one task and taken out by the
+    sink, which hands what has piled up to mine() on a thread of its own, so the
+    requests go on while the aggregators write, and the walk blocks when it gets
+    queue_size records ahead of them.
+
+    Parameters:
+    - commits (async iterable): Commit records, e.g. from walk_commits_async.
+    - aggregators (list): Objects with an add(commit) method.
+    - queue_size (int): Records the walk may be ahead of the aggregators.
+
+    Returns:
+    - count (int): Number of commits visited.
+    """
+    queue = asyncio.Queue(maxsize=queue_size)
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    async def produce():
+        try:
+            async for commit in commits:
+                await queue.put(commit)
+        finally:
+            await queue.put(None)
+
+    async def sink():
+        count = 0
+        while True:
+            batch = [await queue.get()]
+            while not queue.empty():
+                batch.append(queue.get_nowait())
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            count += await loop.run_in_executor(executor, mine, batch, aggregators)
+            if done:
+                return count
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        count = await sink()
+        await producer  # raises the walk's error, if it stopped on one
+        return count
+    finally:
+        producer.cancel()
+        executor.shutdown()
+
+
+def mine_commits(repo, lsttokens, aggregators, concurrency=WORKERS, shas=None, queue_size=QUEUE_SIZE):
+    """
+    Runs walk_commits_async into mine_async on a new event loop, for the synchronous scripts.
+
+    Returns:
+    - count (int): Number of commits visited.
+    """
+    async def run():
+        client = AsyncClient(lsttokens, concurrency)
+        try:
+            return await mine_async(walk_commits_async(repo, client, shas), aggregators, queue_size)
+        finally:
+            await client.close()
+
+    return asyncio.run(run())
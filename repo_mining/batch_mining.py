@@ -0,0 +1,95 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from github_api import WORKERS, FairPool, get_client
+from languages import LOCAL_LANGUAGES, get_resolver
+from mining_pipeline import mine_repo
+
+# Batch mode: mines several repos at once instead of running a script per repo by hand.
+# All repos share one FairPool of workers and the client's token budget, and the
+# pool takes turns between the repos so the small ones finish without waiting for
+# a commit heavy one.
+
+
+def mine_repos(repos, lsttokens, extensions, outdir, workers=WORKERS, mapping=None, local_languages=LOCAL_LANGUAGES):
+    """
+    Mines every repo with mine_repo over a shared worker pool and writes per-repo outputs.
+
+    Each repo is walked by its own thread (which mostly waits), the commit list, commit
+    detail and file page requests of all repos run on the same `workers` threads, one
+    repo at a time in turn.
+
+    With a language mapping, each repo keeps the patterns of its own languages instead
+    of `extensions`. The languages come from the cached /repos/{repo}/languages answer,
+    or with local_languages from the paths mined with every mapped language, classified
+    with the built-in table. All repos share one resolver, table and compiled matchers.
+
+    Parameters:
+    - repos (list): GitHub repositories in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens, shared by all repos.
+    - extensions (list): File endings to keep.
+    - outdir (str): Directory for the file_, authors_dates_ and checkpoint_ files of each repo.
+    - workers (int): Number of requests in flight at once, across all repos.
+    - mapping (dict): Language -> patterns (extensions and file names) to keep.
+    - local_languages (bool): Classify the mined paths instead of asking for the languages.
+
+    Returns:
+    - report (dict): Total 'seconds' and 'requests', and 'repos' -> {'seconds', 'files'} per repo
+      ('languages' too with a mapping).
+    """
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    pool = FairPool(workers)
+    requests_before = sum(state['requests'] for state in get_client().scheduler.stats().values())
+    start = time.perf_counter()
+
+    resolver = get_resolver()
+
+    def mine_one(repo):
+        name = repo.split('/')[1]
+        languages = None
+        if mapping is not None:
+            languages = list(mapping) if local_languages else resolver.languages(repo, lsttokens)
+        store = mine_repo(repo, lsttokens, extensions if mapping is None else resolver.matcher(languages, mapping),
+                          os.path.join(outdir, 'file_' + name + '.csv'),
+                          os.path.join(outdir, 'authors_dates_' + name + '.csv'),
+                          os.path.join(outdir, 'checkpoint_' + name + '.json'),
+                          workers=workers, pool=pool.queue(repo))
+        result = {'seconds': time.perf_counter() - start, 'files': len(store.files)}
+        if mapping is not None:
+            result['languages'] = resolver.languages(repo, lsttokens, store.files) if local_languages else languages
+        return result
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(repos)) as executor:
+            results = dict(zip(repos, executor.map(mine_one, repos)))
+    finally:
+        pool.shutdown()
+
+    stats = get_client().scheduler.stats()
+    return {
+        'seconds': time.perf_counter() - start,
+        'requests': sum(state['requests'] for state in stats.values()) - requests_before,
+        'repos': results,
+    }
+
+
+# GitHub repos to mine, the commit heavy ones no longer hold up the rest
+repos = ['scottyab/rootbeer', 'Skyscanner/backpack', 'k9mail/k-9', 'mendhak/gpslogger']
+
+# put your tokens here
+# Remember to empty the list when going to commit to GitHub.
+# Otherwise they will all be reverted and you will have to re-create them
+# I would advise to create more than one token for repos with heavy commits
+lstTokens = [""]
+
+# Source file extensions, same list the *_authorsFileTouches.py scripts use
+extensions = ['.java', '.kt', '.cpp', '.c', '.cmake']
+
+if __name__ == "__main__":
+    report = mine_repos(repos, lstTokens, extensions, 'batch_data')
+    for repo, result in report['repos'].items():
+        print(f"{repo}: done after {result['seconds']:.1f}s, {result['files']} files")
+    print(f"{len(repos)} repos in {report['seconds']:.1f}s, "
+          f"{report['requests'] / report['seconds']:.1f} requests/sec over all repos")
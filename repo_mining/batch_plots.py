@@ -0,0 +1,80 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Brandon_scatterplot import plot_scatter
+from Eric_scatterplot import create_plot
+from touch_store import load_touches
+
+# Batch mode for the scatterplots: renders the plots of many authors_dates CSVs
+# without pyplot, so nothing opens a window or blocks on plt.show(), and the
+# repos can be spread over a process pool. Every plot is drawn on its own
+# matplotlib Figure and written by Agg (PNG) or the SVG backend.
+
+
+def render_repo(fileInput, outdir, style='eric', formats=('png',)):
+    """
+    Renders the plot(s) of one authors_dates CSV into outdir.
+
+    Parameters:
+    - fileInput (str): authors_dates CSV written by mine_repo (the .touches next to it is used when current).
+    - outdir (str): Directory for the images, named after the CSV.
+    - style (str): 'eric' for Eric_scatterplot.create_plot, 'brandon' for Brandon_scatterplot.plot_scatter
+      (plot and filename legend).
+    - formats (tuple): Image formats to write, e.g. ('png', 'svg').
+
+    Returns:
+    - seconds (float): Time spent loading and rendering.
+    """
+    start = time.perf_counter()
+    touches = load_touches(fileInput)
+    stem = os.path.join(outdir, os.path.splitext(os.path.basename(fileInput))[0])
+    if style == 'eric':
+        stems = [stem + '_plot']
+        figures = [create_plot(touches, stems[0] + '.' + formats[0])]
+    elif style == 'brandon':
+        stems = [stem + '_scatter', stem + '_legend']
+        figures = plot_scatter(touches, stems[0] + '.' + formats[0], stems[1] + '.' + formats[0])
+    else:
+        raise ValueError(f"Unknown plot style: {style}")
+    # the first format was written by the plot function, the others reuse the drawn figure
+    for figure, figure_stem in zip(figures, stems):
+        for image_format in formats[1:]:
+            figure.savefig(figure_stem + '.' + image_format)
+    return time.perf_counter() - start
+
+
+def render_repos(inputs, outdir, style='eric', formats=('png',), workers=None):
+    """
+    Renders every CSV in inputs with render_repo, over a process pool.
+
+    Parameters:
+    - inputs (list): authors_dates CSV paths.
+    - outdir (str): Directory for all the images.
+    - style (str): Plot style, see render_repo.
+    - formats (tuple): Image formats to write.
+    - workers (int): Worker processes, os.cpu_count() by default, 1 renders in this process.
+
+    Returns:
+    - report (dict): Total 'seconds' and 'repos' -> seconds per CSV.
+    """
+    if not os.path.exists(outdir):
+        os.makedirs(outdir)
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    args = (list(inputs), [outdir] * len(inputs), [style] * len(inputs), [formats] * len(inputs))
+    if workers == 1:
+        results = list(map(render_repo, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(render_repo, *args))
+    return {'seconds': time.perf_counter() - start, 'repos': dict(zip(inputs, results))}
+
+
+# authors_dates CSVs to plot, e.g. the outputs of batch_mining.py
+inputs = ['batch_data/authors_dates_rootbeer.csv', 'batch_data/authors_dates_backpack.csv',
+          'batch_data/authors_dates_k-9.csv', 'batch_data/authors_dates_gpslogger.csv']
+
+if __name__ == "__main__":
+    report = render_repos(inputs, 'batch_plots', formats=('png', 'svg'))
+    print(f"{len(inputs)} repos plotted in {report['seconds']:.1f}s")
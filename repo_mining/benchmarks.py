@@ -0,0 +1,905 @@
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from urllib.request import Request, urlopen
+
+import requests
+
+from fake_github import FakeGitHub, make_history, write_git_repo
+from github_api import GitHubClient
+from mining_pipeline import TouchSpool, mine, walk_git_log
+from touch_store import PARQUET, TouchStore, format_date, load_touches, store_path
+
+# Timing harness for the mining scripts, run from repo_mining:
+#   python benchmarks.py <name>
+# Every benchmark starts its own fake_github.py server, nothing touches api.github.com.
+# The mining outputs are checked by test_mining.py (python -m pytest), here they are only timed.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# The dict based aggregators mine_repo used before TouchStore, kept as the reference to compare with
+class TouchCounter:
+    # Filename -> number of commits touching it, same as dictfiles from countfiles
+    def __init__(self):
+        self.dictfiles = {}
+
+    def add(self, commit):
+        for filename in commit['files']:
+            self.dictfiles[filename] = self.dictfiles.get(filename, 0) + 1
+
+
+class AuthorDates:
+    # Filename -> list of (author, date), the dict based aggregator TouchStore replaced
+    def __init__(self):
+        self.authors_dates = {}
+
+    def add(self, commit):
+        for filename in commit['files']:
+            if filename not in self.authors_dates:
+                self.authors_dates[filename] = []
+            self.authors_dates[filename].append((commit['author'], commit['date']))
+
+
+def write_authors_dates(authors_dates, fileOutput):
+    # Writes the Filename,Author,Date rows in the order the files were first seen
+    with open(fileOutput, 'w', newline='') as fileCSV:
+        writer = csv.writer(fileCSV)
+        writer.writerow(["Filename", "Author", "Date"])
+        for filename, touches in authors_dates.items():
+            for author, date in touches:
+                writer.writerow([filename, author, date])
+
+
+def run_script(script, fake, extra_env=None):
+    """
+    Runs one of the mining scripts in a scratch directory against the fake server.
+
+    Parameters:
+    - script (str): Script file name inside repo_mining.
+    - fake (FakeGitHub): Running fake server.
+    - extra_env (dict): Extra environment variables for the run.
+
+    Returns:
+    - seconds (float): Wall time of the run.
+    - outdir (str): Scratch directory holding the script's output files.
+    """
+    env = dict(os.environ)
+    env['GITHUB_API_URL'] = fake.url
+    env.update(extra_env or {})
+    outdir = tempfile.mkdtemp(prefix='bench_')
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(HERE, script)], cwd=outdir, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start, outdir
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def bench_concurrent(commits=300, latency=0.02):
+    # countfiles with one request at a time vs a pool of workers
+    fake = FakeGitHub(commits, latency).start()
+    try:
+        results = {}
+        for workers in ['1', '4', '16']:
+            results[workers], _ = run_script('Justin_CollectFiles.py', fake, {'GITHUB_WORKERS': workers})
+    finally:
+        fake.stop()
+
+    print(f"{commits} commits, {latency * 1000:.0f} ms latency per request")
+    for workers, seconds in results.items():
+        print(f"workers={workers:>2}: {seconds:6.2f}s  speedup {results['1'] / seconds:5.1f}x")
+
+
+def bench_pages(sizes=(50, 1000, 1050), latency=0.05):
+    # commit list pages: the last page comes from the Link header, no empty page is requested after it
+    for commits in sizes:
+        fake = FakeGitHub(commits, latency).start()
+        try:
+            pages = -(-commits // 100)
+            print(f"{commits} commits, {pages} list pages, {latency * 1000:.0f} ms latency per request")
+            for label, workers in [('workers=1', '1'), ('workers=8', '8'), ('workers=8 again', '8')]:
+                before = fake.counts.get('list', 0)
+                seconds, _ = run_script('Justin_CollectFiles.py', fake, {'GITHUB_WORKERS': workers, 'GITHUB_CACHE': ''})
+                print(f"    Justin_CollectFiles.py {label:16} {seconds:6.2f}s  "
+                      f"{fake.counts.get('list', 0) - before:3} list requests")
+        finally:
+            fake.stop()
+
+
+def bench_session(requests_count=1000, handshake=0.01):
+    # one new connection per call (old github_auth variants) vs the pooled GitHubClient,
+    # `handshake` seconds are charged per new connection like a TLS setup would be
+    fake = FakeGitHub(200, handshake=handshake).start()
+    urls = [fake.url + '/repos/scottyab/rootbeer/commits/' + c['sha'] for c in fake.history]
+    urls = (urls * (requests_count // len(urls) + 1))[:requests_count]
+    headers = {'Authorization': 'Bearer token'}
+
+    def plain_requests(url):
+        return requests.get(url, headers=headers).content
+
+    def plain_urllib(url):
+        with urlopen(Request(url, headers=headers)) as response:
+            return response.read()
+
+    client = GitHubClient()
+
+    def pooled(url):
+        return client.get(url, 'token').content
+
+    try:
+        for label, get in [('requests.get', plain_requests), ('urllib urlopen', plain_urllib),
+                           ('GitHubClient', pooled)]:
+            connections = fake.counts.get('connections', 0)
+            start = time.perf_counter()
+            for url in urls:
+                get(url)
+            seconds = time.perf_counter() - start
+            connections = fake.counts.get('connections', 0) - connections
+            print(f"{label:15} {requests_count / seconds:8.0f} requests/sec  {connections:5} connections")
+    finally:
+        client.close()
+        fake.stop()
+
+
+def bench_resume(commits=400, latency=0.005, kill_after=2.0):
+    # kill each crawl with SIGKILL part way and rerun it, vs an uninterrupted run
+    # (test_mining.py checks that the outputs match)
+    scripts = [('Justin_CollectFiles.py', 'data/file_rootbeer.csv'),
+               ('Justin_authorsFileTouches.py', 'Justin_data/Justin_authorsTouches.csv'),
+               ('KyleR_authorsFileTouches.py', 'KyleR_data/authorsFiles_rootbeer.csv')]
+    fake = FakeGitHub(commits, latency).start()
+    env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='')
+    try:
+        for script, output in scripts:
+            full = tempfile.mkdtemp(prefix='bench_')
+            crashed = tempfile.mkdtemp(prefix='bench_')
+            for outdir in [full, crashed]:
+                os.makedirs(os.path.join(outdir, os.path.dirname(output)), exist_ok=True)
+            command = [sys.executable, os.path.join(HERE, script)]
+
+            before = fake.counts.get('detail', 0)
+            subprocess.run(command, cwd=full, env=env, stdout=subprocess.DEVNULL, check=True)
+            full_requests = fake.counts.get('detail', 0) - before
+
+            before = fake.counts.get('detail', 0)
+            process = subprocess.Popen(command, cwd=crashed, env=env, stdout=subprocess.DEVNULL)
+            time.sleep(kill_after)
+            process.kill()
+            process.wait()
+            subprocess.run(command, cwd=crashed, env=env, stdout=subprocess.DEVNULL, check=True)
+            resumed_requests = fake.counts.get('detail', 0) - before
+
+            print(f"{script:30} killed after {kill_after}s, "
+                  f"detail requests {full_requests} uninterrupted vs {resumed_requests} killed + resumed")
+    finally:
+        fake.stop()
+
+
+def bench_tokens(requests_count=450, rate_limit=120, rate_window=3.0):
+    # round-robin rotation vs the TokenScheduler with one of three tokens nearly used up
+    tokens = ['token-aaaa', 'token-bbbb', 'token-cccc']
+    for label in ['round-robin', 'TokenScheduler']:
+        fake = FakeGitHub(200, rate_limit=rate_limit, rate_window=rate_window).start()
+        urls = [fake.url + '/repos/scottyab/rootbeer/commits/' + c['sha'] for c in fake.history]
+        urls = (urls * (requests_count // len(urls) + 1))[:requests_count]
+        for _ in range(rate_limit - 10):
+            requests.get(urls[0], headers={'Authorization': 'Bearer ' + tokens[0]})
+        client = GitHubClient()
+        failed = 0
+        start = time.perf_counter()
+        for ct, url in enumerate(urls):
+            if label == 'round-robin':
+                response = client.session(tokens[ct % len(tokens)]).get(url)
+            else:
+                response = client.get_with_tokens(url, tokens)
+            failed += response.status_code != 200
+        seconds = time.perf_counter() - start
+        client.close()
+        fake.stop()
+        print(f"{label:15} {seconds:6.2f}s  {failed:4} failed of {requests_count}")
+        if label != 'round-robin':
+            for token, usage in client.scheduler.stats().items():
+                print(f"    {token}: {usage['requests']} requests, {usage['remaining']} left")
+
+
+def bench_git(commits=30000):
+    # walking a local clone with git log instead of 1 + N API requests per page
+    outdir = tempfile.mkdtemp(prefix='bench_')
+    write_git_repo(make_history(commits), os.path.join(outdir, 'repo.git'))
+    start = time.perf_counter()
+    count = mine(walk_git_log(os.path.join(outdir, 'repo.git')), [TouchCounter(), AuthorDates()])
+    seconds = time.perf_counter() - start
+    print(f"git log backend: {count} commits in {seconds:.2f}s ({count / seconds:.0f} commits/sec), 0 API requests")
+
+
+def bench_graphql(commits=600, latency=0.02):
+    # REST (list + one detail per commit) vs batched GraphQL history queries
+    fake = FakeGitHub(commits, latency).start()
+    env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='', GITHUB_WORKERS='1')
+    try:
+        results = {}
+        for label, graphql in [('REST', False), ('GraphQL', True)]:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            code = ('import sys; sys.path.insert(0, ' + repr(HERE) + '); from mining_pipeline import mine_repo; '
+                    "mine_repo('scottyab/rootbeer', ['token'], ['.java', '.kt', '.cpp', '.c', '.cmake'], "
+                    "'file.csv', 'authors.csv', 'checkpoint.json', graphql=" + str(graphql) + ')')
+            before = dict(fake.counts)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', code], cwd=outdir, env=env, stdout=subprocess.DEVNULL, check=True)
+            seconds = time.perf_counter() - start
+            sent = sum(fake.counts.get(kind, 0) - before.get(kind, 0) for kind in ['list', 'detail', 'graphql'])
+            results[label] = (seconds, sent)
+    finally:
+        fake.stop()
+
+    print(f"{commits} commits, {latency * 1000:.0f} ms latency per request")
+    for label, (seconds, sent) in results.items():
+        print(f"{label:8} {seconds:6.2f}s  {sent:5} requests  {sent / commits:5.2f} requests/commit")
+
+
+def bench_async(commits=600, latency=0.05, new_commits=50):
+    # sync walk (one or a pool of detail requests per page) vs the asyncio engine, full then incremental run
+    fake = FakeGitHub(commits, latency, rate_limit=10 ** 9)
+    fake.add_wide_commit(2000)
+    fake.start()
+    modes = [('sync w=1', '1', False), ('sync w=8', '8', False), ('async w=8', '8', True)]
+    outdirs = {label: tempfile.mkdtemp(prefix='bench_') for label, _, _ in modes}
+    try:
+        for run in ['full', 'incremental']:
+            if run == 'incremental':
+                fake.set_history(make_history(commits + 1 + new_commits)[:new_commits] + fake.history)
+            results = {}
+            for label, workers, asynchronous in modes:
+                env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='', GITHUB_WORKERS=workers)
+                code = ('import sys; sys.path.insert(0, ' + repr(HERE) + '); from mining_pipeline import mine_repo; '
+                        "mine_repo('scottyab/rootbeer', ['token'], ['.java', '.kt', '.cpp', '.c', '.cmake'], "
+                        "'file.csv', 'authors.csv', 'checkpoint.json', incremental=True, "
+                        'workers=' + workers + ', asynchronous=' + str(asynchronous) + ')')
+                before = dict(fake.counts)
+                start = time.perf_counter()
+                subprocess.run([sys.executable, '-c', code], cwd=outdirs[label], env=env, stdout=subprocess.DEVNULL,
+                               check=True)
+                seconds = time.perf_counter() - start
+                sent = {kind: fake.counts.get(kind, 0) - before.get(kind, 0) for kind in ['list', 'detail', 'connections']}
+                results[label] = (seconds, sent, b''.join(read_bytes(os.path.join(outdirs[label], name))
+                                                           for name in ['file.csv', 'authors.csv', 'checkpoint.json']))
+            print(f"{run} run, {latency * 1000:.0f} ms latency per request")
+            for label, (seconds, sent, output) in results.items():
+                same = 'identical' if output == results['sync w=1'][2] else 'DIFFERENT'
+                print(f"{label:10} {seconds:6.2f}s  {sent['list']:3} list + {sent['detail']:4} detail requests  "
+                      f"{sent['connections']:3} connections  output {same}")
+    finally:
+        fake.stop()
+
+
+def bench_wide(files=5000, latency=0.02):
+    # a commit touching `files` files, its file list is paged FILES_PER_PAGE files at a time
+    fake = FakeGitHub(100, latency)
+    fake.add_wide_commit(files)
+    fake.start()
+    try:
+        for workers in ['1', '8']:
+            before = fake.counts.get('detail', 0)
+            seconds, _ = run_script('Justin_CollectFiles.py', fake, {'GITHUB_WORKERS': workers, 'GITHUB_CACHE': ''})
+            print(f"workers={workers}: {seconds:6.2f}s  {fake.counts.get('detail', 0) - before} detail requests")
+
+        # largest record and peak Python memory while streaming the walk through the aggregators
+        code = ('import sys, tracemalloc; sys.path.insert(0, ' + repr(HERE) + '); tracemalloc.start(); '
+                'from benchmarks import TouchCounter; from mining_pipeline import mine, walk_commits; '
+                'sizes = []; counter = TouchCounter(); '
+                "count = mine((sizes.append(len(c['files'])) or c for c in walk_commits('scottyab/rootbeer', ['token'], 8)), [counter]); "
+                "print(count, len(counter.dictfiles), max(sizes), tracemalloc.get_traced_memory()[1])")
+        env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='')
+        output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True, check=True)
+        count, distinct, largest, peak = output.stdout.split()[-4:]
+        print(f"walk_commits: {count} commits, {distinct} files, largest record {largest} files, "
+              f"peak traced memory {int(peak) / 1e6:.1f} MB")
+    finally:
+        fake.stop()
+
+
+BATCH_CHILD = """
+import sys, time
+sys.path.insert(0, {here!r})
+from batch_mining import mine_repos
+start = time.perf_counter()
+done = {{}}
+for group in {groups!r}:
+    report = mine_repos(group, ['token'], {extensions!r}, 'out')
+    for repo, result in report['repos'].items():
+        done[repo] = time.perf_counter() - start - report['seconds'] + result['seconds']
+print('RESULT', time.perf_counter() - start, ' '.join(repo + '=' + str(seconds) for repo, seconds in done.items()))
+"""
+
+
+def bench_batch(heavy=1500, light=150, latency=0.02, workers='8'):
+    # one commit heavy repo and three small ones: one after another vs batch_mining.py's shared fair pool
+    repos = {'Skyscanner/backpack': heavy, 'scottyab/rootbeer': light, 'mendhak/gpslogger': light,
+             'k9mail/k-9': light}
+    fake = FakeGitHub(10, latency)
+    for seed, (repo, commits) in enumerate(repos.items()):
+        fake.add_repo(repo, commits, seed)
+    fake.start()
+    env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='', GITHUB_WORKERS=workers)
+    try:
+        for label, groups in [('one by one', [[repo] for repo in repos]), ('batch', [list(repos)])]:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            code = BATCH_CHILD.format(here=HERE, groups=groups, extensions=['.java', '.kt', '.cpp', '.c', '.cmake'])
+            before = sum(fake.counts.get(kind, 0) for kind in ['list', 'detail'])
+            output = subprocess.run([sys.executable, '-c', code], cwd=outdir, env=env, capture_output=True,
+                                    text=True, check=True)
+            sent = sum(fake.counts.get(kind, 0) for kind in ['list', 'detail']) - before
+            result = output.stdout.splitlines()[-1].split()
+            seconds = float(result[1])
+            done = dict(item.split('=') for item in result[2:])
+            print(f"{label:10} {seconds:6.2f}s  {sent / seconds:6.1f} requests/sec")
+            for repo, commits in repos.items():
+                print(f"    {repo:20} {commits:5} commits  done after {float(done[repo]):6.2f}s")
+    finally:
+        fake.stop()
+
+
+def bench_spool(sizes=(100000, 1000000), chunk_rows=100000):
+    # author/date touches kept in a dict until the end vs streamed through a TouchSpool
+    for rows in sizes:
+        commits = make_history(rows // 2)
+        results = {}
+        for label in ['dict', 'TouchSpool']:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            output = os.path.join(outdir, 'authors.csv')
+            tracemalloc.start()
+            start = time.perf_counter()
+            if label == 'dict':
+                authorDates = AuthorDates()
+                for c in commits:
+                    authorDates.add(c)
+                write_authors_dates(authorDates.authors_dates, output)
+            else:
+                spool = TouchSpool(os.path.join(outdir, 'touches.spool'), chunk_rows=chunk_rows)
+                for c in commits:
+                    spool.add(c)
+                spool.write_csv(output)
+                spool.close()
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[label] = read_bytes(output)
+            same = 'identical' if results[label] == results['dict'] else 'DIFFERENT'
+            print(f"{len(results[label].splitlines()) - 1:8} rows  {label:10} {seconds:6.2f}s  "
+                  f"peak {peak / 1e6:7.1f} MB  output {same}")
+
+
+def bench_store(commits=500000):
+    # dict of (author, date) string tuples vs the interned TouchStore columns: memory, CSV write, load
+    history = make_history(commits)
+    outdir = tempfile.mkdtemp(prefix='bench_')
+
+    tracemalloc.start()
+    authorDates = AuthorDates()
+    for c in history:
+        authorDates.add(c)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    write_authors_dates(authorDates.authors_dates, os.path.join(outdir, 'dict.csv'))
+    dict_write = time.perf_counter() - start
+    del authorDates
+
+    tracemalloc.start()
+    store = TouchStore()
+    for c in history:
+        store.add(c)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    store.write_csv(os.path.join(outdir, 'store.csv'))
+    store_write = time.perf_counter() - start
+    store.save(os.path.join(outdir, 'store.touches'))
+    same = read_bytes(os.path.join(outdir, 'dict.csv')) == read_bytes(os.path.join(outdir, 'store.csv'))
+
+    print(f"{len(store)} touches, {len(store.files)} files, {len(store.authors)} authors")
+    print(f"dict        {dict_bytes / 1e6:7.1f} MB  CSV written in {dict_write:5.2f}s")
+    print(f"TouchStore  {store_bytes / 1e6:7.1f} MB  CSV written in {store_write:5.2f}s  output "
+          f"{'identical' if same else 'DIFFERENT'}")
+
+    start = time.perf_counter()
+    read_authors = {}
+    with open(os.path.join(outdir, 'dict.csv'), 'r') as fileCSV:
+        reader = csv.reader(fileCSV)
+        next(reader)
+        for filename, author, date in reader:
+            read_authors.setdefault(filename, []).append((author, datetime.strptime(date, '%Y-%m-%dT%H:%M:%SZ')))
+    csv_load = time.perf_counter() - start
+    start = time.perf_counter()
+    loaded = TouchStore.load(os.path.join(outdir, 'store.touches'))
+    store_load = time.perf_counter() - start
+    start = time.perf_counter()
+    same = loaded.authors_dates() == read_authors
+    store_dates = time.perf_counter() - start
+    print(f"scatterplot load: CSV + strptime {csv_load:5.2f}s, .touches {store_load:5.3f}s "
+          f"(+{store_dates:4.2f}s for the datetime dict, {'identical' if same else 'DIFFERENT'}), "
+          f"{os.path.getsize(os.path.join(outdir, 'dict.csv')) / 1e6:.1f} MB CSV vs "
+          f"{os.path.getsize(os.path.join(outdir, 'store.touches')) / 1e6:.1f} MB")
+
+
+def bench_parquet(rows=1000000):
+    # loading a synthetic authors table the ways the scatterplot scripts can: CSV, .touches, Parquet
+    store = TouchStore()
+    for c in make_history(rows // 2):
+        store.add(c)
+    outdir = tempfile.mkdtemp(prefix='bench_')
+    paths = {'csv': os.path.join(outdir, 'authors.csv'), 'touches': os.path.join(outdir, 'authors.touches'),
+             'parquet': os.path.join(outdir, 'authors.parquet')}
+    store.write_csv(paths['csv'])
+    store.save(paths['touches'])
+    loaders = [('TouchStore.read_csv', lambda: TouchStore.read_csv(paths['csv'])),
+               ('TouchStore.load', lambda: TouchStore.load(paths['touches']))]
+    if PARQUET:
+        store.write_parquet(paths['parquet'])
+        loaders.append(('TouchStore.read_parquet', lambda: TouchStore.read_parquet(paths['parquet'])))
+    try:
+        import pandas as pd
+        loaders.append(('pandas read_csv + to_datetime',
+                        lambda: pd.to_datetime(pd.read_csv(paths['csv'])['Date'])))
+        if PARQUET:
+            loaders.append(('pandas read_parquet', lambda: pd.read_parquet(paths['parquet'])))
+    except ImportError:
+        pass
+
+    reference = store.authors_dates()
+    print(f"{len(store)} rows, " + ', '.join(f"{name} {os.path.getsize(path) / 1e6:.1f} MB"
+                                            for name, path in paths.items() if os.path.exists(path)))
+    for label, load in loaders:
+        start = time.perf_counter()
+        loaded = load()
+        seconds = time.perf_counter() - start
+        check = ''
+        if isinstance(loaded, TouchStore):
+            check = '  touches identical' if loaded.authors_dates() == reference else '  touches DIFFERENT'
+        print(f"{label:30} {seconds:7.3f}s{check}")
+
+
+def bench_loader(sizes=(10000, 100000, 1000000)):
+    # the scatterplot scripts' csv + strptime + per-row week loop vs load_touches (CSV and .touches)
+    for rows in sizes:
+        store = TouchStore()
+        history = make_history(rows)
+        for c in history:
+            if len(store) >= rows:
+                break
+            store.add(c)
+        outdir = tempfile.mkdtemp(prefix='bench_')
+        path = os.path.join(outdir, 'authors.csv')
+        store.write_csv(path)
+
+        start = time.perf_counter()
+        with open(path, 'r') as fileCSV:
+            reader = csv.reader(fileCSV)
+            next(reader)
+            data = [(line[0], line[1], datetime.strptime(line[2], '%Y-%m-%dT%H:%M:%SZ')) for line in reader]
+        first = min(line[2] for line in data)
+        weeks = [(line[2] - first).days // 7 for line in data]
+        strptime_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded_weeks = load_touches(path).weeks()
+        csv_seconds = time.perf_counter() - start
+        same = loaded_weeks.tolist() == weeks
+
+        store.save(os.path.join(outdir, 'authors.touches'))
+        start = time.perf_counter()
+        load_touches(path).weeks()
+        touches_seconds = time.perf_counter() - start
+        print(f"{len(store):8} rows  strptime loop {strptime_seconds:6.3f}s  load_touches CSV {csv_seconds:6.3f}s  "
+              f".touches {touches_seconds:6.3f}s  weeks {'identical' if same else 'DIFFERENT'}")
+
+
+KYLE_CHILD = """
+import sys, time
+import numpy as np
+import matplotlib.pyplot as plt
+sys.path.insert(0, {here!r})
+from touch_store import load_touches
+start = time.perf_counter()
+np.random.seed(843)
+touches = load_touches('KyleM_data/authorsTouches.csv')
+file_ids, author_ids, _ = touches.columns()
+author_colors = {{author: np.random.rand(3,) for author in touches.authors}}
+for file_index, author_index, weeks_since_origin in zip(file_ids, author_ids, touches.weeks()):
+    plt.scatter(file_index, weeks_since_origin, c=[author_colors[touches.authors[author_index]]])
+plt.xlim([0, len(touches.files)])
+plt.ylim([0, 500])
+plt.xlabel("File")
+plt.ylabel("Weeks")
+plt.savefig('KyleM_data/scatterplot.png')
+print('RESULT', time.perf_counter() - start)
+"""
+
+
+def bench_kyle(sizes=(2000, 10000, 100000), per_point_limit=10000):
+    # ChatGPT/2.3/kyle_m_task_2-3.py: one plt.scatter call per point vs one collection for all points,
+    # the per point loop gets slower with every collection already on the axes so it stops at per_point_limit
+    import matplotlib.image
+    script = os.path.join(HERE, '..', 'ChatGPT', '2.3', 'kyle_m_task_2-3.py')
+    env = dict(os.environ, MPLBACKEND='Agg')
+    for rows in sizes:
+        store = TouchStore()
+        for c in make_history(rows):
+            if len(store) >= rows:
+                break
+            store.add(c)
+        images = []
+        for label in ['per point', 'collection'] if rows <= per_point_limit else ['collection']:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            os.makedirs(os.path.join(outdir, 'KyleM_data'))
+            store.write_csv(os.path.join(outdir, 'KyleM_data', 'authorsTouches.csv'))
+            start = time.perf_counter()
+            if label == 'per point':
+                subprocess.run([sys.executable, '-c', KYLE_CHILD.format(here=HERE)], cwd=outdir, env=env,
+                               stdout=subprocess.DEVNULL, check=True)
+            else:
+                subprocess.run([sys.executable, script], cwd=outdir, env=env, stdout=subprocess.DEVNULL, check=True)
+            seconds = time.perf_counter() - start
+            images.append(matplotlib.image.imread(os.path.join(outdir, 'KyleM_data', 'scatterplot.png')))
+            # a one point collection is drawn as a pixel snapped marker, so edges can move by under a pixel
+            changed = (images[-1] != images[0]).any(axis=2).mean()
+            print(f"{len(store):8} points  {label:10} {seconds:7.2f}s  "
+                  f"png pixels changed {f'{changed:.2%}' if len(images) > 1 else '-'}")
+
+
+PLOT_CHILD = """
+import resource, runpy, sys, time
+sys.path.insert(0, {here!r})
+start = time.perf_counter()
+runpy.run_path({script!r}, run_name='__main__')
+print('RESULT', time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+      'pandas' in sys.modules)
+"""
+
+
+def bench_density(sizes=(10000, 100000, 1000000), files=1000, authors=40, scatter_limit=100000):
+    # Eric/Brandon scatterplots: a marker per touch vs the binned file x week grid (touch_store DENSITY_POINTS)
+    import numpy as np
+    rnd = np.random.default_rng(843)
+    for rows in sizes:
+        store = TouchStore()
+        names = [f'src/module{i % 50}/File{i}.java' for i in range(files)]
+        people = [f'author{i}' for i in range(authors)]
+        # a few busy files and authors, ten years of touches
+        for f, a, d in zip(rnd.zipf(1.3, rows) % files, rnd.zipf(1.5, rows) % authors,
+                           np.sort(rnd.integers(1420070400, 1735689600, rows))):
+            store.write(names[f], people[a], format_date(int(d)))
+        outdir = tempfile.mkdtemp(prefix='bench_')
+        for person in ['Eric', 'Brandon']:
+            os.makedirs(os.path.join(outdir, person + '_data'))
+            path = os.path.join(outdir, person + '_data', 'authors_dates_rootbeer.csv')
+            store.write_csv(path)
+            store.save(store_path(path))
+        for mode, points in [('scatter', str(rows)), ('binned', '0')]:
+            if mode == 'scatter' and rows > scatter_limit:
+                continue
+            env = dict(os.environ, MPLBACKEND='Agg', TOUCH_DENSITY_POINTS=points)
+            for script in ['Eric_scatterplot.py', 'Brandon_scatterplot.py']:
+                code = PLOT_CHILD.format(here=HERE, script=os.path.join(HERE, script))
+                output = subprocess.run([sys.executable, '-c', code], cwd=outdir, env=env, capture_output=True,
+                                        text=True, check=True)
+                seconds, peak = output.stdout.splitlines()[-1].split()[1:3]
+                print(f"{len(store):8} touches  {script:24} {mode:8} {float(seconds):7.2f}s  "
+                      f"peak {int(peak) / 1024:6.0f} MB")
+
+
+def bench_plots(repos=50, commits=1500, workers=None):
+    # batch_plots.py: Eric and Brandon plots of many repos rendered one after another vs over a process pool
+    from batch_plots import render_repos
+    workers = workers or max(os.cpu_count(), 2)
+    outdir = tempfile.mkdtemp(prefix='bench_')
+    inputs = []
+    for seed in range(repos):
+        store = TouchStore()
+        for c in make_history(commits, seed):
+            store.add(c)
+        path = os.path.join(outdir, f'authors_dates_repo{seed}.csv')
+        store.write_csv(path)
+        store.save(store_path(path))
+        inputs.append(path)
+    for style in ['eric', 'brandon']:
+        images = {}
+        for label, count in [('sequential', 1), (f'{workers} processes', workers)]:
+            plots = os.path.join(outdir, label.replace(' ', '_') + '_' + style)
+            report = render_repos(inputs, plots, style, ('png', 'svg'), workers=count)
+            images[label] = [read_bytes(os.path.join(plots, name)) for name in sorted(os.listdir(plots))
+                             if name.endswith('.png')]
+            same = 'identical' if images[label] == images['sequential'] else 'DIFFERENT'
+            print(f"{style:8} {repos} repos  {label:12} {report['seconds']:6.2f}s  "
+                  f"{len(images[label])} png + svg, png {same}")
+
+
+def brandon_per_file(touches, output_path, legend_path):
+    # Brandon_scatterplot.plot_scatter as it was: a scatter call per file and a Line2D per legend entry
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+    from matplotlib import colormaps
+    fig = Figure(figsize=(12, 8))
+    ax = fig.subplots()
+    colormap = colormaps['tab20']
+    filenames = touches.files
+    file_ids, author_ids, _ = touches.columns()
+    all_weeks = touches.weeks(per_file=True)
+    order = np.argsort(file_ids, kind='stable')
+    rows_of_file = np.split(order, np.cumsum(np.bincount(file_ids, minlength=len(filenames)))[:-1])
+    seen, first_row = np.unique(author_ids[order], return_index=True)
+    authors_colors = {touches.authors[author]: colormap(color_idx % len(colormap.colors))
+                      for color_idx, author in enumerate(seen[np.argsort(first_row)])}
+    for number, rows in enumerate(rows_of_file, 1):
+        colors = [authors_colors[touches.authors[i]] for i in author_ids[rows]]
+        ax.scatter([number] * len(rows), all_weeks[rows], c=colors, alpha=1, edgecolors='w', linewidth=0.5)
+    ax.set_xticks(ticks=range(1, len(filenames) + 1), labels=range(1, len(filenames) + 1), rotation=0)
+    ax.legend([Line2D([0], [0], marker='o', color='w', markerfacecolor=color, markersize=10)
+               for color in authors_colors.values()], list(authors_colors), loc='upper right', bbox_to_anchor=(1.15, 1))
+    fig.savefig(output_path)
+    legend = Figure(figsize=(12, 8))
+    legend.legend([Line2D([0], [0], marker='o', color='w', markerfacecolor='k', markersize=10) for _ in filenames],
+                  [f"{i+1}: {filename}" for i, filename in enumerate(filenames)], loc='center')
+    legend.savefig(legend_path)
+    return fig, legend
+
+
+def bench_brandon(sizes=((40, 2000), (300, 20000), (1000, 100000))):
+    # Brandon_scatterplot.plot_scatter: a collection per file and a Line2D per filename vs one of each,
+    # test_scatterplot.py checks that the points and colors are unchanged
+    import numpy as np
+    from Brandon_scatterplot import plot_scatter
+    rnd = np.random.default_rng(843)
+    for files, rows in sizes:
+        store = TouchStore()
+        for f, a, d in zip(rnd.integers(0, files, rows), rnd.integers(0, 12, rows),
+                           np.sort(rnd.integers(1420070400, 1735689600, rows))):
+            store.write(f'src/File{f}.java', f'author{a}', format_date(int(d)))
+        outdir = tempfile.mkdtemp(prefix='bench_')
+        for label, plot in [('per file', brandon_per_file), ('collection', plot_scatter)]:
+            start = time.perf_counter()
+            fig, _ = plot(store, os.path.join(outdir, 'plot.png'), os.path.join(outdir, 'legend.png'))
+            seconds = time.perf_counter() - start
+            print(f"{len(store):7} touches {len(store.files):5} files  {label:10} {seconds:7.2f}s  "
+                  f"{len(fig.axes[0].collections):5} collections")
+
+
+# Justin_scatterplot.py as it was (pandas, .dt.to_period apply, a mask per author), with
+# plt.cm.get_cmap (gone in matplotlib 3.9) swapped for its colormaps equivalent
+JUSTIN_PANDAS = """
+import matplotlib.pyplot as plt
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.lines import Line2D
+data = pd.read_csv('Justin_data/Justin_authorsTouches.csv')
+data['Date'] = pd.to_datetime(data['Date'])
+data['Week'] = data['Date'].dt.to_period('W').apply(lambda r: r.start_time)
+data['Week'] = (data['Week'] - data['Week'].min()).dt.days // 7
+authors = data['Author'].unique()
+colors = colormaps['tab20'].resampled(len(authors))
+color_map = {author: colors(i) for i, author in enumerate(authors)}
+plt.figure(figsize=(12, 8))
+for author, color in color_map.items():
+    author_data = data[data['Author'] == author]
+    plt.scatter(author_data['Week'], author_data['Filename'], color=color, label=author, alpha=0.6)
+plt.xlim(0, 250)
+plt.xticks(range(0, 251, 10))
+legend_elements = [Line2D([0], [0], marker='o', color='w', label=author,
+                          markerfacecolor=color_map[author], markersize=10) for author in authors]
+plt.legend(handles=legend_elements, title='Authors', bbox_to_anchor=(1.05, 1), loc='upper left')
+plt.xlabel('Week')
+plt.ylabel('Filename')
+plt.title('File Touches by Week and Author')
+plt.xticks(rotation=45)
+plt.tight_layout()
+plt.savefig('Justin_data/Justin_scatterplot.png')
+"""
+
+
+def bench_justin(sizes=(10000, 100000), files=300, authors=12):
+    # Justin_scatterplot.py: pandas with a per-row apply and a mask per author vs load_touches and NumPy
+    import numpy as np
+    import matplotlib.image
+    rnd = np.random.default_rng(843)
+    env = dict(os.environ, MPLBACKEND='Agg')
+    for label, modules in [('pandas', 'matplotlib.pyplot, pandas'),
+                           ('numpy', 'matplotlib.pyplot, numpy, touch_store')]:
+        code = f"import sys, time; sys.path.insert(0, {HERE!r}); start = time.perf_counter(); import {modules}; " \
+               f"print(time.perf_counter() - start)"
+        imports = min(float(subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                                           check=True).stdout) for _ in range(3))
+        print(f"import {label:6} {imports:6.2f}s  ({modules})")
+    for rows in sizes:
+        store = TouchStore()
+        for f, a, d in zip(rnd.integers(0, files, rows), rnd.integers(0, authors, rows),
+                           np.sort(rnd.integers(1420070400, 1560000000, rows))):
+            store.write(f'src/File{f}.java', f'author{a}', format_date(int(d)))
+        images = []
+        for label in ['pandas', 'numpy']:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            os.makedirs(os.path.join(outdir, 'Justin_data'))
+            store.write_csv(os.path.join(outdir, 'Justin_data', 'Justin_authorsTouches.csv'))
+            script = os.path.join(HERE, 'Justin_scatterplot.py')
+            if label == 'pandas':
+                script = os.path.join(outdir, 'old_scatterplot.py')
+                with open(script, 'w') as f:
+                    f.write(JUSTIN_PANDAS)
+            output = subprocess.run([sys.executable, '-c', PLOT_CHILD.format(here=HERE, script=script)], cwd=outdir,
+                                    env=env, capture_output=True, text=True, check=True)
+            seconds, _, pandas = output.stdout.splitlines()[-1].split()[1:]
+            images.append(matplotlib.image.imread(os.path.join(outdir, 'Justin_data', 'Justin_scatterplot.png')))
+            same = 'identical' if images[-1].shape == images[0].shape and (images[-1] == images[0]).all() \
+                else 'DIFFERENT'
+            print(f"{len(store):8} touches  {label:6} {float(seconds):6.2f}s  pandas imported {pandas:5}  png {same}")
+
+
+def bench_matcher(paths=10000000):
+    # source file checks: any(endswith) generator and KyleM's per extension loop vs the compiled FileMatcher
+    from mining_pipeline import FileMatcher
+    mapping = {'Java': ['.java'], 'Kotlin': ['.kt'], 'C++': ['.cpp', '.h'], 'C': ['.c', '.h'],
+               'CMake': ['.cmake', 'CMakeLists.txt']}
+    patterns = [pattern for language in mapping for pattern in mapping[language]]  # '.h' twice
+    names = ['Main.java', 'App.kt', 'jni.cpp', 'jni.h', 'util.c', 'deps.cmake', 'CMakeLists.txt',
+             'OldCMakeLists.txt', 'README.md', 'build.gradle', 'strings.xml', 'icon.png']
+    distinct = [f'{top}/src/module{i}/{name}' for top in ['app', 'lib', 'third_party/vendor']
+                for i in range(30) for name in names]
+    sample = (distinct * (paths // len(distinct) + 1))[:paths]
+    print(f"{len(sample)} paths, {len(distinct)} distinct, patterns {patterns}")
+
+    start = time.perf_counter()
+    kept = sum(1 for path in sample if any(path.endswith(ext) for ext in patterns))
+    print(f"any(endswith) generator  {time.perf_counter() - start:6.2f}s  {kept} kept")
+
+    start = time.perf_counter()
+    counted = 0
+    for path in sample:
+        for ext in patterns:
+            if path.endswith(ext):
+                counted += 1
+    print(f"loop per extension       {time.perf_counter() - start:6.2f}s  {counted} counted (.h twice)")
+
+    matcher = FileMatcher(patterns)
+    start = time.perf_counter()
+    matched = len(matcher.filter(sample))
+    print(f"FileMatcher.filter       {time.perf_counter() - start:6.2f}s  {matched} kept "
+          f"(OldCMakeLists.txt is not CMakeLists.txt)")
+
+    start = time.perf_counter()
+    matched = sum(1 for path in sample if matcher(path))
+    print(f"FileMatcher per path     {time.perf_counter() - start:6.2f}s  {matched} kept")
+
+    suffixes = FileMatcher([pattern for pattern in patterns if pattern.startswith('.')])
+    start = time.perf_counter()
+    matched = len(suffixes.filter(sample))
+    print(f"FileMatcher extensions   {time.perf_counter() - start:6.2f}s  {matched} kept (single endswith)")
+
+    vendored = FileMatcher(patterns, exclude=['*/vendor/*'])
+    start = time.perf_counter()
+    matched = len(vendored.filter(sample))
+    print(f"FileMatcher -*/vendor/*  {time.perf_counter() - start:6.2f}s  {matched} kept")
+
+
+LANGUAGES_CHILD = """
+import sys, time
+sys.path.insert(0, {here!r})
+from fake_github import PATHS
+from languages import LanguageResolver
+for label, files in [('cold', None), ('cached', None), ('local', PATHS * 50)]:
+    resolver = LanguageResolver('cache.sqlite' if label != 'local' else '')
+    start = time.perf_counter()
+    answers = [resolver.languages(repo, ['token'], files) for repo in {repos!r}]
+    seconds = time.perf_counter() - start
+    print('RESULT', label, seconds, resolver.stats()['requests'], resolver.stats()['hits'], ','.join(answers[0]))
+"""
+
+
+ETAGS_CHILD = """
+import runpy, sys
+sys.path.insert(0, {here!r})
+runpy.run_path({script!r}, run_name='__main__')
+from github_api import get_client
+stats = get_client().etags.stats()
+print('RESULT', stats['hits'], stats['changed'], stats['misses'], stats['hit_rate'])
+"""
+
+
+def bench_etags(commits=1000, latency=0.05, new_commits=20):
+    # reruns on an unchanged repo: commit list pages and /languages revalidated with If-None-Match
+    fake = FakeGitHub(commits, latency).start()
+    try:
+        env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='cache.sqlite', GITHUB_WORKERS='8',
+                   GITHUB_LANGUAGES_TTL='0')
+        for script in ['Justin_CollectFiles.py', 'Justin_authorsFileTouches.py']:
+            outdir = tempfile.mkdtemp(prefix='bench_')
+            os.makedirs(os.path.join(outdir, 'data'))
+            history = fake.history
+            print(f"{script}, {commits} commits, {latency * 1000:.0f} ms latency per request")
+            for run in ['first run', 'unchanged', 'unchanged', f'{new_commits} new commits']:
+                if run.endswith('new commits'):
+                    fake.set_history(make_history(commits + new_commits)[:new_commits] + history)
+                before = dict(fake.counts)
+                charged = sum(used for used, _ in fake.limits.values())
+                start = time.perf_counter()
+                result = subprocess.run([sys.executable, '-c', ETAGS_CHILD.format(here=HERE, script=os.path.join(HERE, script))],
+                                        cwd=outdir, env=env, capture_output=True, text=True, check=True)
+                seconds = time.perf_counter() - start
+                hits, changed, misses, hit_rate = result.stdout.split('RESULT')[-1].split()
+                sent = {kind: fake.counts.get(kind, 0) - before.get(kind, 0)
+                        for kind in ['list', 'detail', 'languages', 'not_modified']}
+                charged = sum(used for used, _ in fake.limits.values()) - charged
+                print(f"    {run:16} {seconds:6.2f}s  {sent['list']:3} list {sent['languages']} languages "
+                      f"{sent['detail']:4} detail requests, {sent['not_modified']:3} answered 304, "
+                      f"{charged:4} charged to the rate limit, hit rate {float(hit_rate):4.0%} "
+                      f"({hits} hits {changed} changed {misses} misses)")
+            fake.set_history(history)
+    finally:
+        fake.stop()
+
+
+def bench_languages(repos=20, latency=0.1):
+    # /repos/{repo}/languages asked by every run vs the TTL cache of languages.py vs classifying paths locally
+    fake = FakeGitHub(60, latency).start()
+    try:
+        env = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='cache.sqlite')
+        outdir = tempfile.mkdtemp(prefix='bench_')
+        for run in [1, 2]:
+            before = fake.counts.get('languages', 0)
+            start = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(HERE, 'Justin_authorsFileTouches.py')], cwd=outdir, env=env,
+                           stdout=subprocess.DEVNULL, check=True)
+            print(f"Justin_authorsFileTouches.py run {run}  {time.perf_counter() - start:5.2f}s  "
+                  f"languages requests {fake.counts.get('languages', 0) - before}")
+
+        names = [f'owner/repo{i}' for i in range(repos)]
+        outdir = tempfile.mkdtemp(prefix='bench_')
+        output = subprocess.run([sys.executable, '-c', LANGUAGES_CHILD.format(here=HERE, repos=names)], cwd=outdir,
+                                env=env, capture_output=True, text=True, check=True)
+        for line in output.stdout.splitlines():
+            if line.startswith('RESULT'):
+                _, label, seconds, sent, hits, languages = line.split()
+                print(f"{repos} repos  {label:6} {float(seconds):6.3f}s  requests {sent:3}  cache hits {hits:3}  "
+                      f"first repo {languages}")
+    finally:
+        fake.stop()
+
+
+BENCHMARKS = {
+    'concurrent': bench_concurrent,
+    'pages': bench_pages,
+    'session': bench_session,
+    'resume': bench_resume,
+    'tokens': bench_tokens,
+    'git': bench_git,
+    'graphql': bench_graphql,
+    'async': bench_async,
+    'wide': bench_wide,
+    'batch': bench_batch,
+    'spool': bench_spool,
+    'store': bench_store,
+    'parquet': bench_parquet,
+    'loader': bench_loader,
+    'kyle': bench_kyle,
+    'density': bench_density,
+    'plots': bench_plots,
+    'brandon': bench_brandon,
+    'justin': bench_justin,
+    'matcher': bench_matcher,
+    'languages': bench_languages,
+    'etags': bench_etags,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print('== ' + name)
+        BENCHMARKS[name]()
@@ -0,0 +1,387 @@
+import gzip
+import json
+import hashlib
+import random
+import re
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from github_api import FILES_PER_PAGE
+
+# A small stand-in for the GitHub REST API so the miners can be run and timed locally.
+# Point the scripts at it with GITHUB_API_URL=http://127.0.0.1:<port>
+
+AUTHORS = ['Scott Alexander-Bown', 'Matthew Rollings', 'Artsem Kurantsou', 'Kyle Benac', 'Dan Rosen']
+PATHS = [
+    'app/src/main/java/com/scottyab/rootbeer/sample/MainActivity.kt',
+    'app/src/main/java/com/scottyab/rootbeer/sample/RootSampleApp.kt',
+    'rootbeerlib/src/main/java/com/scottyab/rootbeer/RootBeer.java',
+    'rootbeerlib/src/main/java/com/scottyab/rootbeer/Const.java',
+    'rootbeerlib/src/main/java/com/scottyab/rootbeer/RootBeerNative.java',
+    'rootbeerlib/src/main/cpp/toolChecker.cpp',
+    'rootbeerlib/src/main/cpp/toolChecker.h',
+    'rootbeerlib/src/main/cpp/CMakeLists.txt',
+    'rootbeerlib/src/main/cpp/native.c',
+    'cmake/android.cmake',
+    'app/build.gradle.kts',
+    'build.gradle.kts',
+    'README.md',
+    'gradle.properties',
+]
+# the commit (counted from the oldest) that moves RENAME[0] to RENAME[1] without changing it
+RENAME_AT = 100
+RENAME = ('rootbeerlib/src/main/java/com/scottyab/rootbeer/Const.java',
+          'rootbeerlib/src/main/java/com/scottyab/rootbeer/util/Const.java')
+
+
+def make_history(commits, seed=472):
+    """
+    Builds a deterministic fake commit history, newest commit first.
+
+    Parameters:
+    - commits (int): Number of commits to generate.
+    - seed (int): Seed for the random file/author choices.
+
+    Returns:
+    - history (list): List of dicts with sha, author, date and files. The rename commit
+      lists the new path and has 'renamed': old path.
+    """
+    rnd = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    history = []
+    seen = set()
+    for i in range(commits):
+        date = start + timedelta(hours=13 * i)
+        history.append({
+            'sha': hashlib.sha1(str(i).encode()).hexdigest(),
+            'author': rnd.choice(AUTHORS),
+            'date': date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'files': sorted(rnd.sample(PATHS, rnd.randint(1, 4))),
+        })
+        if i == RENAME_AT and RENAME[0] in seen:
+            history[-1].update(files=[RENAME[1]], renamed=RENAME[0])
+        seen.update(history[-1]['files'])
+    history.reverse()
+    return history
+
+
+def etag(body):
+    # strong ETag of a JSON body, changes whenever the body does
+    return '"' + hashlib.sha1(json.dumps(body).encode()).hexdigest() + '"'
+
+
+def write_git_repo(history, path):
+    """
+    Writes a history from make_history into a new bare git repo with git fast-import.
+
+    Every commit rewrites the files it lists, with the author and date of the fake
+    commit, so git log sees the same touches the fake API serves (the shas differ).
+    """
+    subprocess.run(['git', 'init', '--quiet', '--bare', '--initial-branch=main', path], check=True)
+    stream = []
+    for i, c in enumerate(reversed(history)):
+        epoch = int((datetime.strptime(c['date'], '%Y-%m-%dT%H:%M:%SZ') - datetime(1970, 1, 1)).total_seconds())
+        person = c['author'] + ' <' + c['author'].split()[0].lower() + '@example.com> ' + str(epoch) + ' +0000'
+        message = 'commit ' + str(i)
+        stream.append('commit refs/heads/main\nauthor ' + person + '\ncommitter ' + person + '\n')
+        stream.append('data ' + str(len(message)) + '\n' + message + '\n')
+        if 'renamed' in c:
+            stream.append('R ' + c['renamed'] + ' ' + c['files'][0] + '\n')
+            files = []
+        else:
+            files = c['files']
+        for filename in files:
+            content = c['sha'] + ' ' + filename + '\n'
+            stream.append('M 100644 inline ' + filename + '\ndata ' + str(len(content)) + '\n' + content)
+        stream.append('\n')
+    subprocess.run(['git', '-C', path, 'fast-import', '--quiet'], input=''.join(stream).encode(), check=True)
+
+
+class FakeGitHub:
+    """
+    Threaded HTTP server that answers the commit list, commit detail and languages endpoints.
+
+    Parameters:
+    - commits (int): Size of the generated history.
+    - latency (float): Seconds slept before answering each request.
+    - port (int): Port to bind, 0 picks a free one.
+    - handshake (float): Seconds slept once per new connection, stands in for the TCP+TLS setup.
+    - rate_limit (int): Requests allowed per token and window, like X-RateLimit-Limit.
+    - rate_window (float): Seconds until a token's limit resets.
+    """
+
+    def __init__(self, commits=300, latency=0.0, port=0, handshake=0.0, rate_limit=5000, rate_window=3600):
+        self.set_history(make_history(commits))
+        self.latency = latency
+        self.handshake = handshake
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.limits = {}
+        self.counts = {}
+        self.repos = {}
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self.server.daemon_threads = True
+        self.url = 'http://127.0.0.1:' + str(self.server.server_address[1])
+
+    def set_history(self, history):
+        self.history = history
+        self.by_sha = {c['sha']: c for c in history}
+        # path -> blob oid of every commit's tree, for the GraphQL endpoint
+        self.trees = {}
+        files = {}
+        for c in reversed(history):
+            if 'renamed' in c:
+                files[c['files'][0]] = files.pop(c['renamed'])
+            else:
+                for filename in c['files']:
+                    files[filename] = hashlib.sha1((c['sha'] + filename).encode()).hexdigest()
+            self.trees[c['sha']] = dict(files)
+
+    def add_repo(self, repo, commits, seed=472):
+        # gives 'owner/name' its own history, every other repo name gets the default one
+        history = make_history(commits, seed)
+        self.repos[repo] = (history, {c['sha']: c for c in history})
+
+    def grow(self, commits):
+        # adds `commits` newer commits on top, the existing ones keep their shas and files
+        self.set_history(make_history(len(self.history) + commits))
+
+    def rewrite(self, keep, commits):
+        # a force-push: the oldest `keep` commits stay, the rest is replaced by `commits` new ones
+        history = make_history(keep + commits)
+        for c in history[:commits]:
+            c['sha'] = hashlib.sha1(('rewritten' + c['sha']).encode()).hexdigest()
+        self.set_history(history)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, kind):
+        with self.lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+
+    def take(self, authorization, charge=True):
+        # charges one request to the token (unless charge=False), returns (allowed, remaining, reset)
+        with self.lock:
+            now = time.time()
+            used, reset = self.limits.get(authorization, (0, now + self.rate_window))
+            if reset <= now:
+                used, reset = 0, now + self.rate_window
+            allowed = used < self.rate_limit
+            if allowed and charge:
+                used += 1
+            self.limits[authorization] = (used, reset)
+            return allowed, self.rate_limit - used, reset
+
+    def commit_summary(self, c):
+        return {'sha': c['sha'], 'commit': {'author': {'name': c['author'], 'date': c['date']}}}
+
+    def add_wide_commit(self, files=5000):
+        # puts a commit touching `files` generated paths on top, its file list needs several pages
+        wide = make_history(len(self.history) + 1)[0]
+        wide['files'] = sorted('generated/src/main/java/Gen' + str(i) + '.java' for i in range(files))
+        self.set_history([wide] + self.history)
+        return wide
+
+    def commit_detail(self, c, path, page=1):
+        # like GitHub, FILES_PER_PAGE files per page with Link headers to the next and last page
+        detail = self.commit_summary(c)
+        files = c['files'][(page - 1) * FILES_PER_PAGE:page * FILES_PER_PAGE]
+        detail['files'] = [{'filename': f} for f in files]
+        if 'renamed' in c:
+            detail['files'][0].update(status='renamed', previous_filename=c['renamed'])
+        last = max(1, -(-len(c['files']) // FILES_PER_PAGE))
+        if last == 1:
+            return 200, detail
+        url = self.url + path + '?page='
+        links = []
+        if page < last:
+            links.append('<' + url + str(page + 1) + '>; rel="next"')
+        links.append('<' + url + str(last) + '>; rel="last"')
+        return 200, detail, {'Link': ', '.join(links)}
+
+    def page_links(self, path, query, page, total, per_page):
+        # the Link header of a list page like GitHub's: next/last before the last page, first/prev after the first
+        last = max(1, -(-total // per_page))
+        links = []
+        for rel, target in [('next', page + 1), ('last', last), ('first', 1), ('prev', page - 1)]:
+            if (rel in ('next', 'last') and page < last) or (rel in ('first', 'prev') and page > 1):
+                url = self.url + path + '?' + urlencode(dict(query, page=[str(target)]), doseq=True)
+                links.append('<' + url + '>; rel="' + rel + '"')
+        return {'Link': ', '.join(links)} if links else {}
+
+    def graphql_tree(self, files, depth, prefix=''):
+        # nests a flat path -> oid map into GraphQL tree entries, subtrees below `depth` levels are not expanded
+        entries = []
+        children = {}
+        for path, oid in files.items():
+            head, _, rest = path[len(prefix):].partition('/')
+            if rest:
+                children.setdefault(prefix + head, {})[path] = oid
+            else:
+                entries.append({'path': path, 'oid': oid, 'mode': 33188, 'type': 'blob'})
+        for path, subtree in children.items():
+            oid = hashlib.sha1(json.dumps(sorted(subtree.items())).encode()).hexdigest()
+            entry = {'path': path, 'oid': oid, 'mode': 16384, 'type': 'tree'}
+            if depth > 1:
+                entry['object'] = self.graphql_tree(subtree, depth - 1, path + '/')
+            entries.append(entry)
+        return {'entries': sorted(entries, key=lambda e: e['path'])}
+
+    def graphql(self, request):
+        # answers the history query of mining_pipeline.walk_graphql, nothing else
+        self.count('graphql')
+        batch = int(re.search(r'history\(first: (\d+)', request['query']).group(1))
+        # the query spells out the commit's and the parent's tree `depth` levels deep
+        depth = request['query'].count('entries {') // 2
+        start = int(request['variables'].get('cursor') or 0)
+        nodes = []
+        for i in range(start, min(start + batch, len(self.history))):
+            c = self.history[i]
+            date = datetime.strptime(c['date'], '%Y-%m-%dT%H:%M:%SZ') - timedelta(hours=5)
+            parents = []
+            if i + 1 < len(self.history):
+                parents.append({'tree': self.graphql_tree(self.trees[self.history[i + 1]['sha']], depth)})
+            nodes.append({
+                'oid': c['sha'],
+                'author': {'name': c['author'], 'date': date.strftime('%Y-%m-%dT%H:%M:%S') + '-05:00'},
+                'tree': self.graphql_tree(self.trees[c['sha']], depth),
+                'parents': {'nodes': parents},
+            })
+        end = start + len(nodes)
+        history = {'pageInfo': {'hasNextPage': end < len(self.history), 'endCursor': str(end)}, 'nodes': nodes}
+        return 200, {'data': {'repository': {'defaultBranchRef': {'target': {'history': history}}}}}
+
+    def route(self, path, query):
+        # returns (status, body) or (status, body, headers) for /repos/{owner}/{name}/...
+        parts = path.strip('/').split('/')
+        if len(parts) < 4 or parts[0] != 'repos':
+            return 404, {'message': 'Not Found'}
+        rest = parts[3:]
+        history, by_sha = self.repos.get(parts[1] + '/' + parts[2], (self.history, self.by_sha))
+        if rest == ['languages']:
+            self.count('languages')
+            return 200, {'Java': 51234, 'Kotlin': 20345, 'C++': 4567, 'CMake': 321}
+        if rest == ['commits']:
+            self.count('list')
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('per_page', ['30'])[0])
+            if 'since' in query:
+                history = [c for c in history if c['date'] >= query['since'][0]]
+            chunk = history[(page - 1) * per_page:page * per_page]
+            links = self.page_links(path, query, page, len(history), per_page)
+            return 200, [self.commit_summary(c) for c in chunk], links
+        if len(rest) == 2 and rest[0] == 'compare':
+            # like GitHub: the commits reachable from head but not from base, oldest first
+            self.count('compare')
+            base, _, head = rest[1].partition('...')
+            if base not in by_sha or (head != 'HEAD' and head not in by_sha):
+                return 404, {'message': 'Not Found'}
+            start = 0 if head == 'HEAD' else history.index(by_sha[head])
+            ahead = history[start:history.index(by_sha[base])][::-1]
+            page = int(query.get('page', ['1'])[0])
+            per_page = int(query.get('per_page', ['250'])[0])
+            links = self.page_links(path, query, page, len(ahead), per_page)
+            body = {
+                'status': 'ahead' if ahead else 'identical',
+                'ahead_by': len(ahead),
+                'behind_by': 0,
+                'total_commits': len(ahead),
+                'commits': [self.commit_summary(c) for c in ahead[(page - 1) * per_page:page * per_page]],
+            }
+            return 200, body, links
+        if len(rest) == 2 and rest[0] == 'commits' and rest[1] in by_sha:
+            self.count('detail')
+            return self.commit_detail(by_sha[rest[1]], path, int(query.get('page', ['1'])[0]))
+        return 404, {'message': 'Not Found'}
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                fake.count('connections')
+                if fake.handshake:
+                    time.sleep(fake.handshake)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                self.answer(lambda: fake.route(url.path, parse_qs(url.query)))
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if urlparse(self.path).path == '/graphql':
+                    self.answer(lambda: fake.graphql(request))
+                else:
+                    self.answer(lambda: (404, {'message': 'Not Found'}))
+
+            def answer(self, route):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                authorization = self.headers.get('Authorization', '')
+                condition = self.headers.get('If-None-Match')
+                result = route() if condition else None
+                headers = {}
+                if result and result[0] == 200 and etag(result[1]) == condition:
+                    # like GitHub, a 304 is not charged to the rate limit
+                    fake.count('not_modified')
+                    allowed, remaining, reset = fake.take(authorization, charge=False)
+                    status, body, headers = 304, None, {'ETag': condition}
+                else:
+                    allowed, remaining, reset = fake.take(authorization)
+                    if allowed:
+                        status, body, *extra = result or route()
+                        if extra:
+                            headers = dict(extra[0])
+                        if status == 200 and self.command == 'GET':
+                            headers['ETag'] = etag(body)
+                    else:
+                        fake.count('limited')
+                        status, body = 403, {'message': 'API rate limit exceeded'}
+                data = json.dumps(body).encode() if status != 304 else b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('X-RateLimit-Limit', str(fake.rate_limit))
+                self.send_header('X-RateLimit-Remaining', str(remaining))
+                self.send_header('X-RateLimit-Reset', str(int(reset) + 1))
+                if data and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    data = gzip.compress(data)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local fake GitHub API')
+    parser.add_argument('--commits', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    fake = FakeGitHub(args.commits, args.latency, args.port)
+    print('Serving fake GitHub API on ' + fake.url)
+    fake.server.serve_forever()
@@ -0,0 +1,718 @@
+import atexit
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Base URL of the GitHub REST API, set GITHUB_API_URL to point the miners at fake_github.py
+API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com')
+
+# How many commit details are fetched at the same time, 1 keeps the one-by-one behaviour
+WORKERS = int(os.environ.get('GITHUB_WORKERS', '1'))
+
+# On-disk cache of /commits/{sha} responses and of the ETags of the other GETs,
+# set GITHUB_CACHE to '' to turn it off
+CACHE_PATH = os.environ.get('GITHUB_CACHE', 'github_cache.sqlite')
+CACHE_MB = int(os.environ.get('GITHUB_CACHE_MB', '512'))
+
+# A commit detail lists at most this many files, the rest are on ?page=2, 3, ...
+FILES_PER_PAGE = 300
+
+# /repos/{owner}/{repo}/commits/{sha}, the only responses that never change
+COMMIT_URL = re.compile(r'/repos/[^/]+/[^/]+/commits/([0-9a-f]{40})$')
+
+
+class CommitCache:
+    """
+    SQLite store of commit detail payloads keyed by sha.
+
+    A commit is immutable once it has a sha, so its /commits/{sha} response can be
+    reused forever. Bodies are stored zlib-compressed and the least recently used
+    ones are evicted once the total size goes over max_bytes.
+
+    A hit only notes the time in memory, the last_used column is updated for all
+    noted hits in one transaction on the next put(), every `touch_every` hits and
+    on close/exit, so a rerun answered from the cache does not commit once per hit.
+
+    Parameters:
+    - path (str): SQLite file to use, created if missing.
+    - max_bytes (int): Upper bound on the stored (compressed) bytes.
+    - touch_every (int): Hits noted in memory before they are written.
+    """
+
+    def __init__(self, path, max_bytes=CACHE_MB * 1024 * 1024, touch_every=1000):
+        self.max_bytes = max_bytes
+        self.touch_every = touch_every
+        self.touched = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS commits '
+                        '(sha TEXT PRIMARY KEY, body BLOB, size INTEGER, last_used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS commits_lru ON commits (last_used)')
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM commits').fetchone()[0]
+        atexit.register(self.flush)
+
+    def get(self, sha):
+        with self.lock:
+            row = self.db.execute('SELECT body FROM commits WHERE sha = ?', (sha,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.touched[sha] = time.time()
+            if len(self.touched) >= self.touch_every:
+                self.write_touches()
+                self.db.commit()
+        return zlib.decompress(row[0])
+
+    def write_touches(self):
+        # last_used of the hits noted since the last write, the caller holds the lock and commits
+        if self.touched:
+            self.db.executemany('UPDATE commits SET last_used = ? WHERE sha = ?',
+                                [(used, sha) for sha, used in self.touched.items()])
+            self.touched = {}
+
+    def flush(self):
+        with self.lock:
+            if self.touched:
+                self.write_touches()
+                self.db.commit()
+
+    def put(self, sha, body):
+        data = zlib.compress(body)
+        with self.lock:
+            old = self.db.execute('SELECT size FROM commits WHERE sha = ?', (sha,)).fetchone()
+            if old is not None:
+                self.size -= old[0]
+            self.db.execute('INSERT OR REPLACE INTO commits VALUES (?, ?, ?, ?)',
+                            (sha, data, len(data), time.time()))
+            self.size += len(data)
+            self.touched.pop(sha, None)
+            self.write_touches()  # evict() has to see the recent hits
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        # drop the least recently used entries until the cache fits again
+        while self.size > self.max_bytes:
+            rows = self.db.execute('SELECT sha, size FROM commits ORDER BY last_used LIMIT 100').fetchall()
+            if not rows:
+                break
+            for sha, size in rows:
+                self.db.execute('DELETE FROM commits WHERE sha = ?', (sha,))
+                self.size -= size
+                if self.size <= self.max_bytes:
+                    break
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'bytes': self.size}
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        with self.lock:
+            self.db.close()
+
+
+class ETagStore:
+    """
+    SQLite store of revalidatable GET responses keyed by URL, for conditional requests.
+
+    Commit list pages and /languages can change, so unlike commit details they
+    cannot be reused as they are. Their body is stored with the ETag / Last-Modified
+    validators and the Link header (pagination), the next GET of the URL is sent with
+    If-None-Match / If-Modified-Since, and a 304 answer is served from the store.
+    GitHub does not count 304s against the rate limit. Bodies are zlib-compressed
+    and evicted least recently used first once over max_bytes, like CommitCache.
+
+    Parameters:
+    - path (str): SQLite file to use, created if missing.
+    - max_bytes (int): Upper bound on the stored (compressed) bytes.
+    """
+
+    def __init__(self, path, max_bytes=CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0  # 304, served from the store
+        self.changed = 0  # revalidated, but a new body came back
+        self.misses = 0  # nothing stored, sent unconditionally
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS etags (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, '
+                        'link TEXT, body BLOB, size INTEGER, last_used REAL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS etags_lru ON etags (last_used)')
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM etags').fetchone()[0]
+
+    def get(self, url):
+        """
+        Returns the stored entry of a URL, or None (counted as a miss).
+
+        Returns:
+        - entry (dict): 'conditions' (request headers), 'headers' (stored response headers) and 'body'.
+        """
+        with self.lock:
+            row = self.db.execute('SELECT etag, last_modified, link, body FROM etags WHERE url = ?',
+                                  (url,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+        etag, last_modified, link, body = row
+        conditions = {}
+        if etag:
+            conditions['If-None-Match'] = etag
+        if last_modified:
+            conditions['If-Modified-Since'] = last_modified
+        return {'conditions': conditions, 'headers': {'Link': link} if link else {}, 'body': zlib.decompress(body)}
+
+    def hit(self, url):
+        # a 304 for url, its entry was used
+        with self.lock:
+            self.hits += 1
+            self.db.execute('UPDATE etags SET last_used = ? WHERE url = ?', (time.time(), url))
+            self.db.commit()
+
+    def put(self, url, response, changed=False):
+        # stores a 200 response that has a validator, changed=True when it replaces a stale entry
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        data = zlib.compress(response.content)
+        with self.lock:
+            if changed:
+                self.changed += 1
+            old = self.db.execute('SELECT size FROM etags WHERE url = ?', (url,)).fetchone()
+            if old is not None:
+                self.size -= old[0]
+            self.db.execute('INSERT OR REPLACE INTO etags VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (url, etag, last_modified, response.headers.get('Link'), data, len(data), time.time()))
+            self.size += len(data)
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        # drop the least recently used entries until the store fits again
+        while self.size > self.max_bytes:
+            rows = self.db.execute('SELECT url, size FROM etags ORDER BY last_used LIMIT 100').fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                self.db.execute('DELETE FROM etags WHERE url = ?', (url,))
+                self.size -= size
+                if self.size <= self.max_bytes:
+                    break
+
+    def stats(self):
+        # hit_rate is the share of the conditional requests answered with a 304
+        revalidated = self.hits + self.changed
+        return {'hits': self.hits, 'changed': self.changed, 'misses': self.misses,
+                'hit_rate': self.hits / revalidated if revalidated else 0.0, 'bytes': self.size}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def cached_response(url, body, headers=None):
+    # wraps a cached body so callers can keep using .content / .json() / .links as with a live response
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.headers.update(headers or {})
+    return response
+
+
+class TokenScheduler:
+    """
+    Picks the token with the most rate limit left instead of rotating blindly.
+
+    Remaining/reset come from the X-RateLimit-* headers of each response. A token
+    that was never used counts as having unlimited headroom, so every token gets
+    tried once. When all tokens are exhausted pick() sleeps until the earliest reset,
+    try_pick() returns how long to wait instead (the asyncio engine sleeps on its loop).
+    """
+
+    def __init__(self):
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def state(self, token):
+        if token not in self.tokens:
+            self.tokens[token] = {'requests': 0, 'limited': 0, 'remaining': None, 'limit': None, 'reset': 0}
+        return self.tokens[token]
+
+    def pick(self, lsttoken):
+        while True:
+            token, wait = self.try_pick(lsttoken)
+            if token is not None:
+                return token
+            print('All tokens are rate limited, sleeping ' + str(int(wait) + 1) + ' seconds')
+            time.sleep(max(wait, 0) + 1)
+
+    def try_pick(self, lsttoken):
+        # (token, 0) with the token reserved for one request, or (None, seconds until the earliest reset)
+        with self.lock:
+            now = time.time()
+            best = None
+            headroom = -1
+            for token in lsttoken:
+                state = self.state(token)
+                if state['remaining'] is not None and state['reset'] <= now:
+                    state['remaining'] = None  # the window has rolled over
+                left = float('inf') if state['remaining'] is None else state['remaining']
+                if left > headroom:
+                    best = token
+                    headroom = left
+            if headroom > 0:
+                state = self.state(best)
+                if state['remaining'] is not None:
+                    state['remaining'] -= 1  # reserve it for this request
+                state['requests'] += 1
+                return best, 0
+            return None, min(self.state(token)['reset'] for token in lsttoken) - now
+
+    def update(self, token, response):
+        """
+        Reads the rate limit headers of a response.
+
+        Returns:
+        - limited (bool): True if the request was refused because of the rate limit.
+        """
+        headers = response.headers
+        with self.lock:
+            state = self.state(token)
+            if 'X-RateLimit-Remaining' in headers:
+                state['remaining'] = int(headers['X-RateLimit-Remaining'])
+                state['limit'] = int(headers.get('X-RateLimit-Limit', 0)) or None
+                state['reset'] = int(headers.get('X-RateLimit-Reset', 0))
+            limited = response.status_code in (403, 429) and (state['remaining'] == 0 or 'Retry-After' in headers)
+            if limited:
+                state['limited'] += 1
+                if 'Retry-After' in headers:
+                    state['remaining'] = 0
+                    state['reset'] = time.time() + int(headers['Retry-After'])
+        return limited
+
+    def stats(self):
+        # per token usage, tokens shortened to their last 4 characters
+        with self.lock:
+            return {'...' + token[-4:]: dict(state) for token, state in self.tokens.items()}
+
+
+class GitHubClient:
+    """
+    Shared HTTP client for the GitHub API.
+
+    Keeps one requests.Session per token, each with its own keep-alive connection
+    pool, so consecutive calls reuse the TCP/TLS connection instead of opening a new
+    one per request. Responses are requested gzip-compressed and decoded transparently.
+
+    Commit detail requests are answered from the CommitCache when one is given,
+    other GETs are revalidated against the ETagStore when one is given, and tokens
+    are handed out by a TokenScheduler that follows the rate limit headers.
+
+    Parameters:
+    - pool_size (int): Connections kept open per token, should be >= the worker count.
+    - cache (CommitCache): Optional on-disk cache of commit details.
+    - etags (ETagStore): Optional on-disk store for conditional requests.
+    """
+
+    def __init__(self, pool_size=max(WORKERS, 10), cache=None, etags=None):
+        self.pool_size = pool_size
+        self.cache = cache
+        self.etags = etags
+        self.scheduler = TokenScheduler()
+        self.sessions = {}
+        self.lock = threading.Lock()
+
+    def session(self, token):
+        with self.lock:
+            session = self.sessions.get(token)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Authorization': 'Bearer {}'.format(token),
+                    'Accept': 'application/vnd.github+json',
+                    'Accept-Encoding': 'gzip',
+                })
+                self.sessions[token] = session
+        return session
+
+    def get(self, url, token):
+        """
+        Sends a GET request with the given token.
+
+        Returns:
+        - response (requests.Response): The raw response, or a cached commit detail.
+        """
+        return self.get_with_tokens(url, [token])
+
+    def get_with_tokens(self, url, lsttoken):
+        """
+        Sends a GET request with whichever token has the most rate limit left.
+
+        A request refused for the rate limit is retried with the next best token,
+        sleeping first if none has any requests left.
+
+        Returns:
+        - response (requests.Response): The raw response, or a cached commit detail / 304'd body.
+        """
+        match = COMMIT_URL.search(url) if self.cache else None
+        if match:
+            body = self.cache.get(match.group(1))
+            if body is not None:
+                return cached_response(url, body)
+        elif self.etags is not None:
+            return self.get_conditional(url, lsttoken)
+        response = self.send('GET', url, lsttoken)
+        if match and response.status_code == 200:
+            self.cache.put(match.group(1), response.content)
+        return response
+
+    def get_conditional(self, url, lsttoken):
+        # GET revalidated against the ETagStore, a 304 is answered with the stored body
+        entry = self.etags.get(url)
+        if entry is None:
+            response = self.send('GET', url, lsttoken)
+        else:
+            response = self.send('GET', url, lsttoken, headers=entry['conditions'])
+            if response.status_code == 304:
+                self.etags.hit(url)
+                return cached_response(url, entry['body'], entry['headers'])
+        if response.status_code == 200:
+            self.etags.put(url, response, changed=entry is not None)
+        return response
+
+    def post_with_tokens(self, url, lsttoken, payload):
+        # POSTs a JSON payload (GraphQL queries), scheduled like get_with_tokens
+        return self.send('POST', url, lsttoken, json=payload)
+
+    def send(self, method, url, lsttoken, **kwargs):
+        while True:
+            token = self.scheduler.pick(lsttoken)
+            response = self.session(token).request(method, url, **kwargs)
+            if not self.scheduler.update(token, response):
+                return response
+
+    def get_json(self, url, token):
+        return self.get(url, token).json()
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions = {}
+        if self.cache:
+            self.cache.close()
+        if self.etags:
+            self.etags.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process wide GitHubClient, every github_auth goes through this one.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient(cache=CommitCache(CACHE_PATH) if CACHE_PATH else None,
+                                   etags=ETagStore(CACHE_PATH) if CACHE_PATH else None)
+    return _client
+
+
+# GitHub Authentication function, same contract as the copies in the *_CollectFiles.py scripts
+def github_auth(url, lsttoken, ct):
+    jsonData = None
+    try:
+        ct = ct % len(lsttoken)
+        request = get_client().get_with_tokens(url, lsttoken)
+        jsonData = json.loads(request.content)
+        ct += 1
+    except Exception as e:
+        print(e)
+    return jsonData, ct
+
+
+class FairPool:
+    """
+    Worker threads shared by several repos that take turns between them.
+
+    Every repo gets its own queue (see queue()) and the workers pick the next
+    request from each non-empty queue in turn, so a repo with a long history
+    cannot starve the others of workers the way one FIFO queue would.
+
+    Parameters:
+    - workers (int): Number of requests in flight at once, across all repos.
+    """
+
+    def __init__(self, workers=WORKERS):
+        self.queues = OrderedDict()
+        self.closed = False
+        self.cond = threading.Condition()
+        self.threads = [threading.Thread(target=self.run, daemon=True) for _ in range(max(workers, 1))]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, key, fn, *args):
+        future = Future()
+        with self.cond:
+            self.queues.setdefault(key, deque()).append((future, fn, args))
+            self.cond.notify()
+        return future
+
+    def queue(self, key):
+        # an executor-like view of one repo's queue, for fetch_commit_details(pool=...)
+        return FairQueue(self, key)
+
+    def next_task(self):
+        with self.cond:
+            while not self.queues:
+                if self.closed:
+                    return None
+                self.cond.wait()
+            key, queue = next(iter(self.queues.items()))
+            task = queue.popleft()
+            if queue:
+                self.queues.move_to_end(key)  # the other repos go first next time
+            else:
+                del self.queues[key]
+            return task
+
+    def run(self):
+        while True:
+            task = self.next_task()
+            if task is None:
+                return
+            future, fn, args = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+
+class FairQueue:
+    def __init__(self, pool, key):
+        self.pool = pool
+        self.key = key
+
+    def submit(self, fn, *args):
+        return self.pool.submit(self.key, fn, *args)
+
+
+def fetch_commit_details(github_auth, repo, shas, lsttokens, ct, workers=WORKERS, pool=None):
+    """
+    Fetches the /commits/{sha} details for a page of commits.
+
+    Tokens are handed out by the client's thread safe TokenScheduler, the
+    counter is only passed through for the github_auth(url, lsttokens, ct)
+    contract of the scripts and plays no part in picking a token. The details are
+    returned in the same order as the shas no matter which request finished first.
+
+    Parameters:
+    - github_auth (function): The script's github_auth(url, lsttokens, ct).
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - shas (list): Commit shas of the current page.
+    - lsttokens (list): GitHub API tokens.
+    - ct (int): Token counter of the caller's loop.
+    - workers (int): Number of requests in flight at once.
+    - pool (FairQueue): Shared pool to run the requests on instead of a pool of `workers`.
+
+    Returns:
+    - details (list): Parsed commit details, one per sha.
+    - ct (int): The counter as github_auth returned it.
+    """
+    urls = [API_URL + '/repos/' + repo + '/commits/' + sha for sha in shas]
+    details = []
+    if pool is None and workers <= 1:
+        for url in urls:
+            shaDetails, ct = github_auth(url, lsttokens, ct)
+            details.append(shaDetails)
+        return details, ct
+
+    if pool is not None:
+        futures = [pool.submit(github_auth, url, lsttokens, ct + i) for i, url in enumerate(urls)]
+        results = [future.result() for future in futures]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(github_auth, url, lsttokens, ct + i) for i, url in enumerate(urls)]
+            results = [future.result() for future in futures]
+    for shaDetails, _ in results:
+        details.append(shaDetails)
+    if results:
+        ct = results[-1][1]
+    return details, ct
+
+
+def last_page(response):
+    # the page number of the rel="last" Link of a paginated response, None on the last page itself
+    if 'last' not in response.links:
+        return None
+    return int(parse_qs(urlparse(response.links['last']['url']).query)['page'][0])
+
+
+def commit_pages(repo, lsttokens, workers=WORKERS, start=1, pool=None):
+    """
+    Yields the commit list pages of a repo in page order, as (page, commits).
+
+    The first page requested names the last page in its Link header, so the end
+    is known up front: no empty page is requested after the last one, and the
+    following pages are requested in the background, up to `workers` pages ahead
+    of the one being yielded. When the generator is closed early (the mine
+    stopped) the pages not yet sent are dropped.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens.
+    - workers (int): Number of pages requested ahead.
+    - start (int): First page, e.g. the page a resumed CrawlJournal stopped at.
+    - pool (FairQueue): Shared pool to request the pages on instead of a pool of `workers`.
+    """
+    def fetch(page):
+        url = API_URL + '/repos/' + repo + '/commits?page=' + str(page) + '&per_page=100'
+        response = get_client().get_with_tokens(url, lsttokens)
+        response.raise_for_status()
+        return response
+
+    response = fetch(start)
+    commits = response.json()
+    last = last_page(response)
+    if last is None:
+        # the only (or an empty) page left
+        if commits:
+            yield start, commits
+        return
+
+    workers = max(workers, 1)
+    executor = ThreadPoolExecutor(max_workers=workers) if pool is None else pool
+    pending = deque()
+    ahead = start + 1
+    try:
+        while ahead <= last and len(pending) < workers:
+            pending.append((ahead, executor.submit(fetch, ahead)))
+            ahead += 1
+        yield start, commits
+        while pending:
+            page, future = pending.popleft()
+            if ahead <= last:
+                pending.append((ahead, executor.submit(fetch, ahead)))
+                ahead += 1
+            commits = future.result().json()
+            if not commits:
+                return
+            yield page, commits
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if pool is None:
+            executor.shutdown(wait=False)
+
+
+def compare_commits(repo, lsttokens, base, head='HEAD'):
+    """
+    Returns the shas of the commits reachable from head but not from base, newest first.
+
+    This is git's base..head, read from /compare/{base}...{head} 100 commits a page
+    (the Link header names the last page). Commits of merged branches are included
+    whatever their date.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens.
+    - base (str): Commit already mined, e.g. the checkpoint sha.
+    - head (str): Branch or commit to compare with.
+
+    Returns:
+    - shas (list): Commit shas newest first, or None when base is not an ancestor of
+      head (it is gone after a force-push or rebase, or the histories diverged).
+    """
+    url = API_URL + '/repos/' + repo + '/compare/' + base + '...' + head + '?per_page=100&page='
+    response = get_client().get_with_tokens(url + '1', lsttokens)
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    comparison = response.json()
+    if comparison['status'] not in ('ahead', 'identical'):
+        return None
+    shas = [commit['sha'] for commit in comparison['commits']]
+    for page in range(2, (last_page(response) or 1) + 1):
+        response = get_client().get_with_tokens(url + str(page), lsttokens)
+        response.raise_for_status()
+        shas += [commit['sha'] for commit in response.json()['commits']]
+    if len(shas) != comparison['total_commits']:
+        raise RuntimeError('compare of ' + repo + ' listed ' + str(len(shas)) + ' of '
+                           + str(comparison['total_commits']) + ' commits')
+    # the compare API lists the commits oldest first
+    shas.reverse()
+    return shas
+
+
+def commit_files(repo, shaDetails, lsttokens, workers=WORKERS, pool=None):
+    """
+    Yields every file object of a commit, following the pagination of big file lists.
+
+    /commits/{sha} only lists the first FILES_PER_PAGE files of a commit. For larger
+    ones page 2 is fetched to learn the last page from its Link header, then the
+    remaining pages are fetched `workers` at a time and yielded in page order, so
+    no more than `workers` pages are held in memory at once.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - shaDetails (dict): Parsed /commits/{sha} response (page 1).
+    - lsttokens (list): GitHub API tokens.
+    - workers (int): Number of pages fetched at once.
+    - pool (FairQueue): Shared pool to request the pages on instead of a pool of `workers`.
+    """
+    yield from shaDetails['files']
+    if len(shaDetails['files']) < FILES_PER_PAGE:
+        return
+
+    url = API_URL + '/repos/' + repo + '/commits/' + shaDetails['sha'] + '?page='
+
+    def fetch(page):
+        response = get_client().get_with_tokens(url + str(page), lsttokens)
+        response.raise_for_status()
+        return response
+
+    response = fetch(2)
+    yield from response.json()['files']
+    last = last_page(response)
+    if last is None:
+        return
+    workers = max(workers, 1)
+    pages = list(range(3, last + 1))
+    executor = ThreadPoolExecutor(max_workers=workers) if pool is None else pool
+    try:
+        for i in range(0, len(pages), workers):
+            futures = [executor.submit(fetch, page) for page in pages[i:i + workers]]
+            for future in futures:
+                yield from future.result().json()['files']
+    finally:
+        if pool is None:
+            executor.shutdown(wait=False)
@@ -0,0 +1,206 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+from github_api import API_URL, CACHE_PATH, get_client
+from mining_pipeline import FileMatcher
+
+# Language resolution for the language based miners (Justin, Peyton): which
+# languages a repo uses and which files belong to them.
+#
+# The /repos/{repo}/languages answer of every repo is kept for LANGUAGES_TTL
+# seconds, in the github_cache.sqlite file next to the commit details (or only in
+# memory when GITHUB_CACHE is ''), so a rerun or a batch of repos does not wait on
+# it again. languages.json is a linguist style table of ~180 languages with their
+# extensions and exact file names, read the first time it is needed. With it the
+# languages can also be told from a list of paths, without the API call.
+#
+# GITHUB_LANGUAGES=local skips that request in the miners: they keep the files of
+# every language of their mapping and classify() the mined paths afterwards.
+
+LANGUAGES_TTL = int(os.environ.get('GITHUB_LANGUAGES_TTL', 24 * 3600))
+LOCAL_LANGUAGES = os.environ.get('GITHUB_LANGUAGES', 'api') == 'local'
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'languages.json')
+
+
+class LanguageResolver:
+    """
+    Cached repo languages and the built-in language table, shared by every repo of a run.
+
+    Parameters:
+    - cache_path (str): SQLite file for the per-repo languages, '' keeps them in memory only.
+    - ttl (float): Seconds a repo's languages stay valid.
+    - table_path (str): JSON table of language -> extensions / file names.
+    """
+
+    def __init__(self, cache_path=CACHE_PATH, ttl=LANGUAGES_TTL, table_path=TABLE_PATH):
+        self.ttl = ttl
+        self.table_path = table_path
+        self._table = None
+        self.by_name = None
+        self.by_suffix = None
+        self.matchers = {}
+        self.memory = {}
+        self.hits = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if cache_path:
+            self.db = sqlite3.connect(cache_path, check_same_thread=False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS languages (repo TEXT PRIMARY KEY, body TEXT, fetched REAL)')
+            self.db.commit()
+
+    @property
+    def table(self):
+        return self.load()
+
+    def load(self):
+        # language -> patterns, read on first use
+        with self.lock:
+            if self._table is None:
+                with open(self.table_path, 'r') as f:
+                    table = json.load(f)
+                # the first language listed for an extension or name is the one paths are counted for
+                self.by_name = {}
+                self.by_suffix = {}
+                for language, patterns in table.items():
+                    for pattern in patterns:
+                        lookup = self.by_suffix if pattern.startswith('.') else self.by_name
+                        lookup.setdefault(pattern, language)
+                self._table = table
+        return self._table
+
+    def cached(self, repo):
+        # the stored languages of repo if younger than the TTL, else None
+        with self.lock:
+            entry = self.memory.get(repo)
+            if entry is None and self.db is not None:
+                row = self.db.execute('SELECT body, fetched FROM languages WHERE repo = ?', (repo,)).fetchone()
+                if row is not None:
+                    entry = (json.loads(row[0]), row[1])
+                    self.memory[repo] = entry
+        if entry is None or time.time() - entry[1] > self.ttl:
+            return None
+        return entry[0]
+
+    def store(self, repo, languages):
+        fetched = time.time()
+        with self.lock:
+            self.memory[repo] = (languages, fetched)
+            if self.db is not None:
+                self.db.execute('INSERT OR REPLACE INTO languages VALUES (?, ?, ?)',
+                                (repo, json.dumps(languages), fetched))
+                self.db.commit()
+
+    def languages(self, repo, lsttokens, files=None):
+        """
+        Returns the languages of a repo, largest first like the GitHub API.
+
+        A cached answer younger than the TTL is used as is. Otherwise, when files are
+        given, the languages are classified locally from those paths and no request is
+        sent. Without files, /repos/{repo}/languages is asked and its answer cached.
+        If that request fails, an empty list is returned and nothing is cached.
+
+        Parameters:
+        - repo (str): GitHub repository in the format 'owner/repo'.
+        - lsttokens (list): GitHub API tokens.
+        - files (iterable): Paths of the repo to classify instead of calling the API.
+
+        Returns:
+        - languages (list): Language names.
+        """
+        languages = self.cached(repo)
+        if languages is not None:
+            self.hits += 1
+            return list(languages)
+        if files is not None:
+            languages = self.classify(files)
+        else:
+            self.requests += 1
+            try:
+                response = get_client().get_with_tokens(API_URL + '/repos/' + repo + '/languages', lsttokens)
+                languages = response.json() if response.status_code == 200 else None
+            except Exception as e:
+                print(e)
+                return []
+            if not isinstance(languages, dict):
+                return []  # not cached, the next run asks again
+        self.store(repo, languages)
+        return list(languages)
+
+    def language_of(self, path):
+        # the language of one path: exact file name first, then the longest known extension
+        if self._table is None:
+            self.load()
+        basename = path.rpartition('/')[2]
+        language = self.by_name.get(basename)
+        if language is not None:
+            return language
+        dot = basename.find('.')
+        while dot != -1:
+            language = self.by_suffix.get(basename[dot:])
+            if language is not None:
+                return language
+            dot = basename.find('.', dot + 1)
+        return None
+
+    def classify(self, files):
+        """
+        Counts the paths of every language, the local stand-in for /repos/{repo}/languages.
+
+        Returns:
+        - languages (dict): Language -> number of files, largest first.
+        """
+        counts = Counter(language for language in map(self.language_of, files) if language is not None)
+        return dict(counts.most_common())
+
+    def patterns(self, languages, mapping=None):
+        """
+        The extensions and file names of the languages.
+
+        Parameters:
+        - languages (iterable): Language names.
+        - mapping (dict): Language -> patterns to use instead of the built-in table, languages
+          missing from it are skipped (the scripts' own LANGUAGE_MAPPING / mapping).
+
+        Returns:
+        - patterns (list): Patterns in language order, duplicates kept once.
+        """
+        mapping = self.table if mapping is None else mapping
+        return list(dict.fromkeys(pattern for language in languages for pattern in mapping.get(language, ())))
+
+    def matcher(self, languages, mapping=None, exclude=()):
+        # FileMatcher of the languages, compiled once per set of languages for the whole run
+        patterns = self.patterns(languages, mapping)
+        key = (tuple(patterns), tuple(exclude))
+        matcher = self.matchers.get(key)
+        if matcher is None:
+            matcher = self.matchers[key] = FileMatcher(patterns, exclude)
+        return matcher
+
+    def stats(self):
+        return {'hits': self.hits, 'requests': self.requests}
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver():
+    """
+    Returns the process wide LanguageResolver, like get_client() for the HTTP client.
+    """
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = LanguageResolver()
+    return _resolver
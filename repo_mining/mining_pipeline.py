@@ -0,0 +1,652 @@
+import csv
+import heapq
+import json
+import os
+import re
+import subprocess
+import tempfile
+
+from fnmatch import translate
+
+from datetime import datetime, timezone
+
+from github_api import (API_URL, FILES_PER_PAGE, WORKERS, commit_files, commit_pages, compare_commits,
+                        fetch_commit_details, get_client, github_auth)
+from touch_store import PARQUET, TouchStore, parquet_path, store_path
+
+# Single pass mining: walk_commits visits every commit once and mine() hands each
+# commit record to any number of aggregators, so the touch counts and the
+# author/date rows come out of the same traversal instead of one walk each.
+#
+# A commit record is a dict:
+#   {'sha': str, 'author': str, 'date': 'YYYY-MM-DDTHH:MM:SSZ', 'files': [filename, ...]}
+#
+# Commits with more than FILES_PER_PAGE files come as several records with the same
+# sha, one per page of files, the ones after the first carry 'part': 1, 2, ...
+
+
+def commit_record(shaDetails, files=None, part=0):
+    """
+    Yields the record(s) of a commit detail, one per FILES_PER_PAGE files.
+
+    Parameters:
+    - shaDetails (dict): Parsed /commits/{sha} response.
+    - files (iterable): File objects of the commit, defaults to shaDetails['files'].
+    - part (int): Number of the first record, for files that start on a later page of the
+      commit (async_mining.py turns the file pages into records one page at a time).
+    """
+    author = shaDetails['commit']['author']
+    record = {'sha': shaDetails['sha'], 'author': author['name'], 'date': author['date'], 'files': []}
+    if part:
+        record['part'] = part
+    start = part
+    for filenameObj in shaDetails['files'] if files is None else files:
+        record['files'].append(filenameObj['filename'])
+        if len(record['files']) == FILES_PER_PAGE:
+            yield record
+            part += 1
+            record = dict(record, files=[], part=part)
+    if record['files'] or part == start == 0:
+        yield record
+
+
+def walk_commits(repo, lsttokens, workers=WORKERS, shas=None, pool=None):
+    """
+    Yields one record per commit of the repo, newest first, through the REST API.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens.
+    - workers (int): Number of commit details fetched at once.
+    - shas (list): Only these commits, in this order (e.g. from github_api.compare_commits),
+      instead of every commit of the commit list.
+    - pool (FairQueue): Shared worker pool for the list, detail and file page requests,
+      see github_api.FairPool.
+    """
+    if shas is None:
+        pages = ([shaObject['sha'] for shaObject in jsonCommits]
+                 for _, jsonCommits in commit_pages(repo, lsttokens, workers, pool=pool))
+    else:
+        pages = (shas[i:i + 100] for i in range(0, len(shas), 100))
+    ct = 0  # token counter
+    for page in pages:
+        lstDetails, ct = fetch_commit_details(github_auth, repo, page, lsttokens, ct, workers, pool)
+        for shaDetails in lstDetails:
+            # big commits are streamed page by page instead of collecting every file first
+            yield from commit_record(shaDetails, commit_files(repo, shaDetails, lsttokens, workers, pool))
+
+
+# Commits per GraphQL request and how deep the trees are expanded (path components)
+GRAPHQL_BATCH = 10
+GRAPHQL_DEPTH = 16
+
+
+def tree_fields(depth):
+    # GraphQL fragments cannot recurse, so the tree is spelled out `depth` levels deep
+    fields = 'entries { path oid mode type'
+    if depth > 1:
+        fields += ' object { ... on Tree { ' + tree_fields(depth - 1) + ' } }'
+    return fields + ' }'
+
+
+def history_query(batch, depth):
+    tree = 'tree { ' + tree_fields(depth) + ' }'
+    return ('query($owner: String!, $name: String!, $cursor: String) { '
+            'repository(owner: $owner, name: $name) { defaultBranchRef { target { ... on Commit { '
+            'history(first: ' + str(batch) + ', after: $cursor) { '
+            'pageInfo { hasNextPage endCursor } '
+            'nodes { oid author { name date } ' + tree + ' parents(first: 1) { nodes { ' + tree + ' } } } '
+            '} } } } } }')
+
+
+def flatten_tree(tree, files):
+    # path -> (blob oid, mode) for every file of a (nested) GraphQL tree
+    for entry in tree['entries']:
+        if entry['type'] != 'tree':
+            files[entry['path']] = (entry['oid'], entry['mode'])
+        elif 'object' not in entry:
+            raise RuntimeError(entry['path'] + ' is nested deeper than the query, use a larger depth or REST')
+        elif entry['object']:
+            flatten_tree(entry['object'], files)
+    return files
+
+
+def graphql_record(node):
+    """
+    Turns a GraphQL history node into a commit record.
+
+    GraphQL has no per-commit file list, so the touched files are the paths whose
+    blob or mode differs between the commit's tree and its first parent's tree, in
+    the path order the REST API lists them. Dates are converted to UTC like the REST ones.
+
+    A removed path whose blob reappears under a new path is a rename and only the
+    new path is kept, like REST and git log. A file renamed and edited in the same
+    commit cannot be told apart from a removal plus an addition and keeps both paths,
+    where REST may report a rename.
+    """
+    files = flatten_tree(node['tree'], {})
+    parents = node['parents']['nodes']
+    before = flatten_tree(parents[0]['tree'], {}) if parents else {}
+    changed = [path for path in files if before.get(path) != files[path]]
+    added = {files[path][0] for path in changed if path not in before}
+    changed += [path for path in before if path not in files and before[path][0] not in added]
+    date = datetime.fromisoformat(node['author']['date'].replace('Z', '+00:00'))
+    return {
+        'sha': node['oid'],
+        'author': node['author']['name'],
+        'date': date.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'files': sorted(changed),
+    }
+
+
+def walk_graphql(repo, lsttokens, shas=None, batch=GRAPHQL_BATCH, depth=GRAPHQL_DEPTH):
+    """
+    Yields the same commit records as walk_commits with one GraphQL request per `batch` commits.
+
+    The REST walk costs a list request plus one request per commit, here a single
+    history query returns the author, date and trees of a whole batch. Every commit
+    brings its whole tree and its parent's, so a response grows with the size of the
+    repo, not of the commit: lower `batch` for large trees. A file nested deeper than
+    `depth` directories raises a RuntimeError instead of being left out.
+    See graphql_record for the file lists that can differ from REST.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens.
+    - shas (list): Only yield these commits (e.g. from github_api.compare_commits), the
+      history is read until all of them were seen.
+    - batch (int): Commits per request, large trees may need a smaller batch.
+    - depth (int): Directory levels expanded.
+    """
+    owner, name = repo.split('/')
+    query = history_query(batch, depth)
+    wanted = None if shas is None else set(shas)
+    cursor = None
+    while wanted is None or wanted:
+        payload = {'query': query, 'variables': {'owner': owner, 'name': name, 'cursor': cursor}}
+        result = get_client().post_with_tokens(API_URL + '/graphql', lsttokens, payload).json()
+        if result.get('errors'):
+            raise RuntimeError(result['errors'][0]['message'])
+        history = result['data']['repository']['defaultBranchRef']['target']['history']
+        for node in history['nodes']:
+            if wanted is None:
+                yield graphql_record(node)
+            elif node['oid'] in wanted:
+                wanted.discard(node['oid'])
+                yield graphql_record(node)
+                if not wanted:
+                    return
+        if not history['pageInfo']['hasNextPage']:
+            break
+        cursor = history['pageInfo']['endCursor']
+
+
+def clone_repo(repo, path, url=None):
+    """
+    Makes (or updates) a bare clone of a GitHub repo for walk_git_log.
+
+    The clone is a full one: git log --name-only compares blob contents to find
+    renames, which in a blobless (--filter=blob:none) clone fetches the missing
+    blobs from the remote one request at a time. An existing clone fetches the
+    branch its HEAD points at, force-pushes included.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - path (str): Directory of the bare clone.
+    - url (str): Remote to clone instead of https://github.com/<repo>.git.
+    """
+    if not os.path.exists(path):
+        subprocess.run(['git', 'clone', '--quiet', '--bare', url or 'https://github.com/' + repo + '.git', path],
+                       check=True)
+        return
+    branch = subprocess.run(['git', '-C', path, 'symbolic-ref', 'HEAD'], stdout=subprocess.PIPE, text=True,
+                            check=True).stdout.strip()
+    # a refs/heads/HEAD left by older versions (fetch +HEAD:HEAD) makes HEAD ambiguous
+    subprocess.run(['git', '-C', path, 'update-ref', '-d', 'refs/heads/HEAD'], check=True)
+    subprocess.run(['git', '-C', path, 'fetch', '--quiet', 'origin', '+' + branch + ':' + branch], check=True)
+
+
+def is_ancestor(path, sha):
+    # True if sha is in the history of the clone's HEAD, False if unknown (force-push, rebase) or not merged
+    result = subprocess.run(['git', '-C', path, 'merge-base', '--is-ancestor', sha, 'HEAD'],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return result.returncode == 0
+
+
+def walk_git_log(path, stop_sha=None):
+    """
+    Yields the same commit records as walk_commits, read from a local clone instead of the API.
+
+    Streams `git log --name-only` so memory stays flat on long histories. Dates are
+    the author dates in UTC, merges list the files changed against their first
+    parent like the GitHub commit API does.
+
+    Parameters:
+    - path (str): Path of a (bare) clone, see clone_repo.
+    - stop_sha (str): Only yield the commits not reachable from this one (git's stop_sha..HEAD).
+    """
+    command = ['git', '-C', path, '-c', 'core.quotePath=false', 'log', '--name-only',
+               '--diff-merges=first-parent', '--date=format-local:%Y-%m-%dT%H:%M:%SZ',
+               '--format=%x01%H%x1f%an%x1f%ad']
+    if stop_sha:
+        command.append(stop_sha + '..HEAD')
+    env = dict(os.environ, TZ='UTC')
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, env=env, encoding='utf-8', errors='replace')
+    commit = None
+    for line in process.stdout:
+        line = line.rstrip('\n')
+        if line.startswith('\x01'):
+            if commit:
+                yield commit
+            sha, author, date = line[1:].split('\x1f')
+            commit = {'sha': sha, 'author': author, 'date': date, 'files': []}
+        elif line:
+            commit['files'].append(line)
+    if commit:
+        yield commit
+    if process.wait() != 0:
+        raise RuntimeError('git log failed in ' + path)
+
+
+class FileMatcher:
+    """
+    Tells which paths are source files, compiled once from the patterns of a mapping.
+
+    Patterns starting with '.' are extensions, checked with a single str.endswith
+    on a tuple of all of them. Other plain patterns (e.g. 'CMakeLists.txt') are
+    exact file names, looked up by basename in a set. Patterns with * ? or [ are
+    globs on the whole path, with '*' also crossing '/'. A path matching one of the
+    exclude globs (e.g. '*/vendor/*') is never kept, an exclude starting with '*/'
+    also drops the top-level directory ('vendor/...'). Duplicate patterns, such as
+    '.h' from both C and C++, count once, so every path is matched at most once.
+
+    Parameters:
+    - patterns (iterable): Extensions, file names and globs to keep.
+    - exclude (iterable): Globs of paths to drop.
+    """
+
+    def __init__(self, patterns, exclude=()):
+        patterns = list(dict.fromkeys(pattern for pattern in patterns if pattern))
+        globs = [pattern for pattern in patterns if any(c in pattern for c in '*?[')]
+        self.suffixes = tuple(pattern for pattern in patterns if pattern.startswith('.') and pattern not in globs)
+        self.names = frozenset(pattern for pattern in patterns if not pattern.startswith('.') and pattern not in globs)
+        self.name_endings = tuple(self.names)  # cheap endswith check before splitting off the basename
+        self.globs = re.compile('|'.join(map(translate, globs))).match if globs else None
+        # '*/vendor/*' needs a '/' before vendor, 'vendor/*' covers the repo root
+        exclude = [glob for pattern in exclude if pattern
+                   for glob in ([pattern, pattern[2:]] if pattern.startswith('*/') else [pattern])]
+        self.exclude = re.compile('|'.join(map(translate, exclude))).match if exclude else None
+
+    @classmethod
+    def for_languages(cls, languages, mapping, exclude=()):
+        # The patterns of every language in mapping, e.g. LANGUAGE_MAPPING of Justin_authorsFileTouches.py
+        return cls([pattern for language in languages for pattern in mapping.get(language, ())], exclude)
+
+    def __call__(self, path):
+        if not (path.endswith(self.suffixes)
+                or (path.endswith(self.name_endings) and path.rpartition('/')[2] in self.names)
+                or (self.globs and self.globs(path))):
+            return False
+        # the exclude globs only run on the paths that would be kept
+        return not (self.exclude and self.exclude(path))
+
+    def filter(self, paths):
+        # The matching paths of a list, in order, same checks as __call__ without a call per path
+        suffixes, endings, names, globs = self.suffixes, self.name_endings, self.names, self.globs
+        if globs:
+            kept = [path for path in paths if path.endswith(suffixes)
+                    or (path.endswith(endings) and path.rpartition('/')[2] in names) or globs(path)]
+        elif names:
+            kept = [path for path in paths if path.endswith(suffixes)
+                    or (path.endswith(endings) and path.rpartition('/')[2] in names)]
+        else:
+            kept = [path for path in paths if path.endswith(suffixes)]
+        if self.exclude:
+            exclude = self.exclude
+            kept = [path for path in kept if not exclude(path)]
+        return kept
+
+
+class ExtensionFilter:
+    """
+    Passes only the files ending in one of the extensions on to the wrapped aggregators.
+
+    Parameters:
+    - extensions (list or FileMatcher): File endings to keep, e.g. ['.java', '.kt'], or a
+      FileMatcher for file names, globs and excludes.
+    - aggregators: Aggregators that receive the filtered commits.
+    """
+
+    def __init__(self, extensions, *aggregators):
+        self.matcher = extensions if isinstance(extensions, FileMatcher) else FileMatcher(extensions)
+        self.aggregators = aggregators
+
+    def add(self, commit):
+        files = self.matcher.filter(commit['files'])
+        if not files:
+            return
+        filtered = dict(commit, files=files)
+        for aggregator in self.aggregators:
+            aggregator.add(filtered)
+
+
+class NewestCommit:
+    # Remembers the first commit of the walk, which is the newest one, for the checkpoint
+    def __init__(self):
+        self.sha = None
+        self.date = None
+
+    def add(self, commit):
+        if self.sha is None:
+            self.sha = commit['sha']
+            self.date = commit['date']
+
+
+def mine(commits, aggregators):
+    """
+    Feeds every commit record to every aggregator.
+
+    Parameters:
+    - commits (iterable): Commit records, e.g. from walk_commits.
+    - aggregators (list): Objects with an add(commit) method.
+
+    Returns:
+    - count (int): Number of commits visited.
+    """
+    count = 0
+    for commit in commits:
+        for aggregator in aggregators:
+            aggregator.add(commit)
+        if not commit.get('part'):
+            count += 1
+    return count
+
+
+def write_touch_counts(dictfiles, fileOutput):
+    # Writes the file_<repo>.csv of countfiles and prints the most touched file
+    with open(fileOutput, 'w') as fileCSV:
+        writer = csv.writer(fileCSV)
+        writer.writerow(["Filename", "Touches"])
+        bigcount = None
+        bigfilename = None
+        for filename, count in dictfiles.items():
+            writer.writerow([filename, count])
+            if bigcount is None or count > bigcount:
+                bigcount = count
+                bigfilename = filename
+    print('Total number of files: ' + str(len(dictfiles)))
+    if bigfilename is not None:
+        print('The file ' + bigfilename + ' has been touched ' + str(bigcount) + ' times.')
+
+
+class TouchSpool:
+    """
+    Filename,Author,Date touches written to disk as they come instead of kept in a dict.
+
+    Rows are appended to a spool file (flushed every `flush_every` rows) while the
+    crawl runs, each prefixed with the position at which its file was first seen.
+    write_csv() then groups them by that position, keeping the order the touches
+    arrived in, with an external merge sort: at most `chunk_rows` rows are sorted in
+    memory at a time and spilled to temporary run files that are merged at the end.
+    The output is the same as writing the files_dict of collect_commit_data, but
+    memory only grows with the number of distinct files, not with the history.
+
+    Parameters:
+    - path (str): Spool file, truncated to `offset` bytes when opened.
+    - offset (int): Bytes of an earlier spool to keep, see tell(). Raises ValueError when
+      the spool is missing or shorter, the journal it came from has to be deleted then.
+    - flush_every (int): Rows between flushes of the spool file.
+    - chunk_rows (int): Rows sorted in memory at once by write_csv().
+    """
+
+    def __init__(self, path, offset=0, flush_every=1000, chunk_rows=200000):
+        self.path = path
+        self.flush_every = flush_every
+        self.chunk_rows = chunk_rows
+        self.pending = 0
+        self.order = {}
+        if offset:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size < offset:
+                raise ValueError('cannot resume: ' + path + ' holds ' + str(size) + ' of the ' + str(offset)
+                                 + ' bytes the journal expects, delete the journal to start over')
+            self.spool = open(path, 'r+', newline='', encoding='utf-8')
+            self.spool.truncate(offset)
+            for row in csv.reader(self.spool):
+                self.order.setdefault(row[1], int(row[0]))
+        else:
+            self.spool = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.spool)
+
+    def write(self, filename, author, date):
+        index = self.order.get(filename)
+        if index is None:
+            index = self.order[filename] = len(self.order)
+        self.writer.writerow([index, filename, author, date])
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.spool.flush()
+            self.pending = 0
+
+    def add(self, commit):
+        # lets the spool be an aggregator in mine()
+        for filename in commit['files']:
+            self.write(filename, commit['author'], commit['date'])
+
+    def tell(self):
+        # bytes of the spool holding every row written so far, journal state for resuming
+        self.spool.flush()
+        self.pending = 0
+        return self.spool.tell()
+
+    def runs(self, tmpdir):
+        # sorted runs of spool lines, python's sort is stable so touches keep their order per file
+        runs = []
+        chunk = []
+        with open(self.path, 'r', newline='', encoding='utf-8') as spool:
+            for line in spool:
+                chunk.append((int(line[:line.index(',')]), line))
+                if len(chunk) >= self.chunk_rows:
+                    runs.append(self.spill(chunk, tmpdir))
+                    chunk = []
+        chunk.sort(key=lambda item: item[0])
+        runs.append(chunk)
+        return runs
+
+    def spill(self, chunk, tmpdir):
+        chunk.sort(key=lambda item: item[0])
+        with tempfile.NamedTemporaryFile('w', dir=tmpdir, suffix='.run', newline='', encoding='utf-8',
+                                         delete=False) as run:
+            run.writelines(line for _, line in chunk)
+        return run.name
+
+    def read_run(self, path):
+        with open(path, 'r', newline='', encoding='utf-8') as run:
+            for line in run:
+                yield int(line[:line.index(',')]), line
+
+    def write_csv(self, fileOutput):
+        """
+        Writes the Filename,Author,Date CSV grouped by filename.
+
+        The spool lines are already CSV, so after the merge only the position prefix
+        is cut off. The earlier run wins ties, which keeps every file's touches in order.
+
+        Returns:
+        - files (int): Number of distinct files.
+        """
+        self.tell()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(fileOutput))) as tmpdir:
+            runs = [self.read_run(run) if isinstance(run, str) else run for run in self.runs(tmpdir)]
+            with open(fileOutput, 'w', newline='', encoding='utf-8') as fileCSV:
+                csv.writer(fileCSV).writerow(["Filename", "Author", "Date"])
+                fileCSV.writelines(line[line.index(',') + 1:] for _, line in heapq.merge(*runs, key=lambda item: item[0]))
+        return len(self.order)
+
+    def close(self, remove=True):
+        self.spool.close()
+        if remove and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class CrawlJournal:
+    """
+    Durable progress of a long crawl so a crashed or rate-limited run can resume.
+
+    Records the commit-list page being worked on, the shas already processed and a
+    snapshot of the partial results, and rewrites the JSON file atomically every
+    `every` commits and at the end of every page. It is only written at those points,
+    so a crash mid-commit never leaves a half-counted commit in the journal.
+
+    Parameters:
+    - path (str): JSON file of the journal, loaded when it exists.
+    - every (int): Number of processed commits between flushes.
+    """
+
+    def __init__(self, path, every=50):
+        self.path = path
+        self.every = every
+        self.page = 1
+        self.shas = set()
+        self.data = None
+        self.state = None
+        self.pending = 0
+        self.resumed = os.path.exists(path)
+        if self.resumed:
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            self.page = saved['page']
+            self.shas = set(saved['shas'])
+            self.data = saved['data']
+            print('Resuming at page ' + str(self.page) + ' with ' + str(len(self.shas)) + ' commits done')
+
+    def done(self, sha, state):
+        """
+        Marks a commit as fully processed.
+
+        Parameters:
+        - sha (str): The commit just processed.
+        - state: Partial results including this commit, JSON-able or a function returning them.
+        """
+        self.shas.add(sha)
+        self.state = state
+        self.pending += 1
+        if self.pending >= self.every:
+            self.flush()
+
+    def next_page(self, page, state):
+        self.page = page
+        self.state = state
+        self.flush()
+
+    def flush(self):
+        data = self.state() if callable(self.state) else self.state
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'page': self.page, 'shas': sorted(self.shas), 'data': data}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        self.pending = 0
+
+    def finish(self):
+        # the crawl completed, the next run starts from scratch
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def load_checkpoint(fileInput):
+    if not os.path.exists(fileInput):
+        return None
+    with open(fileInput, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(fileOutput, sha, date):
+    with open(fileOutput, 'w') as f:
+        json.dump({'sha': sha, 'date': date}, f)
+
+
+def mine_repo(repo, lsttokens, extensions, touchesOutput, authorsOutput, checkpointOutput,
+              incremental=False, workers=WORKERS, clone=None, graphql=False, pool=None, asynchronous=False):
+    """
+    Mines the touch counts and author/date touches of a repo in one walk and writes both CSVs.
+
+    The touches are collected in a TouchStore, which writes both CSVs and is saved
+    next to the authors CSV (.touches, and .parquet when pyarrow is installed). The newest commit
+    seen is saved to checkpointOutput. With incremental=True and a checkpoint from an
+    earlier run, only the commits reachable from HEAD but not from the checkpoint are
+    fetched (the compare API, or stop..HEAD for a clone) and put in front of the earlier
+    touches. When the checkpoint is no longer in the history (force-push, rebase) every
+    commit is mined again.
+
+    The touch counts and the set of rows match a full run. The row order only differs
+    when a merge brings in commits dated before the checkpoint: a full run lists them
+    by date among the old rows, an incremental run puts them with the new ones.
+
+    Parameters:
+    - repo (str): GitHub repository in the format 'owner/repo'.
+    - lsttokens (list): GitHub API tokens.
+    - extensions (list or FileMatcher): File endings to keep.
+    - touchesOutput (str): Path of the Filename,Touches CSV.
+    - authorsOutput (str): Path of the Filename,Author,Date CSV.
+    - checkpointOutput (str): Path of the JSON checkpoint.
+    - incremental (bool): Continue from the checkpoint instead of walking everything.
+    - workers (int): Number of commit details fetched at once.
+    - clone (str): Path of a local clone to read with git log instead of calling the API.
+    - graphql (bool): Fetch the history with batched GraphQL queries instead of REST.
+    - pool (FairQueue): Shared worker pool for the REST requests, used by batch_mining.py.
+    - asynchronous (bool): Walk the REST history with the asyncio engine of async_mining.py,
+      up to `workers` requests in flight on non-blocking connections (pool is not used).
+
+    Returns:
+    - store (TouchStore): Every touch of the kept files, newest commit first.
+    """
+    checkpoint = None
+    if incremental and os.path.exists(touchesOutput) and os.path.exists(authorsOutput):
+        checkpoint = load_checkpoint(checkpointOutput)
+
+    # the exact set of new commits: everything reachable from HEAD but not from the checkpoint
+    new_shas = None
+    if checkpoint:
+        if clone:
+            known = is_ancestor(clone, checkpoint['sha'])
+        else:
+            new_shas = compare_commits(repo, lsttokens, checkpoint['sha'])
+            known = new_shas is not None
+        if not known:
+            print('Checkpoint ' + checkpoint['sha'] + ' is not in the history of ' + repo
+                  + ' any more (force-push or rebase), mining every commit again')
+            checkpoint = None
+
+    store = TouchStore()
+    newest = NewestCommit()
+    if clone:
+        commits = walk_git_log(clone, stop_sha=checkpoint['sha'] if checkpoint else None)
+    elif graphql:
+        commits = walk_graphql(repo, lsttokens, shas=new_shas)
+    elif asynchronous:
+        commits = None
+    else:
+        commits = walk_commits(repo, lsttokens, workers, shas=new_shas, pool=pool)
+    aggregators = [newest, ExtensionFilter(extensions, store)]
+    if commits is None:
+        from async_mining import mine_commits  # imported here, async_mining imports this module
+        count = mine_commits(repo, lsttokens, aggregators, workers, shas=new_shas)
+    else:
+        count = mine(commits, aggregators)
+
+    if checkpoint:
+        print('Mined ' + str(count) + ' commits newer than ' + checkpoint['sha'])
+        # a full walk sees the new commits first, so the earlier touches go behind them
+        store.extend(TouchStore.open(authorsOutput))
+
+    write_touch_counts(store.touch_counts(), touchesOutput)
+    store.write_csv(authorsOutput)
+    store.save(store_path(authorsOutput))
+    if PARQUET:
+        store.write_parquet(parquet_path(authorsOutput))
+    if newest.sha is not None:
+        save_checkpoint(checkpointOutput, newest.sha, newest.date)
+    return store
+
@@ -0,0 +1,106 @@
+import asyncio
+import gzip
+import json
+
+import pytest
+
+import github_api
+from async_mining import AsyncClient, StreamTransport
+from fake_github import FakeGitHub
+
+# Unit checks of the asyncio engine's HTTP client, the end to end run is in test_mining.py.
+
+
+async def serve(answers):
+    # a server that answers the requests in turn with the raw answers of (answer, hang_up) pairs,
+    # closing the connection after the ones with hang_up, returns the server, its URL and the
+    # (connection number, request line) of every request
+    seen = []
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        while answers:
+            line = await reader.readline()
+            if not line:
+                break
+            while await reader.readline() not in (b'\r\n', b''):
+                pass
+            seen.append((len(connections), line.decode().strip()))
+            answer, hang_up = answers.pop(0)
+            writer.write(answer)
+            await writer.drain()
+            if hang_up:
+                break
+        writer.close()
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, 'http://127.0.0.1:' + str(server.sockets[0].getsockname()[1]), seen
+
+
+def answer(body, *headers):
+    return ('HTTP/1.1 200 OK\r\n' + ''.join(h + '\r\n' for h in headers) + '\r\n').encode() + body
+
+
+async def get_all(answers, paths):
+    server, url, seen = await serve(answers)
+    transport = StreamTransport(4)
+    try:
+        responses = []
+        for path in paths:
+            responses.append(await transport.request('GET', url + path, {}))
+            await asyncio.sleep(0.01)  # lets the server hang up before the next request
+        return responses, seen
+    finally:
+        await transport.close()
+        server.close()
+
+
+def test_stream_transport_bodies():
+    payload = json.dumps({'files': ['a.java'] * 100}).encode()
+    compressed = gzip.compress(payload)
+    chunked = b''.join(b'%x\r\n%s\r\n' % (len(part), part) for part in [compressed[:50], compressed[50:]]) + b'0\r\n\r\n'
+    link = 'Link: <http://example.com/x?page=2>; rel="next", <http://example.com/x?page=3>; rel="last"'
+    responses, seen = asyncio.run(get_all([
+        (answer(payload, 'Content-Length: ' + str(len(payload))), False),
+        (answer(chunked, 'Transfer-Encoding: chunked', 'Content-Encoding: gzip', link), False),
+        (answer(payload, 'Connection: close'), True),  # no length, the body ends with the connection
+    ], ['/0', '/1', '/2']))
+    assert [response.content for response in responses] == [payload] * 3
+    assert github_api.last_page(responses[1]) == 3
+    # one keep-alive connection for all three
+    assert seen == [(1, 'GET /0 HTTP/1.1'), (1, 'GET /1 HTTP/1.1'), (1, 'GET /2 HTTP/1.1')]
+
+
+def test_stream_transport_resends_on_a_closed_idle_connection():
+    # the server hangs up after the first answer without a Connection: close
+    responses, seen = asyncio.run(get_all([(answer(b'{}', 'Content-Length: 2'), True),
+                                           (answer(b'[]', 'Content-Length: 2'), False)], ['/a', '/b']))
+    assert [response.json() for response in responses] == [{}, []]
+    assert seen == [(1, 'GET /a HTTP/1.1'), (2, 'GET /b HTTP/1.1')]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeGitHub(50, latency=0.05, rate_limit=10 ** 9).start()
+    monkeypatch.setattr('async_mining.API_URL', fake.url)
+    monkeypatch.setattr(github_api, '_client', github_api.GitHubClient())
+    yield fake
+    github_api._client.close()
+    fake.stop()
+
+
+def test_requests_in_flight_are_bounded(fake):
+    urls = [fake.url + '/repos/scottyab/rootbeer/commits/' + c['sha'] for c in fake.history]
+
+    async def run():
+        client = AsyncClient(['token'], concurrency=5)
+        try:
+            return await asyncio.gather(*(client.github_auth(url) for url in urls))
+        finally:
+            await client.close()
+
+    details = asyncio.run(run())
+    assert [shaDetails['sha'] for shaDetails in details] == [c['sha'] for c in fake.history]
+    assert fake.counts['detail'] == 50
+    assert fake.counts['connections'] == 5
@@ -0,0 +1,98 @@
+import sqlite3
+import time
+
+import pytest
+import requests
+
+from fake_github import FakeGitHub
+from github_api import CommitCache, GitHubClient
+
+# Unit checks of the github_api building blocks, the end to end runs are in test_mining.py.
+
+
+def sha(i):
+    return '%040x' % i
+
+
+def test_cache_hits_are_written_in_one_batch(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = CommitCache(path, touch_every=1000)
+    cache.put(sha(1), b'{"sha": 1}')
+    before = sqlite3.connect(path).execute('SELECT last_used FROM commits').fetchone()[0]
+    assert cache.get(sha(1)) == b'{"sha": 1}'
+    assert cache.get(sha(2)) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    # the hit is only noted in memory until the cache is closed
+    assert sqlite3.connect(path).execute('SELECT last_used FROM commits').fetchone()[0] == before
+    cache.close()
+    assert sqlite3.connect(path).execute('SELECT last_used FROM commits').fetchone()[0] > before
+
+
+def test_eviction_sees_the_pending_hits(tmp_path):
+    body = bytes(range(256)) * 4  # does not compress, every entry has the same size
+    cache = CommitCache(str(tmp_path / 'cache.sqlite'), touch_every=1000)
+    for i in range(3):
+        cache.put(sha(i), body)
+        time.sleep(0.01)
+    cache.max_bytes = cache.size
+    cache.get(sha(0))  # 0 is now the most recently used, 1 the least
+    cache.put(sha(3), body)
+    assert cache.get(sha(1)) is None
+    assert all(cache.get(sha(i)) == body for i in [0, 2, 3])
+    cache.close()
+
+
+TOKENS = ['token-aaaa', 'token-bbbb', 'token-cccc']
+
+
+@pytest.fixture
+def limited():
+    # three tokens of 120 requests per 2 second window, the first one nearly drained by someone else
+    fake = FakeGitHub(50, rate_limit=120, rate_window=2.0).start()
+    urls = [fake.url + '/repos/scottyab/rootbeer/commits/' + c['sha'] for c in fake.history]
+    for _ in range(110):
+        requests.get(urls[0], headers={'Authorization': 'Bearer ' + TOKENS[0]})
+    client = GitHubClient()
+    yield fake, urls, client
+    client.close()
+    fake.stop()
+
+
+def test_scheduler_spends_the_tokens_with_most_headroom(limited):
+    fake, urls, client = limited
+    failed = sum(client.get_with_tokens(urls[i % len(urls)], TOKENS).status_code != 200 for i in range(200))
+    assert failed == 0
+    assert fake.counts.get('limited', 0) == 0
+    stats = client.scheduler.stats()
+    # the drained token is tried once, then the other two share the requests evenly
+    assert stats['...aaaa']['requests'] == 1
+    assert stats['...aaaa']['remaining'] == 9
+    assert abs(stats['...bbbb']['requests'] - stats['...cccc']['requests']) <= 1
+    assert sum(state['requests'] for state in stats.values()) == 200
+
+
+def test_scheduler_sleeps_only_when_every_token_is_exhausted(limited):
+    fake, urls, client = limited
+    start = time.time()
+    failed = sum(client.get_with_tokens(urls[i % len(urls)], TOKENS).status_code != 200 for i in range(260))
+    assert failed == 0
+    assert fake.counts.get('limited', 0) == 0
+    stats = client.scheduler.stats()
+    # 10 + 120 + 120 requests fit the first window, the other 10 wait for a reset
+    assert stats['...aaaa']['requests'] >= 10
+    assert sum(state['requests'] for state in stats.values()) == 260
+    assert time.time() - start >= 1
+
+
+def test_rate_limited_response_is_retried_with_another_token(limited):
+    fake, urls, client = limited
+    assert client.get_with_tokens(urls[0], TOKENS[:1]).status_code == 200  # 9 left as far as the client knows
+    for _ in range(9):
+        requests.get(urls[0], headers={'Authorization': 'Bearer ' + TOKENS[0]})
+    client.scheduler.state('token-bbbb').update(remaining=1, reset=time.time() + 60)
+    # aaaa still looks best, is refused with a 403 and the request goes out again with bbbb
+    assert client.get_with_tokens(urls[1], TOKENS[:2]).status_code == 200
+    assert fake.counts['limited'] == 1
+    stats = client.scheduler.stats()
+    assert stats['...aaaa']['limited'] == 1
+    assert stats['...bbbb']['requests'] == 1
@@ -0,0 +1,79 @@
+import pytest
+
+import github_api
+from fake_github import PATHS, FakeGitHub
+from languages import LanguageResolver
+from mining_pipeline import FileMatcher
+
+# Unit checks of languages.py, the batch run that classifies locally is in test_mining.py.
+
+MAPPING = {'Java': ['.java'], 'Kotlin': ['.kt'], 'C++': ['.cpp', '.h'], 'C': ['.c', '.h'],
+           'CMake': ['.cmake', 'CMakeLists.txt']}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeGitHub(10, rate_limit=10 ** 9).start()
+    monkeypatch.setattr(github_api, 'API_URL', fake.url)
+    monkeypatch.setattr('languages.API_URL', fake.url)
+    monkeypatch.setattr(github_api, '_client', github_api.GitHubClient())
+    yield fake
+    github_api._client.close()
+    fake.stop()
+
+
+def test_table_is_read_on_first_use():
+    resolver = LanguageResolver('')
+    assert resolver._table is None
+    resolver.store('scottyab/rootbeer', {'Java': 1})
+    assert resolver.languages('scottyab/rootbeer', ['token']) == ['Java']
+    assert resolver._table is None  # a cached answer needs no table
+    assert resolver.language_of('Main.java') == 'Java'
+    assert len(resolver.table) > 100
+
+
+def test_language_of_tries_the_file_name_then_the_longest_extension():
+    resolver = LanguageResolver('')
+    assert resolver.language_of('rootbeerlib/src/main/cpp/CMakeLists.txt') == 'CMake'
+    assert resolver.language_of('config.cmake.in') == 'CMake'
+    assert resolver.language_of('build.gradle.kts') == 'Gradle'
+    assert resolver.language_of('app/MainActivity.kt') == 'Kotlin'
+    assert resolver.language_of('Makefile') == 'Makefile'
+    assert resolver.language_of('notes.unknown') is None
+    assert resolver.language_of('LICENSE') is None
+
+
+def test_classify_counts_the_paths_largest_first():
+    languages = LanguageResolver('').classify(PATHS * 2 + ['notes.unknown'])
+    assert languages == {'Java': 6, 'Kotlin': 4, 'C++': 4, 'CMake': 4, 'Gradle': 4, 'C': 2, 'Markdown': 2, 'INI': 2}
+
+
+def test_local_classification_sends_no_request(fake, tmp_path):
+    resolver = LanguageResolver(str(tmp_path / 'cache.sqlite'))
+    assert resolver.languages('scottyab/rootbeer', ['token'], PATHS)[:4] == ['Java', 'Kotlin', 'C++', 'CMake']
+    assert fake.counts.get('languages', 0) == 0
+    assert resolver.stats() == {'hits': 0, 'requests': 0}
+    # cached like an API answer, for this resolver and the next run
+    again = LanguageResolver(str(tmp_path / 'cache.sqlite'))
+    assert again.languages('scottyab/rootbeer', ['token']) == resolver.languages('scottyab/rootbeer', ['token'])
+    assert fake.counts.get('languages', 0) == 0
+
+
+def test_api_answer_is_asked_once(fake):
+    resolver = LanguageResolver('')
+    for _ in range(3):
+        assert resolver.languages('scottyab/rootbeer', ['token']) == ['Java', 'Kotlin', 'C++', 'CMake']
+    assert fake.counts['languages'] == 1
+    assert resolver.stats() == {'hits': 2, 'requests': 1}
+
+
+def test_matchers_of_the_languages():
+    resolver = LanguageResolver('')
+    matcher = resolver.matcher(['C++', 'C', 'CMake'], MAPPING)
+    assert resolver.matcher(['C++', 'C', 'CMake'], MAPPING) is matcher  # compiled once per run
+    assert matcher.suffixes == ('.cpp', '.h', '.c', '.cmake')
+    assert matcher.filter(PATHS) == FileMatcher.for_languages(['C++', 'C', 'CMake'], MAPPING).filter(PATHS) == [
+        'rootbeerlib/src/main/cpp/toolChecker.cpp', 'rootbeerlib/src/main/cpp/toolChecker.h',
+        'rootbeerlib/src/main/cpp/CMakeLists.txt', 'rootbeerlib/src/main/cpp/native.c', 'cmake/android.cmake']
+    # without a mapping the patterns come from the built-in table
+    assert resolver.matcher(['Gradle']).filter(PATHS) == ['app/build.gradle.kts', 'build.gradle.kts']
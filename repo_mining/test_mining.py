@@ -0,0 +1,337 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import pytest
+
+from fake_github import FakeGitHub, make_history, write_git_repo
+import github_api
+from github_api import FILES_PER_PAGE
+from mining_pipeline import clone_repo, mine as mine_commits, walk_commits
+
+# End to end checks of the mining scripts and mine_repo against fake_github.py.
+# The scripts read GITHUB_API_URL when github_api is imported, so every run is a
+# child process pointed at the fake server, in its own scratch directory.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EXTENSIONS = ['.java', '.kt', '.cpp', '.c', '.cmake']
+
+# runs a script like `python script.py` and prints the ETag statistics of its client afterwards
+SCRIPT_CHILD = """
+import json, runpy, sys
+sys.path.insert(0, {here!r})
+runpy.run_path({script!r}, run_name='__main__')
+from github_api import get_client
+print('ETAGS ' + json.dumps(get_client().etags.stats() if get_client().etags else None))
+"""
+
+MINE_CHILD = """
+import sys
+sys.path.insert(0, {here!r})
+from mining_pipeline import mine_repo
+mine_repo('scottyab/rootbeer', ['token'], {extensions!r}, 'file.csv', 'authors.csv', 'checkpoint.json', **{kwargs!r})
+"""
+
+BATCH_CHILD = """
+import json, sys
+sys.path.insert(0, {here!r})
+from batch_mining import mine_repos
+for group in {groups!r}:
+    report = mine_repos(group, ['token'], {extensions!r}, 'out', **{kwargs!r})
+    print('LANGUAGES ' + json.dumps({{repo: result.get('languages') for repo, result in report['repos'].items()}}))
+"""
+
+
+@pytest.fixture
+def fake():
+    fake = FakeGitHub(300, rate_limit=10 ** 9).start()
+    yield fake
+    fake.stop()
+
+
+def child_env(fake, **env):
+    result = dict(os.environ, GITHUB_API_URL=fake.url, GITHUB_CACHE='', GITHUB_WORKERS='8')
+    result.update(env)
+    return result
+
+
+def run_script(script, fake, cwd, **env):
+    # runs one of the mining scripts in cwd, returns the ETag stats of its client
+    code = SCRIPT_CHILD.format(here=HERE, script=os.path.join(HERE, script))
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=child_env(fake, **env),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.rpartition('ETAGS ')[2])
+
+
+def mine(fake, cwd, **kwargs):
+    # mine_repo of the default fake repo in cwd, returns the stdout and both CSVs
+    code = MINE_CHILD.format(here=HERE, extensions=EXTENSIONS, kwargs=kwargs)
+    result = subprocess.run([sys.executable, '-c', code], cwd=cwd, env=child_env(fake),
+                            capture_output=True, text=True, check=True)
+    return result.stdout, read(os.path.join(cwd, 'file.csv')) + read(os.path.join(cwd, 'authors.csv'))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def sent(fake, before, kind):
+    return fake.counts.get(kind, 0) - before.get(kind, 0)
+
+
+@pytest.mark.parametrize('commits', [50, 1000, 1050])
+def test_one_list_request_per_page(fake, tmp_path, commits):
+    fake.set_history(make_history(commits))
+    outputs = []
+    for workers in ['1', '8']:
+        outdir = tmp_path / workers
+        outdir.mkdir()
+        before = dict(fake.counts)
+        run_script('Justin_CollectFiles.py', fake, outdir, GITHUB_WORKERS=workers)
+        assert sent(fake, before, 'list') == -(-commits // 100)
+        assert sent(fake, before, 'detail') == commits
+        outputs.append(read(outdir / 'data' / 'file_rootbeer.csv'))
+    assert outputs[0] == outputs[1]
+
+
+def test_wide_commit_files_are_paged(fake, tmp_path):
+    wide = fake.add_wide_commit(5000)
+    before = dict(fake.counts)
+    run_script('Justin_CollectFiles.py', fake, tmp_path)
+    # page 1 comes with the commit detail, pages 2 to 17 of 300 files are extra requests
+    assert sent(fake, before, 'detail') == len(fake.history) + 16
+    with open(tmp_path / 'data' / 'file_rootbeer.csv') as f:
+        counts = dict(line.rstrip('\n').split(',') for line in f if line.startswith('generated/'))
+    assert sorted(counts) == wide['files']
+    assert set(counts.values()) == {'1'}
+
+
+class WidestRecord:
+    # keeps only the size of the biggest record, so the walk is all that is measured
+    def __init__(self):
+        self.files = 0
+
+    def add(self, commit):
+        self.files = max(self.files, len(commit['files']))
+
+
+def test_wide_commit_is_streamed(fake, monkeypatch):
+    # walk_commits in this process against a client without cache, under tracemalloc
+    monkeypatch.setattr(github_api, 'API_URL', fake.url)
+
+    def walk():
+        monkeypatch.setattr(github_api, '_client', github_api.GitHubClient())
+        widest = WidestRecord()
+        tracemalloc.start()
+        try:
+            mine_commits(walk_commits('scottyab/rootbeer', ['token'], 1), [widest])
+            return widest.files, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            github_api._client.close()
+
+    _, plain = walk()
+    wide = fake.add_wide_commit(5000)
+    widest, peak = walk()
+    assert widest == FILES_PER_PAGE
+
+    # what the 5000 parsed file objects of the commit take when held at once
+    tracemalloc.start()
+    files = json.loads(json.dumps([{'filename': filename} for filename in wide['files']]))
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del files
+    assert peak - plain < held / 2
+
+
+@pytest.mark.parametrize('script, journal, output', [
+    ('Justin_CollectFiles.py', 'data/journal_rootbeer.json', 'data/file_rootbeer.csv'),
+    ('Justin_authorsFileTouches.py', 'Justin_data/journal_rootbeer.json', 'Justin_data/Justin_authorsTouches.csv'),
+])
+def test_killed_and_resumed_run_matches_a_full_run(tmp_path, script, journal, output):
+    fake = FakeGitHub(400, latency=0.005, rate_limit=10 ** 9).start()
+    try:
+        full, crashed = tmp_path / 'full', tmp_path / 'crashed'
+        for outdir in [full, crashed]:
+            os.makedirs(outdir / os.path.dirname(output))
+        run_script(script, fake, full, GITHUB_WORKERS='1')
+
+        # killed as soon as the journal holds some progress, then run again
+        code = SCRIPT_CHILD.format(here=HERE, script=os.path.join(HERE, script))
+        process = subprocess.Popen([sys.executable, '-c', code], cwd=crashed,
+                                   env=child_env(fake, GITHUB_WORKERS='1'), stdout=subprocess.DEVNULL)
+        deadline = time.time() + 60
+        while not os.path.exists(crashed / journal) and process.poll() is None and time.time() < deadline:
+            time.sleep(0.01)
+        process.kill()
+        process.wait()
+        assert os.path.exists(crashed / journal)
+        before = dict(fake.counts)
+        run_script(script, fake, crashed, GITHUB_WORKERS='1')
+
+        assert sent(fake, before, 'detail') < len(fake.history)
+        assert not os.path.exists(crashed / journal)
+        assert read(crashed / output) == read(full / output)
+    finally:
+        fake.stop()
+
+
+def test_unchanged_rerun_is_answered_with_304(fake, tmp_path):
+    fake.set_history(make_history(1000))
+    first = run_script('Justin_CollectFiles.py', fake, tmp_path, GITHUB_CACHE='cache.sqlite')
+    output = read(tmp_path / 'data' / 'file_rootbeer.csv')
+    assert first['hits'] == 0
+
+    before = dict(fake.counts)
+    again = run_script('Justin_CollectFiles.py', fake, tmp_path, GITHUB_CACHE='cache.sqlite')
+    assert sent(fake, before, 'list') == 10
+    assert sent(fake, before, 'not_modified') == 10
+    assert sent(fake, before, 'detail') == 0  # commit details come from the cache
+    assert again['hit_rate'] == 1.0
+    assert read(tmp_path / 'data' / 'file_rootbeer.csv') == output
+
+    # new commits shift every page, the pages are downloaded again but only the new details
+    fake.grow(20)
+    before = dict(fake.counts)
+    changed = run_script('Justin_CollectFiles.py', fake, tmp_path, GITHUB_CACHE='cache.sqlite')
+    assert changed['changed'] == 10
+    assert sent(fake, before, 'detail') == 20
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'graphql': True}, {'workers': 1}])
+def test_backends_match_rest(fake, tmp_path, kwargs):
+    (tmp_path / 'rest').mkdir()
+    (tmp_path / 'other').mkdir()
+    _, rest = mine(fake, tmp_path / 'rest')
+    _, other = mine(fake, tmp_path / 'other', **kwargs)
+    assert other == rest
+
+
+def test_batch_matches_one_repo_at_a_time(fake, tmp_path):
+    repos = ['Skyscanner/backpack', 'scottyab/rootbeer', 'mendhak/gpslogger']
+    fake.add_repo('Skyscanner/backpack', 400, 1)
+    fake.add_repo('mendhak/gpslogger', 150, 2)
+    fake.add_wide_commit(700)  # rootbeer keeps the default history, with paged files
+    outputs = []
+    for groups in [[[repo] for repo in repos], [repos]]:
+        outdir = tmp_path / str(len(groups))
+        outdir.mkdir()
+        code = BATCH_CHILD.format(here=HERE, groups=groups, extensions=EXTENSIONS, kwargs={})
+        subprocess.run([sys.executable, '-c', code], cwd=outdir, env=child_env(fake), capture_output=True, check=True)
+        outputs.append([read(outdir / 'out' / (prefix + repo.split('/')[1] + '.csv'))
+                        for repo in repos for prefix in ['file_', 'authors_dates_']])
+    assert outputs[0] == outputs[1]
+
+
+def test_batch_classifies_the_languages_locally(fake, tmp_path):
+    # the fake's /languages answer has no C, rootbeerlib/src/main/cpp/native.c is only kept locally
+    mapping = {'Java': ['.java'], 'Kotlin': ['.kt'], 'C++': ['.cpp', '.h'], 'C': ['.c', '.h'],
+               'CMake': ['.cmake', 'CMakeLists.txt']}
+    repos = ['scottyab/rootbeer', 'mendhak/gpslogger']
+    fake.add_repo('mendhak/gpslogger', 150, 2)
+    runs = {}
+    for label, extensions, kwargs in [('api', [], {'mapping': mapping}),
+                                      ('local', [], {'mapping': mapping, 'local_languages': True}),
+                                      ('all', [p for patterns in mapping.values() for p in patterns], {})]:
+        outdir = tmp_path / label
+        outdir.mkdir()
+        before = dict(fake.counts)
+        code = BATCH_CHILD.format(here=HERE, groups=[repos], extensions=extensions, kwargs=kwargs)
+        result = subprocess.run([sys.executable, '-c', code], cwd=outdir, env=child_env(fake),
+                                capture_output=True, text=True, check=True)
+        outputs = [read(outdir / 'out' / (prefix + repo.split('/')[1] + '.csv'))
+                   for repo in repos for prefix in ['file_', 'authors_dates_']]
+        runs[label] = (sent(fake, before, 'languages'), json.loads(result.stdout.rpartition('LANGUAGES ')[2]), outputs)
+
+    assert runs['api'][0] == 2
+    assert runs['api'][1]['scottyab/rootbeer'] == ['Java', 'Kotlin', 'C++', 'CMake']
+    assert b'native.c' not in runs['api'][2][0]
+    assert runs['local'][0] == 0
+    assert set(runs['local'][1]['scottyab/rootbeer']) == set(mapping)  # told from the mined files
+    # locally every mapped language is kept while mining, like a fixed list of all the patterns
+    assert runs['local'][2] == runs['all'][2]
+
+
+def test_async_engine_matches_sync(tmp_path):
+    fake = FakeGitHub(400, latency=0.01, rate_limit=10 ** 9).start()
+    try:
+        runs = {}
+        for run in ['full', 'incremental']:
+            if run == 'incremental':
+                fake.add_wide_commit(1000)  # a new commit on top whose files are paged
+            for label, kwargs in [('sync', {}), ('async', {'asynchronous': True})]:
+                outdir = tmp_path / label
+                outdir.mkdir(exist_ok=True)
+                before = dict(fake.counts)
+                stdout, output = mine(fake, outdir, incremental=True, workers=8, **kwargs)
+                sent_counts = {kind: sent(fake, before, kind) for kind in ['list', 'detail', 'connections']}
+                runs[run, label] = (stdout, output, sent_counts)
+            sync, asynchronous = runs[run, 'sync'], runs[run, 'async']
+            assert asynchronous[1] == sync[1]
+            assert asynchronous[0] == sync[0]
+            assert asynchronous[2]['list'] == sync[2]['list'] and asynchronous[2]['detail'] == sync[2]['detail']
+            # keep-alive: the connections are reused, at most one per request in flight
+            assert asynchronous[2]['connections'] <= 8
+        assert 'Mined 1 commits' in runs['incremental', 'async'][0]
+    finally:
+        fake.stop()
+
+
+@pytest.mark.parametrize('kwargs', [{}, {'graphql': True}])
+def test_incremental_matches_a_full_mine(fake, tmp_path, kwargs):
+    incremental, full = tmp_path / 'incremental', tmp_path / 'full'
+    incremental.mkdir()
+    full.mkdir()
+    fake.set_history(make_history(200))
+    mine(fake, incremental, incremental=True, **kwargs)
+
+    # new commits on top: only those are fetched
+    fake.grow(100)
+    before = dict(fake.counts)
+    stdout, output = mine(fake, incremental, incremental=True, **kwargs)
+    assert 'Mined 100 commits' in stdout
+    if not kwargs:
+        assert sent(fake, before, 'detail') == 100
+    assert output == mine(fake, full, **kwargs)[1]
+
+    # a force-push drops the checkpoint from the history: everything is mined again
+    fake.rewrite(250, 30)
+    stdout, output = mine(fake, incremental, incremental=True, **kwargs)
+    assert 'mining every commit again' in stdout
+    assert output == mine(fake, full, **kwargs)[1]
+
+
+def test_incremental_clone_follows_the_remote(fake, tmp_path):
+    # clone_repo of a local "remote" that grows and is then force-pushed
+    remote = str(tmp_path / 'remote.git')
+    clone = str(tmp_path / 'clone.git')
+    incremental, full = tmp_path / 'incremental', tmp_path / 'full'
+    incremental.mkdir()
+    full.mkdir()
+
+    def push(history):
+        shutil.rmtree(remote, ignore_errors=True)
+        write_git_repo(history, remote)
+        clone_repo('scottyab/rootbeer', clone, url='file://' + remote)
+
+    push(make_history(200))
+    mine(fake, incremental, incremental=True, clone=clone)
+
+    # fast-import gives the same commits the same shas, so the first 200 stay
+    push(make_history(230))
+    stdout, output = mine(fake, incremental, incremental=True, clone=clone)
+    assert 'Mined 30 commits' in stdout
+    assert output == mine(fake, full, clone=clone)[1]
+
+    # a new author on the root commit changes every sha after it
+    history = make_history(240)
+    history[-1]['author'] = 'Dan Rosen'
+    push(history)
+    stdout, output = mine(fake, incremental, incremental=True, clone=clone)
+    assert 'mining every commit again' in stdout
+    assert output == mine(fake, full, clone=clone)[1]
@@ -0,0 +1,57 @@
+from mining_pipeline import FileMatcher
+
+# Unit checks of the mining_pipeline building blocks, the end to end runs are in test_mining.py.
+
+PATHS = [
+    'CMakeLists.txt',
+    'app/CMakeLists.txt',
+    'app/OldCMakeLists.txt',
+    'app/src/main/cpp/native.h',
+    'app/src/main/cpp/native.cpp',
+    'app/src/main/cpp/native.hpp',
+    'app/src/main/java/Main.java',
+    'app/build.gradle',
+    'gradle/wrapper/gradle-wrapper.properties',
+    'docs/README.md',
+    'vendor/lib/lib.h',
+    'third_party/vendor/lib/lib.h',
+    'third_party/vendored.h',
+]
+
+
+def check(matcher, expected):
+    # filter() and a call per path agree, and keep the paths in order
+    assert matcher.filter(PATHS) == expected
+    assert [path for path in PATHS if matcher(path)] == expected
+
+
+def test_file_names_match_the_whole_basename():
+    check(FileMatcher(['CMakeLists.txt']), ['CMakeLists.txt', 'app/CMakeLists.txt'])
+
+
+def test_duplicate_patterns_count_once():
+    # '.h' from both the C and the C++ mapping
+    matcher = FileMatcher(['.c', '.h', '.cpp', '.h', '.hpp'])
+    assert matcher.suffixes == ('.c', '.h', '.cpp', '.hpp')
+    check(matcher, ['app/src/main/cpp/native.h', 'app/src/main/cpp/native.cpp', 'app/src/main/cpp/native.hpp',
+                    'vendor/lib/lib.h', 'third_party/vendor/lib/lib.h', 'third_party/vendored.h'])
+
+
+def test_globs_match_the_whole_path():
+    check(FileMatcher(['*.gradle', 'gradle/*', 'docs/*.md']),
+          ['app/build.gradle', 'gradle/wrapper/gradle-wrapper.properties', 'docs/README.md'])
+    # '*' crosses '/', '?' is one character
+    check(FileMatcher(['app/*.?pp']), ['app/src/main/cpp/native.cpp', 'app/src/main/cpp/native.hpp'])
+
+
+def test_mixed_patterns():
+    check(FileMatcher(['.java', 'CMakeLists.txt', '*.gradle']),
+          ['CMakeLists.txt', 'app/CMakeLists.txt', 'app/src/main/java/Main.java', 'app/build.gradle'])
+
+
+def test_exclude_drops_vendor_directories_at_any_depth():
+    check(FileMatcher(['.h'], exclude=['*/vendor/*']),
+          ['app/src/main/cpp/native.h', 'third_party/vendored.h'])
+    # without the leading '*/' only the top-level directory is dropped
+    check(FileMatcher(['.h'], exclude=['vendor/*']),
+          ['app/src/main/cpp/native.h', 'third_party/vendor/lib/lib.h', 'third_party/vendored.h'])
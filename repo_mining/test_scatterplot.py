@@ -0,0 +1,91 @@
+import os
+import random
+import subprocess
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+from matplotlib import colormaps
+
+from Brandon_scatterplot import plot_scatter
+from touch_store import DATE_FORMAT, TouchStore
+
+# Brandon_scatterplot.plot_scatter draws every touch in one collection since user-019.
+# These tests compare it with the per-file loop it replaced, computed here from the
+# plain rows with datetime instead of through TouchStore.
+
+
+def random_rows(files, rows, seed=843):
+    # Filename,Author,Date rows in date order, like a mined authors CSV read back
+    rnd = random.Random(seed)
+    start = datetime(2015, 1, 1)
+    dates = sorted(start + timedelta(seconds=rnd.randrange(10 * 365 * 24 * 3600)) for _ in range(rows))
+    return [('src/File' + str(rnd.randrange(files)) + '.java', 'author' + str(rnd.randrange(12)),
+             date.strftime(DATE_FORMAT)) for date in dates]
+
+
+def per_file_points(rows):
+    """
+    The points of plot_scatter before user-019: one scatter per file in first-seen order,
+    x = the file's number from 1, y = whole weeks since the file's first touch, and the
+    authors colored with tab20 in the order they first show up going through the files.
+    """
+    authors_dates = {}
+    for filename, author, date in rows:
+        authors_dates.setdefault(filename, []).append((author, datetime.strptime(date, DATE_FORMAT)))
+    colormap = colormaps['tab20']
+    authors_colors = {}
+    offsets = []
+    colors = []
+    for number, touches in enumerate(authors_dates.values(), 1):
+        first = min(date for _, date in touches)
+        for author, date in touches:
+            if author not in authors_colors:
+                authors_colors[author] = colormap(len(authors_colors) % len(colormap.colors))
+            offsets.append((number, (date - first).days // 7))
+            colors.append(authors_colors[author])
+    return list(authors_dates), np.array(offsets, dtype=float), np.array(colors)
+
+
+def plot(rows, tmp_path):
+    store = TouchStore()
+    for filename, author, date in rows:
+        store.write(filename, author, date)
+    return plot_scatter(store, os.path.join(tmp_path, 'plot.png'), os.path.join(tmp_path, 'legend.png'))
+
+
+def test_points_match_the_per_file_loop(tmp_path):
+    rows = random_rows(files=40, rows=2000)
+    _, offsets, colors = per_file_points(rows)
+    fig, _ = plot(rows, tmp_path)
+    collections = fig.axes[0].collections
+    assert len(collections) == 1
+    assert np.array_equal(collections[0].get_offsets(), offsets)
+    assert np.array_equal(collections[0].get_facecolors(), colors)
+
+
+def test_more_authors_than_colors_wrap_around(tmp_path):
+    rows = [('a.java', 'author' + str(i), '2020-01-0' + str(1 + i % 9) + 'T00:00:00Z') for i in range(25)]
+    _, offsets, colors = per_file_points(rows)
+    fig, _ = plot(rows, tmp_path)
+    assert np.array_equal(fig.axes[0].collections[0].get_offsets(), offsets)
+    assert np.array_equal(fig.axes[0].collections[0].get_facecolors(), colors)
+
+
+def test_filename_legend_lists_the_files_in_order(tmp_path):
+    rows = random_rows(files=15, rows=200)
+    filenames, _, _ = per_file_points(rows)
+    _, legend = plot(rows, tmp_path)
+    lines = legend.texts[0].get_text().split('\n')
+    assert lines == ['●  ' + str(i) + ': ' + filename for i, filename in enumerate(filenames, 1)]
+    assert os.path.exists(os.path.join(tmp_path, 'plot.png'))
+    assert os.path.exists(os.path.join(tmp_path, 'legend.png'))
+
+
+def test_plot_modules_leave_pyplot_alone():
+    # a child process, pytest itself may have imported pyplot already
+    code = ('import sys; sys.path.insert(0, ' + repr(os.path.dirname(os.path.abspath(__file__))) + '); '
+            'import Brandon_scatterplot, Eric_scatterplot, batch_plots; '
+            'print("matplotlib.pyplot" in sys.modules)')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,383 @@
+import csv
+import io
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from importlib.util import find_spec
+
+# True when pyarrow is installed and mine_repo also writes the .parquet copy.
+# Parquet output is optional, CSV and .touches work without it, and pyarrow is only
+# imported when a Parquet file is read or written (the plots start without it)
+PARQUET = find_spec('pyarrow') is not None
+
+# NumPy converts the dates of a CSV in one call when it is installed (the plots need it anyway)
+NUMPY = find_spec('numpy') is not None
+
+# Compact columnar store of the Filename,Author,Date touches.
+#
+# Filenames and authors are interned to int ids (in the order they are first seen)
+# and dates are kept as int64 epoch seconds, in three parallel array columns
+# instead of a dict of lists of string tuples. The same store writes the
+# authors_dates / touch count CSVs and is saved next to them in a binary file
+# the scatterplot scripts load without parsing any dates. With pyarrow installed
+# it is also written as Parquet (Filename/Author dictionary encoded, Date as a
+# UTC timestamp) for pandas/Arrow based tools.
+
+MAGIC = b'TOUCHES1'
+HEADER = struct.Struct('<8sQQ')  # magic, rows, bytes of the JSON name tables
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+WEEK = 7 * 24 * 3600
+
+# Above this many touches the scatterplots bin them into a file x week grid instead
+# of drawing a marker per touch (TOUCH_DENSITY_POINTS=0 always bins)
+DENSITY_POINTS = int(os.environ.get('TOUCH_DENSITY_POINTS', 100000))
+
+
+def parse_date(date):
+    # 'YYYY-MM-DDTHH:MM:SSZ' -> epoch seconds
+    return int(datetime.fromisoformat(date.replace('Z', '+00:00')).timestamp())
+
+
+def format_date(seconds):
+    return time.strftime(DATE_FORMAT, time.gmtime(seconds))
+
+
+def csv_field(value):
+    # value as csv.writer writes it inside a row, quoted only when it has to be
+    out = io.StringIO()
+    csv.writer(out, lineterminator='').writerow([value, ''])
+    return out.getvalue()[:-1]
+
+
+class TouchStore:
+    """
+    Touches as three columns: file id (int32), author id (int32) and date (int64 seconds).
+
+    files[i] / authors[i] give back the names of the ids. Has the add(commit)
+    method of the mining_pipeline aggregators, so it can be passed to mine().
+    """
+
+    def __init__(self):
+        self.files = []
+        self.authors = []
+        self.file_ids = {}
+        self.author_ids = {}
+        self.file_col = array('i')
+        self.author_col = array('i')
+        self.date_col = array('q')
+        self.last_date = (None, None)
+
+    def __len__(self):
+        return len(self.date_col)
+
+    def intern(self, name, names, ids):
+        index = ids.get(name)
+        if index is None:
+            index = ids[name] = len(names)
+            names.append(name)
+        return index
+
+    def write(self, filename, author, date):
+        # date is the API's 'YYYY-MM-DDTHH:MM:SSZ' string, a commit's files share it so it is parsed once
+        if self.last_date[0] != date:
+            self.last_date = (date, parse_date(date))
+        self.file_col.append(self.intern(filename, self.files, self.file_ids))
+        self.author_col.append(self.intern(author, self.authors, self.author_ids))
+        self.date_col.append(self.last_date[1])
+
+    def add(self, commit):
+        for filename in commit['files']:
+            self.write(filename, commit['author'], commit['date'])
+
+    def extend(self, other):
+        # appends the rows of another store, its ids are mapped onto this store's names
+        file_map = [self.intern(name, self.files, self.file_ids) for name in other.files]
+        author_map = [self.intern(name, self.authors, self.author_ids) for name in other.authors]
+        self.file_col.extend(file_map[i] for i in other.file_col)
+        self.author_col.extend(author_map[i] for i in other.author_col)
+        self.date_col.extend(other.date_col)
+
+    def grouped(self):
+        # row positions grouped by file in first seen order, arrival order within a file
+        return sorted(range(len(self.file_col)), key=self.file_col.__getitem__)
+
+    def touch_counts(self):
+        # filename -> touches, in the order the files were first seen like TouchCounter.dictfiles
+        counts = [0] * len(self.files)
+        for index in self.file_col:
+            counts[index] += 1
+        return dict(zip(self.files, counts))
+
+    def authors_dates(self):
+        # filename -> list of (author, naive UTC datetime), what the scatterplot readers build from the CSV
+        dates = {}
+        result = {}
+        for row in self.grouped():
+            seconds = self.date_col[row]
+            if seconds not in dates:
+                dates[seconds] = datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+            result.setdefault(self.files[self.file_col[row]], []).append(
+                (self.authors[self.author_col[row]], dates[seconds]))
+        return result
+
+    def columns(self):
+        """
+        Returns the columns as NumPy arrays (no copy).
+
+        Returns:
+        - files (ndarray): int32 file ids.
+        - authors (ndarray): int32 author ids.
+        - dates (ndarray): int64 epoch seconds.
+        """
+        import numpy as np
+        return (np.frombuffer(self.file_col, dtype=np.int32), np.frombuffer(self.author_col, dtype=np.int32),
+                np.frombuffer(self.date_col, dtype=np.int64))
+
+    def datetimes(self):
+        # the date column as NumPy datetime64[s] (UTC), no copy
+        return self.columns()[2].view('datetime64[s]')
+
+    def weeks(self, per_file=False):
+        """
+        Whole weeks from the first touch to every touch, (date - start).days // 7 for all rows at once.
+
+        Parameters:
+        - per_file (bool): Count from the first touch of each row's file instead of the overall first one.
+
+        Returns:
+        - weeks (ndarray): int64 week offsets, one per row.
+        """
+        import numpy as np
+        files, _, seconds = self.columns()
+        if not len(seconds):
+            return np.zeros(0, dtype=np.int64)
+        if per_file:
+            start = np.full(len(self.files), np.iinfo(np.int64).max)
+            np.minimum.at(start, files, seconds)
+            start = start[files]
+        else:
+            start = seconds.min()
+        return (seconds - start) // WEEK
+
+    def density(self, colors, per_file=False, bins=(2000, 1000)):
+        """
+        Bins the touches into a file x week grid and colors each cell by its dominant author.
+
+        Memory is bounded by the rows and the grid, which holds at most bins cells:
+        neighbouring files / weeks share a cell when there are more of them.
+
+        Parameters:
+        - colors (ndarray): RGBA color of every author id, shape (len(authors), 4).
+        - per_file (bool): Weeks from the first touch of each file, as in weeks().
+        - bins (tuple): Most columns (files) and rows (weeks) of the grid.
+
+        Returns:
+        - image (ndarray): RGBA grid, rows are weeks from the bottom, empty cells transparent and
+          busier cells more opaque.
+        - extent (tuple): imshow extent with the files numbered from 1.
+        """
+        import numpy as np
+        files, authors, _ = self.columns()
+        weeks = self.weeks(per_file)
+        total_files = max(len(self.files), 1)
+        total_weeks = int(weeks.max()) + 1 if len(weeks) else 1
+        file_step = -(-total_files // bins[0])
+        week_step = -(-total_weeks // bins[1])
+        columns = -(-total_files // file_step)
+        rows = -(-total_weeks // week_step)
+        cells = (weeks // week_step) * columns + files // file_step
+        counts = np.bincount(cells, minlength=rows * columns)
+
+        # touches per (cell, author), then the author with the most of them in each cell
+        # (ties go to the author seen first)
+        keys, key_counts = np.unique(cells * len(self.authors) + authors, return_counts=True)
+        key_cells, key_authors = np.divmod(keys, max(len(self.authors), 1))
+        order = np.lexsort((key_authors, -key_counts, key_cells))
+        first = order[np.diff(key_cells[order], prepend=-1) != 0]
+        dominant = np.full(rows * columns, -1, dtype=np.int64)
+        dominant[key_cells[first]] = key_authors[first]
+
+        palette = np.vstack([np.asarray(colors, dtype=np.float32).reshape(-1, 4), np.zeros((1, 4), np.float32)])
+        image = palette[dominant]  # -1 picks the transparent last row
+        busy = counts > 0
+        image[busy, 3] *= 0.35 + 0.65 * np.log1p(counts[busy]) / np.log1p(counts.max(initial=1))
+        extent = (0.5, columns * file_step + 0.5, -0.5, rows * week_step - 0.5)
+        return image.reshape(rows, columns, 4), extent
+
+    def write_csv(self, fileOutput):
+        # Writes the Filename,Author,Date rows grouped by file, same as the dict based write_authors_dates in benchmarks.py
+        # every name is quoted once and rows are joined from the pieces, the same text csv.writer gives
+        files = [csv_field(name) + ',' for name in self.files]
+        authors = [csv_field(name) + ',' for name in self.authors]
+        dates = {seconds: format_date(seconds) + '\r\n' for seconds in set(self.date_col)}
+        file_col, author_col, date_col = self.file_col, self.author_col, self.date_col
+        with open(fileOutput, 'w', newline='') as fileCSV:
+            csv.writer(fileCSV).writerow(["Filename", "Author", "Date"])
+            fileCSV.writelines(files[file_col[row]] + authors[author_col[row]] + dates[date_col[row]]
+                               for row in self.grouped())
+
+    def save(self, path):
+        """
+        Saves the store in its binary format: header, JSON name tables, then the raw columns.
+        """
+        names = json.dumps({'files': self.files, 'authors': self.authors}).encode('utf-8')
+        columns = [self.file_col, self.author_col, self.date_col]
+        if sys.byteorder != 'little':
+            columns = [array(column.typecode, column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(self), len(names)))
+            f.write(names)
+            for column in columns:
+                column.tofile(f)
+        os.replace(tmp, path)
+
+    def write_parquet(self, path):
+        """
+        Saves the rows in CSV order as a Parquet file, needs pyarrow.
+        """
+        if not PARQUET:
+            raise ImportError('writing Parquet needs pyarrow (pip install pyarrow)')
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        files, authors, dates = self.columns()
+        order = np.argsort(files, kind='stable')
+        table = pa.table({
+            'Filename': pa.DictionaryArray.from_arrays(files[order], pa.array(self.files, pa.string())),
+            'Author': pa.DictionaryArray.from_arrays(authors[order], pa.array(self.authors, pa.string())),
+            'Date': pa.array(dates[order], pa.timestamp('s', tz='UTC')),
+        })
+        tmp = path + '.tmp'
+        pq.write_table(table, tmp, compression='zstd')
+        os.replace(tmp, path)
+
+    @classmethod
+    def read_parquet(cls, path):
+        # Reads a file of write_parquet, ids are handed out in order of appearance like read_csv does
+        if not PARQUET:
+            raise ImportError('reading Parquet needs pyarrow (pip install pyarrow)')
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pq.read_table(path).unify_dictionaries().combine_chunks()
+        store = cls()
+        for name, names, column, ids in [('Filename', store.files, store.file_col, store.file_ids),
+                                         ('Author', store.authors, store.author_col, store.author_ids)]:
+            chunks = table.column(name).chunks
+            if not chunks:
+                continue
+            dictionary = chunks[0].dictionary.to_pylist()
+            indices = chunks[0].indices.to_numpy(zero_copy_only=False)
+            used, first = np.unique(indices, return_index=True)
+            used = used[np.argsort(first)]
+            remap = np.zeros(len(dictionary), dtype=np.int32)
+            remap[used] = np.arange(len(used), dtype=np.int32)
+            names.extend(dictionary[i] for i in used)
+            ids.update((n, i) for i, n in enumerate(names))
+            column.frombytes(remap[indices].tobytes())
+        # Parquet has no second resolution, the dates come back in milliseconds
+        dates = table.column('Date').cast(pa.timestamp('s', tz='UTC')).cast(pa.int64()).to_numpy()
+        store.date_col.frombytes(dates.astype(np.int64).tobytes())
+        return store
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, 'rb') as f:
+            magic, rows, names_size = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(path + ' is not a touch store')
+            names = json.loads(f.read(names_size).decode('utf-8'))
+            for column in [store.file_col, store.author_col, store.date_col]:
+                column.fromfile(f, rows)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+        store.files = names['files']
+        store.authors = names['authors']
+        store.file_ids = {name: i for i, name in enumerate(store.files)}
+        store.author_ids = {name: i for i, name in enumerate(store.authors)}
+        return store
+
+    @classmethod
+    def read_csv(cls, fileInput):
+        """
+        Reads a Filename,Author,Date CSV (rows that are not 3 columns are skipped).
+
+        The file is read once and the ids are looked up a column at a time. With NumPy
+        installed the whole Date column is converted in one call, else with parse_date.
+        """
+        store = cls()
+        with open(fileInput, 'r', newline='') as fileCSV:
+            reader = csv.reader(fileCSV)
+            next(reader, None)
+            rows = [row for row in reader if len(row) == 3]
+        if not rows:
+            return store
+        files, authors, dates = zip(*rows)
+        # dict.fromkeys keeps the first-seen order, map() looks the ids up without a Python loop
+        store.files = list(dict.fromkeys(files))
+        store.authors = list(dict.fromkeys(authors))
+        store.file_ids = {name: i for i, name in enumerate(store.files)}
+        store.author_ids = {name: i for i, name in enumerate(store.authors)}
+        store.file_col.extend(map(store.file_ids.__getitem__, files))
+        store.author_col.extend(map(store.author_ids.__getitem__, authors))
+        if NUMPY:
+            import numpy as np
+            # datetime64 parses ISO dates itself, the trailing Z (UTC) only has to go
+            seconds = np.array([date.rstrip('Z') for date in dates], dtype='datetime64[s]').astype(np.int64)
+            store.date_col.frombytes(seconds.tobytes())
+        else:
+            store.date_col.extend(map(parse_date, dates))
+        return store
+
+    @classmethod
+    def open(cls, fileInput):
+        """
+        Loads the touches of an authors CSV, from the binary store or the Parquet file
+        saved next to it when one is at least as new as the CSV, else by parsing the CSV.
+        """
+        path = store_path(fileInput)
+        if is_current(path, fileInput):
+            return cls.load(path)
+        path = parquet_path(fileInput)
+        if PARQUET and is_current(path, fileInput):
+            return cls.read_parquet(path)
+        return cls.read_csv(fileInput)
+
+
+def load_touches(fileInput):
+    """
+    Loads an authors CSV for plotting, the shared loader of the scatterplot scripts.
+
+    Same as TouchStore.open: the .touches or .parquet copy when one is current,
+    else the CSV. Use datetimes() and weeks() of the result for the plot coordinates.
+
+    Parameters:
+    - fileInput (str): Path of a Filename,Author,Date CSV.
+
+    Returns:
+    - store (TouchStore): Files and authors numbered in the order they first appear.
+    """
+    return TouchStore.open(fileInput)
+
+
+def is_current(path, fileInput):
+    return os.path.exists(path) and (not os.path.exists(fileInput) or
+                                     os.path.getmtime(path) >= os.path.getmtime(fileInput))
+
+
+def store_path(fileInput):
+    # authors_dates_rootbeer.csv -> authors_dates_rootbeer.touches
+    return os.path.splitext(fileInput)[0] + '.touches'
+
+
+def parquet_path(fileInput):
+    # authors_dates_rootbeer.csv -> authors_dates_rootbeer.parquet
+    return os.path.splitext(fileInput)[0] + '.parquet'